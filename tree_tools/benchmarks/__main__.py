@@ -0,0 +1,47 @@
+import argparse
+import sys
+
+from tree_tools.benchmarks import runner
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m tree_tools.benchmarks",
+        description="Benchmark tree build, query and serialize hot paths.",
+    )
+    parser.add_argument(
+        "--documents",
+        nargs="+",
+        choices=sorted(runner.SUITES),
+        default=list(runner.SUITES),
+    )
+    parser.add_argument(
+        "--sizes", nargs="+", type=int, default=list(runner.DEFAULT_SIZES)
+    )
+    parser.add_argument("--repeats", type=int, default=runner.DEFAULT_REPEATS)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against the results in this file")
+    parser.add_argument("--threshold", type=float, default=runner.DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    results = runner.run(args.documents, args.sizes, args.repeats)
+    for entry, measurement in results["results"].items():
+        print(
+            f"{entry:40} min {measurement['min'] * 1000:10.3f} ms"
+            f"  median {measurement['median'] * 1000:10.3f} ms"
+            f"  peak {measurement['peak_bytes'] / 1024:10.1f} KiB"
+        )
+    if args.output:
+        runner.save(results, args.output)
+    if args.baseline:
+        regressions = runner.compare(
+            runner.load(args.baseline), results, args.threshold
+        )
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
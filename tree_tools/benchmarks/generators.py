@@ -0,0 +1,97 @@
+import json
+import os
+import random
+import typing
+
+
+POKEMON_PATH = os.path.join(
+    os.path.dirname(__file__), os.pardir, "tests", "test_jsons", "pokemon.json"
+)
+WORDS = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel"]
+
+
+def deep_document(size: int, seed: int = 0) -> typing.Dict[str, typing.Any]:
+    """
+    A chain of objects nested size levels deep, each holding a few scalars.
+    """
+    rng = random.Random(seed)
+    document = {"leaf": rng.random()}
+    for level in range(size):
+        document = {"a": document, "level": level, "flag": level % 2 == 0}
+    return document
+
+
+def wide_document(size: int, seed: int = 0) -> typing.Dict[str, typing.Any]:
+    """
+    A single object with size keys holding mixed scalars.
+    """
+    rng = random.Random(seed)
+    return {
+        f"k{i}": rng.choice([rng.randint(0, 1000), rng.random(), rng.choice(WORDS)])
+        for i in range(size)
+    }
+
+
+def array_document(size: int, seed: int = 0) -> typing.Dict[str, typing.Any]:
+    """
+    A list of size small records, the typical shape of a projection workload.
+    """
+    rng = random.Random(seed)
+    return {
+        "items": [
+            {
+                "id": i,
+                "value": rng.random() * 100,
+                "tag": rng.choice(WORDS),
+                "tags": rng.sample(WORDS, 3),
+                "owner": {"name": rng.choice(WORDS), "active": rng.random() > 0.5},
+            }
+            for i in range(size)
+        ]
+    }
+
+
+def string_document(size: int, seed: int = 0) -> typing.Dict[str, typing.Any]:
+    """
+    A list of size records dominated by long string payloads.
+    """
+    rng = random.Random(seed)
+    return {
+        "records": [
+            {"id": i, "text": " ".join(rng.choices(WORDS, k=64))} for i in range(size)
+        ]
+    }
+
+
+def pokemon_document(size: int, seed: int = 0) -> typing.Dict[str, typing.Any]:
+    """
+    The pokemon fixture, with its list repeated until it holds at least size entries.
+    """
+    with open(POKEMON_PATH) as file:
+        pokemon = json.load(file)["pokemon"]
+    repeats = max(1, -(-size // len(pokemon)))
+    return {"pokemon": (pokemon * repeats)[: max(size, len(pokemon))]}
+
+
+def deep_query(size: int) -> str:
+    return ".".join(["a"] * size + ["leaf"])
+
+
+DOCUMENTS: typing.Dict[
+    str,
+    typing.Tuple[
+        typing.Callable[[int], typing.Dict[str, typing.Any]],
+        typing.Callable[[int], str],
+    ],
+] = {
+    "deep": (deep_document, deep_query),
+    "wide": (wide_document, lambda size: f"k{size // 2}"),
+    "array": (array_document, lambda size: "items[?value > `50`].owner.name"),
+    "report": (
+        array_document,
+        lambda size: "items[?owner.active && contains(tags, 'alpha')]"
+        ".{id: id, value: value, tag: tag} | sort_by(@, &value)[-10:].id",
+    ),
+    "string": (string_document, lambda size: "records[*].text"),
+    "pokemon": (pokemon_document, lambda size: "pokemon[*].name"),
+}
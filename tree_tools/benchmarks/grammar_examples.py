@@ -0,0 +1,73 @@
+import typing
+
+
+# Expressions from the examples of the JMESPath specification and tutorial, covering
+# every grammar rule: identifiers, quoted identifiers, indexes, slices, projections,
+# flattening, filters, pipes, multiselects, boolean operators, literals, raw strings,
+# the current node and function calls with expression references.
+# They are parsed without being evaluated, see runner.benchmark_queries.
+EXAMPLES: typing.List[str] = [
+    "foo",
+    "foo.bar",
+    "foo.bar.baz",
+    '"foo"',
+    '"with space"',
+    '"special chars: !@#"',
+    '"quote\\"char"',
+    '"\\u2713"',
+    "foo.bar.baz.bad",
+    "[0]",
+    "[-1]",
+    "[0][0]",
+    "foo[*].bar",
+    "foo[*].bar[0]",
+    "foo[]",
+    "foo[].bar",
+    "foo[0:5]",
+    "foo[::2]",
+    "foo[::-1]",
+    "foo[:2].a",
+    "[0:5]",
+    "*.foo",
+    "foo.*.bar",
+    "ops.*.numArgs",
+    "reservations[*].instances[*].state",
+    "reservations[*].instances[*].state[]",
+    "people[?age > `20`].name",
+    "people[?state == 'WA'].name",
+    "foo[?a == b]",
+    "foo[?a > `1` && b < `3`]",
+    "foo[?!(a == `1`)]",
+    "foo[?@ == `1`]",
+    "foo | bar",
+    "foo[*].bar | [0]",
+    "foo.[bar, baz]",
+    "foo.{bar: bar, baz: baz}",
+    "people[].[name, state.name]",
+    "people[*].{Name: name, State: state.name}",
+    "foo || bar",
+    "foo && bar",
+    "!foo",
+    "!!foo",
+    '`"foo"`',
+    "`[1, 2]`",
+    '`{"a": "b"}`',
+    "'foo'",
+    "'\\''",
+    "@",
+    "abs(foo)",
+    "length(people)",
+    "sort_by(people, &age)[0].name",
+    "max_by(people, &age).name",
+    "map(&foo, bar)",
+    "to_number('10')",
+    "contains(`\"foobar\"`, 'foo')",
+    "join(', ', names)",
+    "not_null(unknown_key, foo.bar, '')",
+    "sort(keys(@))",
+    "people[?contains(name, 'a')].name | sort(@) | join(', ', @)",
+    "{name: name, count: length(items)}",
+    'merge(`{"a": 1}`, `{"b": 2}`)',
+    "a.b.c.d.e.f.g.h.i.j",
+    "locations[?state == 'WA'].name | sort(@) | {WashingtonCities: join(', ', @)}",
+]
@@ -0,0 +1,178 @@
+import datetime
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+import typing
+
+from tree_tools.src import jtt_tree
+from tree_tools.src.jtt_query import parsing, queries
+from tree_tools.benchmarks import generators, grammar_examples
+
+
+DEFAULT_SIZES = (100, 1000, 10000)
+DEFAULT_REPEATS = 5
+DEFAULT_THRESHOLD = 0.2
+# query lists benchmarked for parse throughput alone, without a document
+QUERY_SUITES: typing.Dict[str, typing.List[str]] = {
+    "grammar": grammar_examples.EXAMPLES,
+}
+SUITES = (*generators.DOCUMENTS, *QUERY_SUITES)
+# passes over a query suite per timed run, so that a run lasts long enough to time
+QUERY_SUITE_PASSES = 20
+
+
+def time_call(
+    function: typing.Callable[[], typing.Any], repeats: int
+) -> typing.Dict[str, float]:
+    """
+    Time function over repeats runs, returning the minimum and median in seconds.
+    """
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return {"min": min(timings), "median": statistics.median(timings)}
+
+
+def peak_memory(function: typing.Callable[[], typing.Any]) -> int:
+    """
+    Returns the peak number of bytes allocated by a single run of function.
+    """
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(
+    function: typing.Callable[[], typing.Any], repeats: int
+) -> typing.Dict[str, float]:
+    result = time_call(function, repeats)
+    result["peak_bytes"] = peak_memory(function)
+    return result
+
+
+def benchmark_document(
+    name: str, size: int, repeats: int
+) -> typing.Dict[str, typing.Dict[str, float]]:
+    """
+    Benchmark the hot paths on one generated document.
+    Each step reuses the output of the previous one, so only the step itself is timed.
+    """
+    generate, make_query = generators.DOCUMENTS[name]
+    data = generate(size)
+    query = make_query(size)
+    tree = jtt_tree.create_tree(data)
+    chain = parsing.JMESPathParser().parse(query)
+    result = queries.QueryProcessor(tree, chain).execute()
+
+    return {
+        "create_tree": measure(lambda: jtt_tree.create_tree(data), repeats),
+        "parse": measure(lambda: parsing.JMESPathParser().parse(query), repeats),
+        "execute": measure(
+            lambda: queries.QueryProcessor(tree, chain).execute(), repeats
+        ),
+        "serialize_tree": measure(tree.serialize, repeats),
+        "serialize_result": measure(result.serialize, repeats),
+    }
+
+
+def benchmark_queries(
+    name: str, repeats: int
+) -> typing.Dict[str, typing.Dict[str, float]]:
+    """
+    Benchmark parsing every query of a query suite with a fresh parser, as the parse
+    step of a document does. The timings cover QUERY_SUITE_PASSES passes over the list.
+    """
+    query_list = QUERY_SUITES[name]
+
+    def parse_all() -> None:
+        for _ in range(QUERY_SUITE_PASSES):
+            for query in query_list:
+                parsing.JMESPathParser().parse(query)
+
+    return {"parse": measure(parse_all, repeats)}
+
+
+def run(
+    documents: typing.Iterable[str] = SUITES,
+    sizes: typing.Iterable[int] = DEFAULT_SIZES,
+    repeats: int = DEFAULT_REPEATS,
+) -> typing.Dict[str, typing.Any]:
+    """
+    Run the benchmark suite and return the results with the environment they came from.
+    Results are keyed by "document/size/step", so two runs compare entry by entry.
+    Query suites are keyed by their name and number of queries instead, and do not
+    depend on sizes.
+
+    Args:
+        documents: The names of the generated documents and query suites to benchmark.
+        sizes: The document sizes to benchmark.
+        repeats: The number of timed runs of each step.
+    """
+    results = {}
+    for name in documents:
+        if name in QUERY_SUITES:
+            size = len(QUERY_SUITES[name])
+            for step, measurement in benchmark_queries(name, repeats).items():
+                results[f"{name}/{size}/{step}"] = measurement
+            continue
+        for size in sizes:
+            for step, measurement in benchmark_document(name, size, repeats).items():
+                results[f"{name}/{size}/{step}"] = measurement
+    return {
+        "metadata": {
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "repeats": repeats,
+        },
+        "results": results,
+    }
+
+
+def compare(
+    baseline: typing.Dict[str, typing.Any],
+    current: typing.Dict[str, typing.Any],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> typing.List[str]:
+    """
+    Compare two runs and describe every entry whose minimum time or peak memory grew by
+    more than threshold, as a fraction of the baseline. Entries missing from either run
+    are ignored.
+
+    Args:
+        baseline: The results of a previous run.
+        current: The results of this run.
+        threshold: The tolerated relative growth.
+    """
+    regressions = []
+    for entry, measurement in current["results"].items():
+        reference = baseline["results"].get(entry)
+        if reference is None:
+            continue
+        for metric in ("min", "peak_bytes"):
+            before, after = reference[metric], measurement[metric]
+            if before > 0 and (after - before) / before > threshold:
+                regressions.append(
+                    f"{entry} {metric}: {before:.6g} -> {after:.6g}"
+                    f" (+{(after - before) / before:.0%})"
+                )
+    return regressions
+
+
+def save(results: typing.Dict[str, typing.Any], path: str) -> None:
+    with open(path, "w") as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+
+
+def load(path: str) -> typing.Dict[str, typing.Any]:
+    with open(path) as file:
+        return json.load(file)
@@ -0,0 +1,172 @@
+import asyncio
+import concurrent.futures
+import weakref
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from tree_tools.src import jtt_tree, search
+
+
+DEFAULT_YIELD_EVERY = 256
+
+T = TypeVar("T")
+
+
+def _search(query: str, data: Any) -> Any:
+    """
+    Build the tree, evaluate the query and serialize the result, in the executor.
+    """
+    return search.compile(query).search(data)
+
+
+def _execute(
+    query: str, tree: jtt_tree.TreeNode, limit: Optional[int]
+) -> jtt_tree.TreeNode:
+    return search.compile(query).execute(tree, limit)
+
+
+class AsyncQueryProcessor:
+    """
+    This class evaluates queries from asyncio code without blocking the event loop.
+    search() and execute() run tree building, evaluation and serialization in an
+    executor: the loop's default thread pool unless another one is given. A process pool
+    moves the work off the interpreter entirely, at the cost of pickling the data and the
+    result; searches then take decoded JSON rather than trees.
+    At most max_concurrency calls run in the executor at a time, the others wait on the
+    loop, so many searches can be awaited at once without flooding the executor.
+    iter_results() instead evaluates on the loop itself and hands control back to the
+    loop every yield_every results, for callers that consume results as they come.
+    """
+
+    executor: Optional[concurrent.futures.Executor]
+    max_concurrency: Optional[int]
+    yield_every: int
+
+    def __init__(
+        self,
+        executor: Optional[concurrent.futures.Executor] = None,
+        max_concurrency: Optional[int] = None,
+        yield_every: int = DEFAULT_YIELD_EVERY,
+    ) -> None:
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if yield_every < 1:
+            raise ValueError("yield_every must be at least 1")
+        self.executor = executor
+        self.max_concurrency = max_concurrency
+        self.yield_every = yield_every
+        # one semaphore per event loop, since older Pythons bind them to a loop
+        self.semaphores = weakref.WeakKeyDictionary()
+
+    def semaphore(self) -> Optional[asyncio.Semaphore]:
+        if self.max_concurrency is None:
+            return None
+        loop = asyncio.get_running_loop()
+        semaphore = self.semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self.semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """
+        Call a function in the executor, waiting for a free slot first.
+
+        Args:
+            func: The function to call, picklable if the executor is a process pool.
+            args: The positional arguments to pass.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = self.semaphore()
+        if semaphore is None:
+            return await loop.run_in_executor(self.executor, func, *args)
+        async with semaphore:
+            return await loop.run_in_executor(self.executor, func, *args)
+
+    async def search(self, query: str, data: Any) -> Any:
+        """
+        Evaluate a query against a decoded JSON object or a tree in the executor and
+        return the serialized result, like jmespath_search.
+
+        Args:
+            query: The JMESPath query string to use.
+            data: The decoded JSON object, or an already built TreeNode.
+        """
+        return await self.run(_search, query, data)
+
+    async def execute(
+        self, query: str, tree: jtt_tree.TreeNode, limit: Optional[int] = None
+    ) -> jtt_tree.TreeNode:
+        """
+        Evaluate a query against a tree in the executor and return the resulting node.
+        Only useful with thread executors, since the result shares nodes with the tree.
+
+        Args:
+            query: The JMESPath query string to use.
+            tree: The TreeNode to search.
+            limit: The maximum number of projected elements to collect.
+        """
+        return await self.run(_execute, query, tree, limit)
+
+    async def search_many(self, requests: Iterable[Tuple[str, Any]]) -> List[Any]:
+        """
+        Run several searches concurrently, within max_concurrency, and return their
+        results in order. The first failure is raised once every search has finished.
+
+        Args:
+            requests: Pairs of a JMESPath query string and the data to search.
+        """
+        tasks = [self.search(query, data) for query, data in requests]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return results
+
+    async def iter_results(
+        self, query: str, tree: jtt_tree.TreeNode, limit: Optional[int] = None
+    ) -> AsyncIterator[jtt_tree.TreeNode]:
+        """
+        Yield the results of a query one at a time, see QueryProcessor.iter_results.
+        The traversal runs on the event loop, which gets control back every yield_every
+        results; elements skipped by a filter do not count, so prefer search() for
+        selective filters over large collections.
+
+        Args:
+            query: The JMESPath query string to use.
+            tree: The TreeNode to search.
+            limit: The maximum number of results to produce.
+        """
+        results = search.compile(query).processor(tree).iter_results(limit)
+        for count, result in enumerate(results, 1):
+            yield result
+            if count % self.yield_every == 0:
+                await asyncio.sleep(0)
+
+
+async def async_search(
+    query: str,
+    data: Any,
+    executor: Optional[concurrent.futures.Executor] = None,
+) -> Any:
+    """
+    This function searches like jmespath_search from asyncio code: building the tree,
+    evaluating the query and serializing the result run in an executor, so the event
+    loop keeps serving other tasks meanwhile. See AsyncQueryProcessor.
+
+    Args:
+        query: The JMESPath query string to use.
+        data: The decoded JSON object, or an already built TreeNode.
+        executor: The executor to run in, the loop's default thread pool if None.
+
+    Returns:
+        The serialized result of the query.
+    """
+    return await AsyncQueryProcessor(executor).search(query, data)
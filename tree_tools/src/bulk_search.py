@@ -0,0 +1,180 @@
+import collections
+import concurrent.futures
+import functools
+import itertools
+import json
+import os
+from typing import Any, Deque, IO, Iterable, Iterator, List, Optional, Union
+
+from tree_tools.src import search
+from tree_tools.src.jtt_query import queries
+
+
+BACKENDS = ("process", "thread", "serial")
+DEFAULT_CHUNK_SIZE = 256
+
+_worker_query: Optional[queries.CompiledQuery] = None
+
+
+def _initialize_worker(query: str) -> None:
+    """
+    Compile the query once when a worker process starts.
+    """
+    global _worker_query
+    _worker_query = search.compile(query)
+
+
+def _search_chunk(
+    documents: List[Any],
+    decode: bool,
+    compiled: Optional[queries.CompiledQuery] = None,
+) -> List[Any]:
+    """
+    Run the worker's compiled query over a chunk of documents.
+    NDJSON lines are decoded here so that decoding also runs in parallel.
+    """
+    compiled = compiled or _worker_query
+    if decode:
+        documents = [json.loads(document) for document in documents]
+    return [compiled.search(document) for document in documents]
+
+
+def _chunks(documents: Iterable[Any], chunk_size: int) -> Iterator[List[Any]]:
+    iterator = iter(documents)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _check_backend(backend: str) -> None:
+    if backend not in BACKENDS:
+        raise ValueError(f"Invalid backend: {backend}, expected one of {BACKENDS}")
+
+
+def _search_ndjson_lines(
+    query: str,
+    source: Union[str, IO[str]],
+    backend: str,
+    workers: Optional[int],
+    chunk_size: int,
+    max_pending_chunks: Optional[int],
+) -> Iterator[Any]:
+    if isinstance(source, str):
+        with open(source) as fileobj:
+            yield from _search_ndjson_lines(
+                query, fileobj, backend, workers, chunk_size, max_pending_chunks
+            )
+        return
+
+    lines = (line for line in source if line.strip())
+    yield from _search_chunks(
+        query, _chunks(lines, chunk_size), True, backend, workers, max_pending_chunks
+    )
+
+
+def _search_chunks(
+    query: str,
+    chunks: Iterator[List[Any]],
+    decode: bool,
+    backend: str,
+    workers: Optional[int],
+    max_pending_chunks: Optional[int],
+) -> Iterator[Any]:
+    # Compiled here on every backend, so an invalid query raises its parse error
+    # instead of failing in each worker process and breaking the pool.
+    compiled = search.compile(query)
+    if backend == "serial":
+        for chunk in chunks:
+            yield from _search_chunk(chunk, decode, compiled)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    if backend == "process":
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=_initialize_worker, initargs=(query,)
+        )
+        task = functools.partial(_search_chunk, decode=decode)
+    else:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        task = functools.partial(_search_chunk, decode=decode, compiled=compiled)
+
+    # Only a bounded number of chunks are in flight at a time, so a slow consumer
+    # or a huge input never queues the whole input in memory.
+    max_pending_chunks = max_pending_chunks or 2 * workers
+    pending: Deque[concurrent.futures.Future] = collections.deque()
+    with executor:
+        try:
+            for chunk in chunks:
+                pending.append(executor.submit(task, chunk))
+                if len(pending) >= max_pending_chunks:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def bulk_search(
+    query: str,
+    documents: Iterable[Any],
+    backend: str = "process",
+    workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_pending_chunks: Optional[int] = None,
+) -> Iterator[Any]:
+    """
+    Evaluate one JMESPath query against many documents in parallel.
+    Documents are sent to the workers in chunks and results are yielded in input order.
+    The query is compiled once per worker rather than once per document.
+
+    Args:
+        query: The JMESPath query string to use.
+        documents: An iterable of decoded JSON objects.
+        backend: "process" for a process pool, "thread" for a thread pool, or
+            "serial" to run in the calling thread.
+        workers: The number of workers, defaulting to the number of CPUs.
+        chunk_size: The number of documents sent to a worker at a time.
+        max_pending_chunks: The number of chunks allowed in flight before waiting on
+            results, defaulting to twice the number of workers.
+
+    Returns:
+        An iterator over the serialized result of each document.
+    """
+    _check_backend(backend)
+    return _search_chunks(
+        query,
+        _chunks(documents, chunk_size),
+        False,
+        backend,
+        workers,
+        max_pending_chunks,
+    )
+
+
+def bulk_search_ndjson(
+    query: str,
+    source: Union[str, IO[str]],
+    backend: str = "process",
+    workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_pending_chunks: Optional[int] = None,
+) -> Iterator[Any]:
+    """
+    Evaluate one JMESPath query against every document of an NDJSON file in parallel.
+    Lines are decoded by the workers and blank lines are skipped.
+    See bulk_search for the remaining arguments.
+
+    Args:
+        query: The JMESPath query string to use.
+        source: A path to an NDJSON file, or an open text file object.
+
+    Returns:
+        An iterator over the serialized result of each line.
+    """
+    _check_backend(backend)
+    return _search_ndjson_lines(
+        query, source, backend, workers, chunk_size, max_pending_chunks
+    )
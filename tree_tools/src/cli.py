@@ -0,0 +1,78 @@
+import asyncio
+import typing
+
+import click
+
+from tree_tools.src import jtt_server
+
+
+def parse_documents(
+    ctx: click.Context, param: click.Parameter, values: typing.Tuple[str, ...]
+) -> typing.Dict[str, str]:
+    documents = {}
+    for value in values:
+        name, separator, path = value.partition("=")
+        if not separator or not name or not path:
+            raise click.BadParameter(f"expected NAME=PATH, got {value!r}")
+        documents[name] = path
+    return documents
+
+
+@click.group()
+def main() -> None:
+    """JSON Tree Tools."""
+
+
+@main.command()
+@click.argument("documents", nargs=-1, required=True, callback=parse_documents)
+@click.option("--socket", "socket_path", help="Listen on this Unix domain socket.")
+@click.option("--host", default="127.0.0.1", show_default=True, help="TCP host.")
+@click.option("--port", type=int, help="Listen on this TCP port.")
+def serve(
+    documents: typing.Dict[str, str],
+    socket_path: typing.Optional[str],
+    host: str,
+    port: typing.Optional[int],
+) -> None:
+    """
+    Load DOCUMENTS, given as NAME=PATH, and answer queries against them.
+    Files ending with .jttb are mapped in the JTT binary format.
+    """
+    if (socket_path is None) == (port is None):
+        raise click.UsageError("Pass exactly one of --socket or --port.")
+    server = jtt_server.QueryServer.from_paths(documents)
+    address = socket_path or f"{host}:{port}"
+    click.echo(f"Serving {', '.join(sorted(documents))} on {address}", err=True)
+    try:
+        asyncio.run(server.serve_forever(socket_path, host, port or 0))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+@main.command()
+@click.argument("document")
+@click.argument("query")
+@click.option("--socket", "socket_path", help="Connect to this Unix domain socket.")
+@click.option("--host", default="127.0.0.1", show_default=True, help="TCP host.")
+@click.option("--port", type=int, help="Connect to this TCP port.")
+def query(
+    document: str,
+    query: str,
+    socket_path: typing.Optional[str],
+    host: str,
+    port: typing.Optional[int],
+) -> None:
+    """
+    Evaluate QUERY against DOCUMENT on a running server and print the JSON result.
+    """
+    if (socket_path is None) == (port is None):
+        raise click.UsageError("Pass exactly one of --socket or --port.")
+    try:
+        with jtt_server.QueryClient(socket_path, host, port) as client:
+            click.echo(client.query_text(document, query))
+    except jtt_server.QueryServerError as error:
+        raise click.ClickException(str(error))
+    except OSError as error:
+        raise click.ClickException(f"Cannot reach the server: {error}")
@@ -0,0 +1,356 @@
+import array
+import typing
+from abc import ABC, abstractmethod
+from collections import abc
+
+from tree_tools.src import jtt_tree
+from tree_tools.src.jtt_tree import NodeType
+
+
+TYPE_TAGS = {
+    NodeType.NULL: 0,
+    NodeType.STRING: 1,
+    NodeType.NUMBER: 2,
+    NodeType.BOOLEAN: 3,
+    NodeType.ARRAY: 4,
+    NodeType.OBJECT: 5,
+}
+TAG_TYPES = {tag: node_type for node_type, tag in TYPE_TAGS.items()}
+
+TAG_NULL = TYPE_TAGS[NodeType.NULL]
+TAG_STRING = TYPE_TAGS[NodeType.STRING]
+TAG_NUMBER = TYPE_TAGS[NodeType.NUMBER]
+TAG_BOOLEAN = TYPE_TAGS[NodeType.BOOLEAN]
+TAG_ARRAY = TYPE_TAGS[NodeType.ARRAY]
+TAG_OBJECT = TYPE_TAGS[NodeType.OBJECT]
+
+NO_PARENT = -1
+
+
+class ArenaBase(ABC):
+    """
+    Navigation shared by every arena layout.
+    Nodes are addressed by their pre-order offset, and subclasses provide the per-node
+    accessors: type_tag, descendant_count, key and payload.
+    The child offsets of a container are computed the first time one of its children is
+    looked up or it is measured, and cached, so later lookups do not walk its children
+    again.
+    """
+
+    __slots__ = ("child_offset_cache",)
+
+    child_offset_cache: typing.Dict[int, array.array]
+
+    def __init__(self) -> None:
+        self.child_offset_cache = {}
+
+    @abstractmethod
+    def type_tag(self, offset: int) -> int:
+        pass
+
+    @abstractmethod
+    def descendant_count(self, offset: int) -> int:
+        pass
+
+    @abstractmethod
+    def key(self, offset: int) -> typing.Optional[str]:
+        pass
+
+    @abstractmethod
+    def payload(self, offset: int) -> typing.Any:
+        pass
+
+    def children(self, offset: int) -> typing.Iterator[int]:
+        """
+        Yield the offsets of the direct children of a container node.
+        """
+        child = offset + 1
+        end = offset + self.descendant_count(offset) + 1
+        while child < end:
+            yield child
+            child += self.descendant_count(child) + 1
+
+    def child_offsets(self, offset: int) -> array.array:
+        """
+        Returns the offsets of the direct children of a container node, in order.
+        """
+        offsets = self.child_offset_cache.get(offset)
+        if offsets is None:
+            offsets = self.child_offset_cache[offset] = array.array(
+                "q", self.children(offset)
+            )
+        return offsets
+
+    def child_count(self, offset: int) -> int:
+        """
+        Returns the number of direct children of a container node.
+        """
+        return len(self.child_offsets(offset))
+
+    def find_child(self, offset: int, key: str) -> int:
+        """
+        Return the offset of the child stored under key in an object node, or -1.
+        """
+        for child in self.child_offsets(offset):
+            if self.key(child) == key:
+                return child
+        return -1
+
+    def serialize(self, offset: int = 0) -> typing.Any:
+        """
+        Rebuild the decoded JSON value of the subtree at offset.
+        The subtree occupies a contiguous range, so a single forward pass suffices;
+        open containers are kept on a stack together with the offset where they end.
+        """
+        tag = self.type_tag(offset)
+        if tag != TAG_OBJECT and tag != TAG_ARRAY:
+            return self.payload(offset)
+
+        root = {} if tag == TAG_OBJECT else []
+        end = offset + self.descendant_count(offset) + 1
+        stack = [(root, end)]
+        for i in range(offset + 1, end):
+            while i >= stack[-1][1]:
+                stack.pop()
+            parent = stack[-1][0]
+            tag = self.type_tag(i)
+            if tag == TAG_OBJECT:
+                value = {}
+            elif tag == TAG_ARRAY:
+                value = []
+            else:
+                value = self.payload(i)
+            if type(parent) == list:
+                parent.append(value)
+            else:
+                parent[self.key(i)] = value
+            if tag == TAG_OBJECT or tag == TAG_ARRAY:
+                stack.append((value, i + self.descendant_count(i) + 1))
+        return root
+
+
+class TreeArena(ArenaBase):
+    """
+    Compact, column-oriented storage for a whole JSON tree.
+    Nodes are stored in pre-order in parallel columns:
+    - types: type tag of the node
+    - parents: offset of the parent node, -1 for the root
+    - descendants: number of total descendants of the node
+    - child_counts: number of direct children of the node
+    - keys: key of the node within its parent object, None otherwise
+    - payloads: scalar value of the node, None for containers
+
+    Because the layout is pre-order, the first child of a container at offset i is at
+    i + 1, and the next sibling of a node at offset j is at j + descendants[j] + 1.
+    """
+
+    __slots__ = ("types", "parents", "descendants", "child_counts", "keys", "payloads")
+
+    types: array.array
+    parents: array.array
+    descendants: array.array
+    child_counts: array.array
+    keys: typing.List[typing.Optional[str]]
+    payloads: typing.List[typing.Any]
+
+    def __init__(self) -> None:
+        self.types = array.array("B")
+        self.parents = array.array("q")
+        self.descendants = array.array("q")
+        self.child_counts = array.array("q")
+        self.keys = []
+        self.payloads = []
+        super().__init__()
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def append(
+        self, tag: int, key: typing.Optional[str], payload: typing.Any, parent: int
+    ) -> int:
+        """
+        Append a node to the arena and return its offset.
+        Descendant and child counts are filled in by close_counts once all nodes are
+        appended.
+        """
+        self.types.append(tag)
+        self.parents.append(parent)
+        self.descendants.append(0)
+        self.child_counts.append(0)
+        self.keys.append(key)
+        self.payloads.append(payload)
+        return len(self.types) - 1
+
+    def close_counts(self) -> None:
+        """
+        Compute the descendant and child counts of every node in a single reverse pass.
+        Children always follow their parent in pre-order, so each count is final
+        by the time it is added to the parent.
+        """
+        parents = self.parents
+        descendants = self.descendants
+        child_counts = self.child_counts
+        for i in range(len(parents) - 1, 0, -1):
+            parent = parents[i]
+            descendants[parent] += descendants[i] + 1
+            child_counts[parent] += 1
+
+    @classmethod
+    def from_data(cls, data: typing.Any) -> "TreeArena":
+        """
+        Build an arena from a decoded JSON value.
+
+        Args:
+            data: The decoded JSON value.
+        """
+        arena = cls()
+        stack = [(data, None, NO_PARENT)]
+        while stack:
+            value, key, parent = stack.pop()
+            if type(value) == dict:
+                offset = arena.append(TAG_OBJECT, key, None, parent)
+                items = list(value.items())
+                for k, v in reversed(items):
+                    stack.append((v, k, offset))
+            elif type(value) == list:
+                offset = arena.append(TAG_ARRAY, key, None, parent)
+                for v in reversed(value):
+                    stack.append((v, None, offset))
+            elif value is None:
+                arena.append(TAG_NULL, key, None, parent)
+            elif type(value) == str:
+                arena.append(TAG_STRING, key, value, parent)
+            elif type(value) == int or type(value) == float:
+                arena.append(TAG_NUMBER, key, value, parent)
+            elif type(value) == bool:
+                arena.append(TAG_BOOLEAN, key, value, parent)
+            else:
+                raise TypeError(f"Invalid type: {type(value)} for value {value}")
+        arena.close_counts()
+        return arena
+
+    def type_tag(self, offset: int) -> int:
+        return self.types[offset]
+
+    def descendant_count(self, offset: int) -> int:
+        return self.descendants[offset]
+
+    def key(self, offset: int) -> typing.Optional[str]:
+        return self.keys[offset]
+
+    def payload(self, offset: int) -> typing.Any:
+        return self.payloads[offset]
+
+    def parent(self, offset: int) -> int:
+        return self.parents[offset]
+
+    def child_count(self, offset: int) -> int:
+        return self.child_counts[offset]
+
+
+class ArenaObjectValue(abc.Mapping):
+    """
+    Read-only mapping view over the children of an object node in an arena.
+    """
+
+    __slots__ = ("arena", "offset")
+
+    def __init__(self, arena: ArenaBase, offset: int) -> None:
+        self.arena = arena
+        self.offset = offset
+
+    def __getitem__(self, key: str) -> "ArenaTreeNode":
+        child = self.arena.find_child(self.offset, key)
+        if child < 0:
+            raise KeyError(key)
+        return ArenaTreeNode(self.arena, child)
+
+    def __iter__(self) -> typing.Iterator[str]:
+        for child in self.arena.children(self.offset):
+            yield self.arena.key(child)
+
+    def __len__(self) -> int:
+        return self.arena.child_count(self.offset)
+
+
+class ArenaListValue(abc.Sequence):
+    """
+    Read-only sequence view over the children of an array node in an arena.
+    Indexing goes through the child offsets cached in the arena, so it takes constant
+    time once the array has been indexed into.
+    """
+
+    __slots__ = ("arena", "offset")
+
+    def __init__(self, arena: ArenaBase, offset: int) -> None:
+        self.arena = arena
+        self.offset = offset
+
+    def __getitem__(self, index):
+        offsets = self.arena.child_offsets(self.offset)
+        if isinstance(index, slice):
+            return [ArenaTreeNode(self.arena, child) for child in offsets[index]]
+        try:
+            return ArenaTreeNode(self.arena, offsets[index])
+        except IndexError:
+            raise IndexError("list index out of range") from None
+
+    def __iter__(self) -> typing.Iterator["ArenaTreeNode"]:
+        for child in self.arena.children(self.offset):
+            yield ArenaTreeNode(self.arena, child)
+
+    def __len__(self) -> int:
+        return self.arena.child_count(self.offset)
+
+
+class ArenaTreeNode(jtt_tree.TreeNode):
+    """
+    Lightweight view of a single node stored in a TreeArena.
+    Views are created on access and hold nothing but the arena and an offset,
+    so they can be used anywhere a TreeNode is read.
+    """
+
+    __slots__ = ("arena", "offset")
+
+    def __init__(self, arena: ArenaBase, offset: int = 0) -> None:
+        self.arena = arena
+        self.offset = offset
+
+    @property
+    def type(self) -> NodeType:
+        return TAG_TYPES[self.arena.type_tag(self.offset)]
+
+    @property
+    def descendant_count(self) -> int:
+        return self.arena.descendant_count(self.offset)
+
+    @property
+    def value(self) -> typing.Any:
+        tag = self.arena.type_tag(self.offset)
+        if tag == TAG_OBJECT:
+            return ArenaObjectValue(self.arena, self.offset)
+        elif tag == TAG_ARRAY:
+            return ArenaListValue(self.arena, self.offset)
+        return self.arena.payload(self.offset)
+
+    def __repr__(self) -> str:
+        return jtt_tree.TreeNode.repr_object.repr(self.serialize())
+
+    def serialize(self) -> typing.Any:
+        """
+        Serialize the subtree straight from the arena columns.
+        """
+        return self.arena.serialize(self.offset)
+
+
+def create_arena_tree(data: typing.Dict[str, typing.Any]) -> ArenaTreeNode:
+    """
+    Build a compact arena-backed tree from a decoded JSON object.
+    Returns a view of the root node.
+
+    Args:
+        data: The decoded JSON object.
+    """
+    if type(data) != dict:
+        raise ValueError(f"Invalid type: {type(data)} for value {data}")
+    return ArenaTreeNode(TreeArena.from_data(data))
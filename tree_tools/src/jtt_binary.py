@@ -0,0 +1,333 @@
+import array
+import mmap
+import struct
+import sys
+import typing
+
+from tree_tools.src import jtt_arena, jtt_tree
+from tree_tools.src.jtt_arena import (
+    TAG_NULL,
+    TAG_STRING,
+    TAG_NUMBER,
+    TAG_BOOLEAN,
+    TAG_ARRAY,
+    TAG_OBJECT,
+)
+from tree_tools.src.jtt_tree import NodeType
+
+
+MAGIC = b"JTTB"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHHqqq")
+
+# On disk, numbers are split by representation; everything else uses the arena tags.
+TAG_FLOAT = 6
+TAG_BIG_INTEGER = 7
+NO_KEY = 0xFFFFFFFF
+INT64_MIN = -(2**63)
+INT64_MAX = 2**63 - 1
+
+
+class BinaryFormatError(Exception):
+    pass
+
+
+def pad(length: int) -> int:
+    """
+    Returns the number of bytes needed to align length to 8 bytes.
+    """
+    return -length % 8
+
+
+class StringTable:
+    """
+    Interns strings while a tree is written, assigning each distinct string an id.
+    """
+
+    __slots__ = ("ids", "strings")
+
+    def __init__(self) -> None:
+        self.ids = {}
+        self.strings = []
+
+    def intern(self, value: str) -> int:
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+    def encode(self) -> typing.Tuple[array.array, bytes]:
+        """
+        Returns the offsets table (one entry per string plus the end) and the UTF-8 blob.
+        """
+        offsets = array.array("q", [0])
+        blobs = []
+        for value in self.strings:
+            blob = value.encode("utf-8", "surrogatepass")
+            blobs.append(blob)
+            offsets.append(offsets[-1] + len(blob))
+        return offsets, b"".join(blobs)
+
+
+def dump_binary(tree: jtt_tree.TreeNode, fileobj: typing.BinaryIO) -> None:
+    """
+    Write a tree to a binary file object in the memory-mappable JTT format.
+    The layout is a fixed header followed by 8 byte aligned sections:
+    - descendant counts, one int64 per node in pre-order
+    - payloads, 8 bytes per node: int64, float64, bool or a string id depending on the tag
+    - key ids, one uint32 per node, NO_KEY outside objects
+    - type tags, one byte per node
+    - the offsets table and UTF-8 blob of the interned keys
+    - the offsets table and UTF-8 blob of the interned string values
+    Keys are kept apart from values so that readers can decode every key up front.
+
+    Args:
+        tree: The TreeNode to write, of any node implementation.
+        fileobj: A file object opened for binary writing.
+    """
+    keys = StringTable()
+    strings = StringTable()
+    tags = array.array("B")
+    key_ids = array.array("I")
+    descendants = array.array("q")
+    payloads = bytearray()
+
+    stack = [(tree, None)]
+    while stack:
+        node, key = stack.pop()
+        key_ids.append(NO_KEY if key is None else keys.intern(key))
+        descendants.append(node.descendant_count)
+        node_type = node.type
+        if node_type == NodeType.OBJECT:
+            tags.append(TAG_OBJECT)
+            payloads += bytes(8)
+            stack.extend(
+                (child, child_key)
+                for child_key, child in reversed(list(node.value.items()))
+            )
+        elif node_type == NodeType.ARRAY:
+            tags.append(TAG_ARRAY)
+            payloads += bytes(8)
+            stack.extend((child, None) for child in reversed(list(node.value)))
+        elif node_type == NodeType.STRING:
+            tags.append(TAG_STRING)
+            payloads += struct.pack("<q", strings.intern(node.value))
+        elif node_type == NodeType.BOOLEAN:
+            tags.append(TAG_BOOLEAN)
+            payloads += struct.pack("<q", int(node.value))
+        elif node_type == NodeType.NULL:
+            tags.append(TAG_NULL)
+            payloads += bytes(8)
+        elif type(node.value) == float:
+            tags.append(TAG_FLOAT)
+            payloads += struct.pack("<d", node.value)
+        elif INT64_MIN <= node.value <= INT64_MAX:
+            tags.append(TAG_NUMBER)
+            payloads += struct.pack("<q", node.value)
+        else:
+            tags.append(TAG_BIG_INTEGER)
+            payloads += struct.pack("<q", strings.intern(str(node.value)))
+
+    if sys.byteorder != "little":
+        key_ids.byteswap()
+        descendants.byteswap()
+    key_offsets, key_blob = keys.encode()
+    string_offsets, string_blob = strings.encode()
+    if sys.byteorder != "little":
+        key_offsets.byteswap()
+        string_offsets.byteswap()
+
+    fileobj.write(
+        HEADER.pack(
+            MAGIC, FORMAT_VERSION, 0, len(tags), len(keys.strings), len(strings.strings)
+        )
+    )
+    for section in (
+        descendants.tobytes(),
+        bytes(payloads),
+        key_ids.tobytes(),
+        tags.tobytes(),
+        key_offsets.tobytes(),
+        key_blob,
+        string_offsets.tobytes(),
+        string_blob,
+    ):
+        fileobj.write(section)
+        fileobj.write(bytes(pad(len(section))))
+
+
+class MappedArena(jtt_arena.ArenaBase):
+    """
+    Arena reading the JTT binary format in place from any buffer, typically an mmap.
+    Columns are memoryview casts over the buffer, so nothing is decoded up front except
+    the key table; string values are decoded only when a node is read.
+    Several processes mapping the same file share one page-cached copy.
+    """
+
+    __slots__ = (
+        "buffer",
+        "node_count",
+        "descendants",
+        "integers",
+        "floats",
+        "key_ids",
+        "tags",
+        "keys",
+        "key_lookup",
+        "string_offsets",
+        "string_blob",
+    )
+
+    def __init__(self, buffer: typing.Any) -> None:
+        super().__init__()
+        self.buffer = buffer
+        view = memoryview(buffer).cast("B")
+        if len(view) < HEADER.size:
+            raise BinaryFormatError("Buffer is too small to hold a JTT header")
+        magic, version, _, node_count, key_count, string_count = HEADER.unpack_from(
+            view
+        )
+        if magic != MAGIC:
+            raise BinaryFormatError("Buffer does not hold a JTT binary tree")
+        if version != FORMAT_VERSION:
+            raise BinaryFormatError(f"Unsupported JTT format version: {version}")
+        if sys.byteorder != "little":
+            raise BinaryFormatError("Mapping JTT files requires a little-endian host")
+
+        position = HEADER.size
+
+        def section(size: int) -> memoryview:
+            nonlocal position
+            start = position
+            if start + size > len(view):
+                raise BinaryFormatError("Buffer is truncated")
+            position += size + pad(size)
+            return view[start : start + size]
+
+        self.node_count = node_count
+        self.descendants = section(8 * node_count).cast("q")
+        payloads = section(8 * node_count)
+        self.integers = payloads.cast("q")
+        self.floats = payloads.cast("d")
+        self.key_ids = section(4 * node_count).cast("I")
+        self.tags = section(node_count)
+        key_offsets = section(8 * (key_count + 1)).cast("q")
+        key_blob = section(key_offsets[-1])
+        self.string_offsets = section(8 * (string_count + 1)).cast("q")
+        self.string_blob = section(self.string_offsets[-1])
+
+        self.keys = [
+            str(key_blob[key_offsets[i] : key_offsets[i + 1]], "utf-8", "surrogatepass")
+            for i in range(key_count)
+        ]
+        self.key_lookup = {key: key_id for key_id, key in enumerate(self.keys)}
+
+    def __len__(self) -> int:
+        return self.node_count
+
+    def string(self, string_id: int) -> str:
+        start = self.string_offsets[string_id]
+        end = self.string_offsets[string_id + 1]
+        return str(self.string_blob[start:end], "utf-8", "surrogatepass")
+
+    def type_tag(self, offset: int) -> int:
+        tag = self.tags[offset]
+        if tag == TAG_FLOAT or tag == TAG_BIG_INTEGER:
+            return TAG_NUMBER
+        return tag
+
+    def descendant_count(self, offset: int) -> int:
+        return self.descendants[offset]
+
+    def key(self, offset: int) -> typing.Optional[str]:
+        key_id = self.key_ids[offset]
+        return None if key_id == NO_KEY else self.keys[key_id]
+
+    def payload(self, offset: int) -> typing.Any:
+        tag = self.tags[offset]
+        if tag == TAG_NUMBER:
+            return self.integers[offset]
+        if tag == TAG_FLOAT:
+            return self.floats[offset]
+        if tag == TAG_STRING:
+            return self.string(self.integers[offset])
+        if tag == TAG_BOOLEAN:
+            return self.integers[offset] != 0
+        if tag == TAG_BIG_INTEGER:
+            return int(self.string(self.integers[offset]))
+        return None
+
+    def find_child(self, offset: int, key: str) -> int:
+        """
+        Return the offset of the child stored under key, comparing interned key ids.
+        """
+        key_id = self.key_lookup.get(key)
+        if key_id is None:
+            return -1
+        key_ids = self.key_ids
+        for child in self.child_offsets(offset):
+            if key_ids[child] == key_id:
+                return child
+        return -1
+
+
+class MappedTree:
+    """
+    A JTT binary file mapped into memory, exposing the root node as a TreeNode view.
+    Use as a context manager, or call close() once no views are in use any more.
+    """
+
+    path: str
+    root: jtt_arena.ArenaTreeNode
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.file = open(path, "rb")
+        try:
+            self.mapping = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.arena = MappedArena(self.mapping)
+        except Exception:
+            self.file.close()
+            raise
+        self.root = jtt_arena.ArenaTreeNode(self.arena)
+
+    def __enter__(self) -> "MappedTree":
+        return self
+
+    def __exit__(self, *exc_info: typing.Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Release the mapping and the file. Views over the tree cannot be used afterwards.
+        """
+        arena = self.arena
+        for column in (arena.descendants, arena.integers, arena.floats, arena.key_ids):
+            column.release()
+        for column in (arena.tags, arena.string_offsets, arena.string_blob):
+            column.release()
+        self.mapping.close()
+        self.file.close()
+
+
+def load_binary(buffer: typing.Any) -> jtt_arena.ArenaTreeNode:
+    """
+    Open a tree stored in the JTT binary format from an in-memory buffer.
+
+    Args:
+        buffer: A bytes-like object holding the file contents.
+    """
+    return jtt_arena.ArenaTreeNode(MappedArena(buffer))
+
+
+def open_binary(path: str) -> MappedTree:
+    """
+    Memory-map a tree stored in the JTT binary format.
+    The root view at MappedTree.root can be queried with QueryProcessor directly;
+    only the nodes that are read are ever decoded.
+
+    Args:
+        path: The path of the file written by dump_binary.
+    """
+    return MappedTree(path)
@@ -0,0 +1,191 @@
+import array
+import typing
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from tree_tools.src import jtt_tree, search
+from tree_tools.src.jtt_query import queries
+from tree_tools.src.jtt_tree import NodeType
+
+
+class ColumnError(Exception):
+    pass
+
+
+def require_numpy() -> None:
+    if numpy is None:
+        raise ImportError(
+            "numpy is required for column extraction, install tree-tools[numpy]"
+        )
+
+
+class Column:
+    """
+    A typed NumPy vector of one scalar field taken from every element of a list,
+    with a boolean mask marking the elements where the field was missing or null.
+    Aggregates only consider unmasked values and run vectorized in NumPy.
+    """
+
+    __slots__ = ("values", "mask")
+
+    values: "numpy.ndarray"
+    mask: "numpy.ndarray"
+
+    def __init__(self, values: "numpy.ndarray", mask: "numpy.ndarray") -> None:
+        self.values = values
+        self.mask = mask
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __repr__(self) -> str:
+        return f"Column({self.to_masked_array()!r})"
+
+    def valid(self) -> "numpy.ndarray":
+        """
+        Returns the unmasked values.
+        """
+        return self.values[~self.mask]
+
+    def count(self) -> int:
+        """
+        Returns the number of unmasked values.
+        """
+        return int(len(self.mask) - numpy.count_nonzero(self.mask))
+
+    def sum(self) -> typing.Any:
+        return self.valid().sum()
+
+    def min(self) -> typing.Any:
+        valid = self.valid()
+        return valid.min() if len(valid) else None
+
+    def max(self) -> typing.Any:
+        valid = self.valid()
+        return valid.max() if len(valid) else None
+
+    def mean(self) -> typing.Optional[float]:
+        valid = self.valid()
+        return valid.mean() if len(valid) else None
+
+    def to_masked_array(self) -> "numpy.ma.MaskedArray":
+        """
+        Returns the column as a numpy.ma.MaskedArray sharing the same buffers.
+        """
+        return numpy.ma.MaskedArray(self.values, mask=self.mask)
+
+
+def fill_column(
+    elements: typing.Iterable[jtt_tree.TreeNode],
+    field: typing.Optional[queries.QueryPlan],
+    dtype: typing.Any,
+) -> Column:
+    """
+    Resolve the field on every element and write the payloads straight into a typed buffer.
+    Values go into an array.array of machine numbers, so no Python list of boxed results
+    is built; the buffers are then handed to NumPy without copying.
+    Integers are written at the width of the dtype, so values out of its range raise
+    ColumnError instead of wrapping; floats narrower than float64 must not overflow.
+    """
+    require_numpy()
+    dtype = numpy.dtype(dtype)
+    if dtype.kind not in "biuf":
+        raise ColumnError(f"Invalid column dtype: {dtype}, expected a numeric dtype")
+    buffer = array.array(buffer_typecode(dtype))
+    mask = bytearray()
+    append_value = buffer.append
+    append_mask = mask.append
+
+    for element in elements:
+        node = field.evaluate(element) if field else element
+        if node is None or node.type == NodeType.NULL:
+            append_value(0)
+            append_mask(1)
+        elif node.type == NodeType.NUMBER or (
+            node.type == NodeType.BOOLEAN and dtype.kind == "b"
+        ):
+            try:
+                append_value(node.value)
+            except (TypeError, OverflowError) as error:
+                raise ColumnError(
+                    f"Value {node} does not fit a column of dtype {dtype}"
+                ) from error
+            append_mask(0)
+        else:
+            raise ColumnError(
+                f"Invalid type: {node.type} for value {node}, expected a number"
+            )
+
+    source = numpy.frombuffer(buffer, dtype=buffer.typecode)
+    with numpy.errstate(over="ignore"):
+        values = source.astype(dtype, copy=False)
+    if dtype.kind == "f" and values is not source:
+        overflow = numpy.isinf(values) & ~numpy.isinf(source)
+        if overflow.any():
+            raise ColumnError(
+                f"Value {source[overflow][0]} does not fit a column of dtype {dtype}"
+            )
+    return Column(values, numpy.frombuffer(mask, dtype=numpy.bool_))
+
+
+def buffer_typecode(dtype: typing.Any) -> str:
+    """
+    Returns the array.array typecode to fill a column of a NumPy dtype with.
+    """
+    if dtype.kind in "iu":
+        for typecode in "bhilq" if dtype.kind == "i" else "BHILQ":
+            if array.array(typecode).itemsize == dtype.itemsize:
+                return typecode
+    return "q" if dtype.kind in "biu" else "d"
+
+
+def extract_column(
+    tree: jtt_tree.TreeNode, query: str, dtype: typing.Any = "float64"
+) -> Column:
+    """
+    Evaluate a projection query such as pokemon[*].spawn_chance into a Column.
+    Unlike a regular projection, elements whose field is missing or null are kept as
+    masked entries, so positions line up with the projected elements.
+
+    Args:
+        tree: The TreeNode to search.
+        query: A query with a single projection, whose remaining operations select a
+            scalar field of each element.
+        dtype: The NumPy dtype of the column.
+    """
+    plan = search.compile(query).plan
+    if (
+        len(plan.stages) != 1
+        or (plan.stages[0][1] and plan.stages[0][1].stages)
+        or plan.pipe is not None
+    ):
+        raise ColumnError(f"Query {query!r} must contain exactly one projection")
+
+    node = plan.follow(tree)
+    operation, field = plan.stages[0]
+    elements = operation.elements(node) if node is not None else None
+    if elements is None:
+        raise ColumnError(f"Query {query!r} does not project a list or object")
+    return fill_column(elements, field, dtype)
+
+
+def extract_field(
+    list_node: jtt_tree.TreeNode, field: str, dtype: typing.Any = "float64"
+) -> Column:
+    """
+    Extract one scalar field from every element of a ListTreeNode into a Column.
+
+    Args:
+        list_node: The list to read.
+        field: A query without projections, such as stats.weight, evaluated per element.
+        dtype: The NumPy dtype of the column.
+    """
+    if list_node.type != NodeType.ARRAY:
+        raise ColumnError(f"Invalid type: {list_node.type}, expected an array")
+    plan = search.compile(field).plan
+    if plan.stages:
+        raise ColumnError(f"Field {field!r} cannot contain a projection")
+    return fill_column(list_node.value, plan, dtype)
@@ -0,0 +1,144 @@
+import typing
+
+from tree_tools.src import jtt_tree
+from tree_tools.src.jtt_tree import NodeType
+
+
+ADDED = "added"
+REMOVED = "removed"
+CHANGED = "changed"
+
+Path = typing.Tuple[typing.Union[str, int], ...]
+
+
+class Change(typing.NamedTuple):
+    """
+    One difference between two trees.
+    - kind: ADDED, REMOVED or CHANGED
+    - path: the object keys and list indexes leading to the node
+    - before: the node in the first tree, None if it was added
+    - after: the node in the second tree, None if it was removed
+    A CHANGED node may be a whole subtree when its type changed; otherwise changes are
+    reported at the leaves or at the members that were added or removed.
+    """
+
+    kind: str
+    path: Path
+    before: typing.Optional[jtt_tree.TreeNode]
+    after: typing.Optional[jtt_tree.TreeNode]
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "kind": self.kind,
+            "path": list(self.path),
+            "before": None if self.before is None else self.before.serialize(),
+            "after": None if self.after is None else self.after.serialize(),
+        }
+
+
+def same(left: jtt_tree.TreeNode, right: jtt_tree.TreeNode, verify: bool) -> bool:
+    """
+    Returns True if two nodes hold equal values, comparing containers by descendant count
+    and fingerprint without reading them once their fingerprints are cached.
+    """
+    if left is right:
+        return True
+    left_type = left.type
+    if left_type != right.type:
+        return False
+    if left_type != NodeType.OBJECT and left_type != NodeType.ARRAY:
+        return left.value == right.value
+    if left.descendant_count != right.descendant_count:
+        return False
+    if jtt_tree.fingerprint(left) != jtt_tree.fingerprint(right):
+        return False
+    return not verify or jtt_tree.nodes_equal(left, right)
+
+
+def diff(
+    tree_a: jtt_tree.TreeNode, tree_b: jtt_tree.TreeNode, verify: bool = False
+) -> typing.List[Change]:
+    """
+    Returns the changes that turn tree_a into tree_b, in document order.
+    Subtrees are only entered when their descendant counts or fingerprints differ, see
+    jtt_tree.fingerprint, so once fingerprints are cached the cost follows the size of
+    the change and the width of the containers on its path, not the size of the trees.
+    Fingerprints are cached on the nodes: the first
+    diff of a tree reads it completely, unless it was built interned, which computes them
+    during construction. Equal fingerprints are trusted unless verify is True.
+    Objects are compared key by key. Lists are compared position by position after
+    their common leading and trailing elements are skipped, so inserting or removing
+    elements in one place reports only those elements: REMOVED paths index tree_a and
+    every other path indexes tree_b.
+
+    Args:
+        tree_a: The original tree.
+        tree_b: The tree to compare it with.
+        verify: If True, subtrees with equal fingerprints are also compared node by node.
+    """
+    changes = []
+    # pairs of nodes still to compare, and changes waiting for their turn in the output
+    stack = [((), tree_a, tree_b)]
+    while stack:
+        item = stack.pop()
+        if type(item) == Change:
+            changes.append(item)
+            continue
+        path, a, b = item
+        if same(a, b, verify):
+            continue
+        node_type = a.type
+        if node_type != b.type or (
+            node_type != NodeType.OBJECT and node_type != NodeType.ARRAY
+        ):
+            changes.append(Change(CHANGED, path, a, b))
+            continue
+        pending = []
+        if node_type == NodeType.OBJECT:
+            a_value = a.value
+            b_value = b.value
+            for key, child in a_value.items():
+                if key in b_value:
+                    pending.append((path + (key,), child, b_value[key]))
+                else:
+                    pending.append(Change(REMOVED, path + (key,), child, None))
+            for key, child in b_value.items():
+                if key not in a_value:
+                    pending.append(Change(ADDED, path + (key,), None, child))
+        else:
+            pending = diff_elements(path, a.value, b.value, verify)
+        # pushed in reverse, so that they are popped in document order
+        stack.extend(reversed(pending))
+    return changes
+
+
+def diff_elements(
+    path: Path,
+    a_items: typing.List[jtt_tree.TreeNode],
+    b_items: typing.List[jtt_tree.TreeNode],
+    verify: bool,
+) -> typing.List[typing.Any]:
+    """
+    Pair up the elements of two lists, skipping the common prefix and suffix.
+    Returns the pairs to compare and the Changes of unpaired elements, in order.
+    """
+    start = 0
+    end = min(len(a_items), len(b_items))
+    while start < end and same(a_items[start], b_items[start], verify):
+        start += 1
+    a_end = len(a_items)
+    b_end = len(b_items)
+    while a_end > start and b_end > start:
+        if not same(a_items[a_end - 1], b_items[b_end - 1], verify):
+            break
+        a_end -= 1
+        b_end -= 1
+    paired = min(a_end, b_end)
+    pending = [(path + (i,), a_items[i], b_items[i]) for i in range(start, paired)]
+    pending.extend(
+        Change(REMOVED, path + (i,), a_items[i], None) for i in range(paired, a_end)
+    )
+    pending.extend(
+        Change(ADDED, path + (i,), None, b_items[i]) for i in range(paired, b_end)
+    )
+    return pending
@@ -0,0 +1,260 @@
+import io
+import json
+import typing
+from json import encoder
+
+from tree_tools.src import jtt_tree
+from tree_tools.src.jtt_tree import NodeType
+
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+DEFAULT_SEPARATORS = (", ", ": ")
+RAW_CONTAINERS = (dict, list)
+# raw containers below this depth are encoded in one piece by the json module
+RAW_WALK_DEPTH = 2
+WALK_ALL = -1
+SCALAR_NODE_TYPES = jtt_tree.SCALAR_NODE_TYPES
+# node containers with at most this many descendants are serialized and encoded at once
+PIECE_NODE_COUNT = 256
+PIECE_NODE_TYPES = (
+    jtt_tree.ObjectTreeNode,
+    jtt_tree.ListTreeNode,
+    jtt_tree.SharedObjectTreeNode,
+    jtt_tree.SharedListTreeNode,
+)
+
+
+def encode_float(value: float) -> str:
+    """
+    Encode a float the way json.dumps does, including its non-standard NaN and Infinity.
+    """
+    if value != value:
+        return "NaN"
+    if value == encoder.INFINITY:
+        return "Infinity"
+    if value == -encoder.INFINITY:
+        return "-Infinity"
+    return float.__repr__(value)
+
+
+def is_binary(fileobj: typing.Any) -> bool:
+    """
+    Returns True if a file object expects bytes rather than str.
+    """
+    if isinstance(fileobj, io.TextIOBase):
+        return False
+    if isinstance(fileobj, (io.BufferedIOBase, io.RawIOBase)):
+        return True
+    return "b" in getattr(fileobj, "mode", "")
+
+
+class TreeEncoder:
+    """
+    This class encodes a TreeNode subtree as JSON text, piece by piece.
+    The output is identical to json.dumps(tree.serialize()) with the same options, but no
+    copy of the subtree is built. Containers are walked from an explicit stack, so any
+    nesting depth can be encoded.
+    Lazy containers that were never read still hold the original decoded data: they are
+    encoded from that data without materializing any node. The top RAW_WALK_DEPTH levels
+    of such data are walked like nodes, and every container below them is handed to the
+    C encoder of the json module in one call, so a piece holds at most one element of a
+    collection. Data nested too deep for the json module is walked all the way down.
+    Likewise, node containers with at most PIECE_NODE_COUNT descendants are serialized
+    and encoded in one call, which bounds the size of the temporary copy.
+    """
+
+    __slots__ = ("ensure_ascii", "item_separator", "key_separator", "encode_string")
+
+    def __init__(
+        self,
+        ensure_ascii: bool = True,
+        separators: typing.Optional[typing.Tuple[str, str]] = None,
+    ) -> None:
+        self.ensure_ascii = ensure_ascii
+        self.item_separator, self.key_separator = separators or DEFAULT_SEPARATORS
+        self.encode_string = (
+            encoder.encode_basestring_ascii
+            if ensure_ascii
+            else encoder.encode_basestring
+        )
+
+    def encode_scalar(self, value: typing.Any) -> str:
+        if value is None:
+            return "null"
+        if value is True:
+            return "true"
+        if value is False:
+            return "false"
+        if type(value) == str:
+            return self.encode_string(value)
+        if type(value) == int:
+            return int.__repr__(value)
+        if type(value) == float:
+            return encode_float(value)
+        raise TypeError(f"Invalid type: {type(value)} for value {value}")
+
+    def encode_raw(self, value: typing.Any) -> str:
+        return json.dumps(
+            value,
+            ensure_ascii=self.ensure_ascii,
+            separators=(self.item_separator, self.key_separator),
+        )
+
+    def members(
+        self, items: typing.Iterable[typing.Tuple[str, typing.Any]]
+    ) -> typing.Iterator[typing.Tuple[str, typing.Any]]:
+        """
+        Yield the text preceding each member of an object, with the member's value.
+        """
+        prefix = "{"
+        for key, value in items:
+            yield prefix + self.encode_string(key) + self.key_separator, value
+            prefix = self.item_separator
+
+    def elements(
+        self, values: typing.Iterable[typing.Any]
+    ) -> typing.Iterator[typing.Tuple[str, typing.Any]]:
+        """
+        Yield the text preceding each element of an array, with the element.
+        """
+        prefix = "["
+        for value in values:
+            yield prefix, value
+            prefix = self.item_separator
+
+    def open(
+        self, value: typing.Any, raw_depth: int = 0
+    ) -> typing.Tuple[
+        str, typing.Optional[typing.Iterator[typing.Tuple[str, typing.Any]]], int
+    ]:
+        """
+        Returns the text of a value if it is written in one piece, or the text that
+        closes a container with the iterator over its members. The last item is the
+        raw depth of the members: the number of raw containers walked above them, or
+        WALK_ALL once the json module gave up on the data.
+        """
+        if isinstance(value, jtt_tree.TreeNode):
+            if type(value) in jtt_tree.LAZY_TYPES and not value.is_materialized():
+                return self.open(value.raw)
+            if type(value) in SCALAR_NODE_TYPES:
+                return self.encode_scalar(value.value), None, 0
+            if (
+                type(value) in PIECE_NODE_TYPES
+                and value.descendant_count <= PIECE_NODE_COUNT
+            ):
+                return self.encode_raw(value.serialize()), None, 0
+            node_type = value.type
+            if node_type == NodeType.OBJECT:
+                if not value.value:
+                    return "{}", None, 0
+                return "}", self.members(value.value.items()), 0
+            if node_type == NodeType.ARRAY:
+                if not value.value:
+                    return "[]", None, 0
+                return "]", self.elements(value.value), 0
+            return self.encode_scalar(value.value), None, 0
+
+        if type(value) not in RAW_CONTAINERS:
+            return self.encode_scalar(value), None, 0
+        if raw_depth != WALK_ALL and (raw_depth >= RAW_WALK_DEPTH or not value):
+            try:
+                return self.encode_raw(value), None, 0
+            except RecursionError:
+                raw_depth = WALK_ALL
+        child_depth = WALK_ALL if raw_depth == WALK_ALL else raw_depth + 1
+        if type(value) == dict:
+            return "}", self.members(value.items()), child_depth
+        return "]", self.elements(value), child_depth
+
+    def iterencode(self, tree: jtt_tree.TreeNode) -> typing.Iterator[str]:
+        """
+        Yield the JSON text of a tree in pieces.
+
+        Args:
+            tree: The TreeNode to encode, of any node implementation.
+        """
+        text, members, raw_depth = self.open(tree)
+        if members is None:
+            yield text
+            return
+        stack = [(members, text, raw_depth)]
+        while stack:
+            members, closing, raw_depth = stack[-1]
+            for prefix, value in members:
+                yield prefix
+                text, children, child_depth = self.open(value, raw_depth)
+                if children is not None:
+                    stack.append((children, text, child_depth))
+                    break
+                yield text
+            else:
+                stack.pop()
+                yield closing
+
+
+def iterencode(
+    tree: jtt_tree.TreeNode,
+    ensure_ascii: bool = True,
+    separators: typing.Optional[typing.Tuple[str, str]] = None,
+) -> typing.Iterator[str]:
+    """
+    Yield the JSON text of a tree in pieces, see TreeEncoder.
+
+    Args:
+        tree: The TreeNode to encode.
+        ensure_ascii: If True, non-ASCII characters are escaped, as in json.dumps.
+        separators: The item and key separators, as in json.dumps.
+    """
+    return TreeEncoder(ensure_ascii, separators).iterencode(tree)
+
+
+def dumps(
+    tree: jtt_tree.TreeNode,
+    ensure_ascii: bool = True,
+    separators: typing.Optional[typing.Tuple[str, str]] = None,
+) -> str:
+    """
+    Encode a tree as a JSON string without serializing it first.
+
+    Args:
+        tree: The TreeNode to encode.
+        ensure_ascii: If True, non-ASCII characters are escaped, as in json.dumps.
+        separators: The item and key separators, as in json.dumps.
+    """
+    return "".join(iterencode(tree, ensure_ascii, separators))
+
+
+def dump(
+    tree: jtt_tree.TreeNode,
+    fileobj: typing.Union[typing.TextIO, typing.BinaryIO],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ensure_ascii: bool = True,
+    separators: typing.Optional[typing.Tuple[str, str]] = None,
+) -> None:
+    """
+    Write a tree to a stream as JSON, incrementally.
+    Pieces are gathered into chunks of about chunk_size characters, so the stream
+    sees few large writes and at most one chunk of text is held in memory at a time.
+    Binary streams receive UTF-8.
+
+    Args:
+        tree: The TreeNode to write.
+        fileobj: A text or binary file object opened for writing.
+        chunk_size: The number of characters to gather before each write.
+        ensure_ascii: If True, non-ASCII characters are escaped, as in json.dumps.
+        separators: The item and key separators, as in json.dumps.
+    """
+    binary = is_binary(fileobj)
+    chunk = []
+    size = 0
+    for piece in iterencode(tree, ensure_ascii, separators):
+        chunk.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            text = "".join(chunk)
+            fileobj.write(text.encode("utf-8") if binary else text)
+            chunk.clear()
+            size = 0
+    if chunk:
+        text = "".join(chunk)
+        fileobj.write(text.encode("utf-8") if binary else text)
@@ -0,0 +1,109 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from tree_tools.src import jtt_tree
+from tree_tools.src.jtt_query import operations
+from tree_tools.src.jtt_query.queries import CompiledQuery, QueryPlan
+
+
+class PrefixTrieNode:
+    """
+    A single step in a QueryBatch trie.
+    Each node is reached by a key selection and records which queries end here and
+    which queries continue with operations that cannot be shared, as a plan built once
+    when the query is inserted.
+    """
+
+    __slots__ = ("children", "terminals", "tails")
+
+    children: Dict[str, "PrefixTrieNode"]
+    terminals: List[int]
+    tails: List[Tuple[int, QueryPlan]]
+
+    def __init__(self) -> None:
+        self.children = {}
+        self.terminals = []
+        self.tails = []
+
+    def query_indexes(self) -> List[int]:
+        """
+        Returns the index of every query that passes through this node.
+        """
+        indexes = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            indexes.extend(node.terminals)
+            indexes.extend(index for index, _ in node.tails)
+            stack.extend(node.children.values())
+        return indexes
+
+
+class QueryBatch:
+    """
+    This class evaluates several compiled queries against a tree in a single pass.
+    Leading key selections of all queries are merged into a prefix trie, so a shared
+    prefix such as meta.owner is resolved once no matter how many queries start with it.
+    Operations other than key selections are executed per query from the deepest shared node.
+    """
+
+    compiled_queries: Tuple[CompiledQuery, ...]
+    root: PrefixTrieNode
+
+    def __init__(self, compiled_queries: Sequence[CompiledQuery]) -> None:
+        self.compiled_queries = tuple(compiled_queries)
+        self.root = PrefixTrieNode()
+        for index, compiled in enumerate(self.compiled_queries):
+            self.insert(index, compiled.operation_chain)
+
+    def insert(self, index: int, chain: operations.QueryOperationChain) -> None:
+        """
+        Add the operations of one query to the trie.
+        """
+        trie_node = self.root
+        chain = iter(chain)
+        for operation in chain:
+            if not isinstance(operation, operations.KeySelectOperation):
+                trie_node.tails.append((index, QueryPlan((operation, *chain))))
+                return
+            trie_node = trie_node.children.setdefault(operation.key, PrefixTrieNode())
+        trie_node.terminals.append(index)
+
+    def execute(self, tree: jtt_tree.TreeNode) -> List[jtt_tree.TreeNode]:
+        """
+        Evaluate every query against the tree and return one result node per query,
+        in the order the queries were given.
+
+        Args:
+            tree: The TreeNode to search.
+        """
+        results: List[Optional[jtt_tree.TreeNode]] = [None] * len(self.compiled_queries)
+        stack = [(self.root, tree)]
+        while stack:
+            trie_node, node = stack.pop()
+            if node is None:
+                for index in trie_node.query_indexes():
+                    results[index] = jtt_tree.NullTreeNode()
+                continue
+
+            for index in trie_node.terminals:
+                results[index] = node
+            for index, plan in trie_node.tails:
+                results[index] = plan.evaluate(node) or jtt_tree.NullTreeNode()
+            if not trie_node.children:
+                continue
+
+            children = node.value if node.type == jtt_tree.NodeType.OBJECT else {}
+            for key, child_trie_node in trie_node.children.items():
+                stack.append((child_trie_node, children.get(key, None)))
+        return results
+
+    def search(self, data: Any) -> List[Any]:
+        """
+        Evaluate every query against a decoded JSON object or a tree and serialize the results.
+
+        Args:
+            data: The decoded JSON object, or an already built TreeNode.
+        """
+        if not isinstance(data, jtt_tree.TreeNode):
+            data = jtt_tree.create_tree(data, lazy=True)
+        return [result.serialize() for result in self.execute(data)]
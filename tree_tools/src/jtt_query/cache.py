@@ -0,0 +1,151 @@
+import collections
+import threading
+import time
+from typing import Any, Callable, Hashable, NamedTuple, Optional, Tuple
+
+from tree_tools.src import jtt_tree
+from tree_tools.src.jtt_query.queries import CompiledQuery
+
+
+RESULT_CACHE_SIZE = 256
+
+
+class CacheInfo(NamedTuple):
+    """
+    Statistics of a ResultCache, in the spirit of functools cache_info().
+    - hits: lookups answered from the cache
+    - misses: lookups that executed the query, including the ones below
+    - invalidations: entries dropped because the tree was edited since they were stored
+    - expirations: entries dropped because they outlived the TTL
+    - evictions: entries dropped to stay within maxsize
+    """
+
+    hits: int
+    misses: int
+    invalidations: int
+    expirations: int
+    evictions: int
+    maxsize: int
+    currsize: int
+
+
+def tree_version(tree: jtt_tree.TreeNode) -> int:
+    """
+    Returns the version of a tree, or 0 for nodes that cannot be edited.
+    """
+    return getattr(tree, "version", 0)
+
+
+class ResultCache:
+    """
+    This class caches query results per tree and compiled query, so that running the same
+    query against the same unchanged tree again is a dictionary lookup.
+    Each entry records the version of the tree it was computed from. Editing a tree bumps
+    the version of every node above the edit, see jtt_tree.ContainerTreeNode, so an entry
+    is only ever served while nothing below its tree has changed; stale entries are
+    dropped when they are next looked up.
+    Trees are keyed by identity and kept alive by their entries. Results are shared
+    between hits and with the tree, so they must not be edited.
+    At most maxsize entries are kept, evicting the least recently used one, and entries
+    older than ttl seconds are dropped if a ttl is given. All methods are thread safe.
+    """
+
+    maxsize: int
+    ttl: Optional[float]
+
+    def __init__(
+        self,
+        maxsize: int = RESULT_CACHE_SIZE,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def lookup(self, key: Hashable, version: int) -> Tuple[bool, Any]:
+        """
+        Returns whether a live entry is stored for key at version, and its result.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                entry_version, expires, result = entry
+                if entry_version != version:
+                    self.invalidations += 1
+                    del self.entries[key]
+                elif expires is not None and expires <= self.clock():
+                    self.expirations += 1
+                    del self.entries[key]
+                else:
+                    self.hits += 1
+                    self.entries.move_to_end(key)
+                    return True, result
+            self.misses += 1
+            return False, None
+
+    def store(self, key: Hashable, version: int, result: Any) -> None:
+        expires = None if self.ttl is None else self.clock() + self.ttl
+        with self.lock:
+            self.entries[key] = (version, expires, result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def execute(
+        self,
+        compiled: CompiledQuery,
+        tree: jtt_tree.TreeNode,
+        limit: Optional[int] = None,
+    ) -> jtt_tree.TreeNode:
+        """
+        Return the result of a compiled query against a tree, executing it only if no
+        entry is stored for the current version of the tree.
+
+        Args:
+            compiled: The CompiledQuery to execute, typically from search.compile.
+            tree: The TreeNode to search.
+            limit: The maximum number of projected elements to collect.
+        """
+        key = (tree, compiled, limit)
+        version = tree_version(tree)
+        found, result = self.lookup(key, version)
+        if found:
+            return result
+        result = compiled.execute(tree, limit)
+        self.store(key, version, result)
+        return result
+
+    def cache_info(self) -> CacheInfo:
+        with self.lock:
+            return CacheInfo(
+                self.hits,
+                self.misses,
+                self.invalidations,
+                self.expirations,
+                self.evictions,
+                self.maxsize,
+                len(self.entries),
+            )
+
+    def clear(self) -> None:
+        """
+        Drop every entry and reset the statistics.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+            self.invalidations = self.expirations = self.evictions = 0
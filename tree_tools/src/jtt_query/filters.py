@@ -0,0 +1,184 @@
+import operator
+from typing import Any, Callable, Optional, Tuple
+
+from tree_tools.src import jtt_tree
+from tree_tools.src.jtt_tree import NodeType
+
+
+Getter = Callable[[jtt_tree.TreeNode], Optional[jtt_tree.TreeNode]]
+Predicate = Callable[[jtt_tree.TreeNode], bool]
+
+CONTAINER_TYPES = (NodeType.ARRAY, NodeType.OBJECT)
+
+ORDERINGS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+
+def is_truthy(node: Optional[jtt_tree.TreeNode]) -> bool:
+    """
+    Returns the JMESPath truth value of a node: null, false and empty strings, lists and
+    objects are false, everything else (including the number 0) is true.
+    """
+    if node is None:
+        return False
+    node_type = node.type
+    if node_type == NodeType.BOOLEAN:
+        return node.value
+    if node_type == NodeType.NUMBER:
+        return True
+    if node_type == NodeType.NULL:
+        return False
+    return len(node.value) > 0
+
+
+def nodes_equal(
+    left: Optional[jtt_tree.TreeNode], right: Optional[jtt_tree.TreeNode]
+) -> bool:
+    """
+    Returns True if two nodes hold equal JSON values. A missing node equals null, and
+    booleans never equal numbers.
+    """
+    if left is None or right is None:
+        other = left if right is None else right
+        return other is None or other.type == NodeType.NULL
+    return jtt_tree.nodes_equal(left, right)
+
+
+def compile_path(path: Tuple[Any, ...]) -> Getter:
+    """
+    Compile a path of object keys and list indexes relative to a node into a getter.
+    Single keys, the most common case, get a dedicated closure.
+    """
+    if not path:
+        return lambda node: node
+    if len(path) == 1 and type(path[0]) == str:
+        key = path[0]
+
+        def get_key(node: jtt_tree.TreeNode) -> Optional[jtt_tree.TreeNode]:
+            if node.type == NodeType.OBJECT:
+                return node.value.get(key, None)
+            return None
+
+        return get_key
+
+    def get_path(node: jtt_tree.TreeNode) -> Optional[jtt_tree.TreeNode]:
+        for step in path:
+            if type(step) == str:
+                if node.type != NodeType.OBJECT:
+                    return None
+                node = node.value.get(step, None)
+            else:
+                if node.type != NodeType.ARRAY or not (
+                    -len(node.value) <= step < len(node.value)
+                ):
+                    return None
+                node = node.value[step]
+            if node is None:
+                return None
+        return node
+
+    return get_path
+
+
+def compile_truthy(getter: Getter) -> Predicate:
+    return lambda node: is_truthy(getter(node))
+
+
+def compile_not(predicate: Predicate) -> Predicate:
+    return lambda node: not predicate(node)
+
+
+def compile_and(left: Predicate, right: Predicate) -> Predicate:
+    return lambda node: left(node) and right(node)
+
+
+def compile_or(left: Predicate, right: Predicate) -> Predicate:
+    return lambda node: left(node) or right(node)
+
+
+def compile_comparison(
+    comparator: str,
+    left: Tuple[Getter, Optional[jtt_tree.TreeNode]],
+    right: Tuple[Getter, Optional[jtt_tree.TreeNode]],
+) -> Predicate:
+    """
+    Compile a comparison into a predicate. Each operand is a getter, plus the boxed value
+    if the operand is a literal: literals are boxed once at compile time, so evaluating
+    the predicate allocates nothing per node. Comparisons against literals are
+    specialized to a type check and a payload comparison. Ordering comparisons only hold
+    between numbers.
+
+    Args:
+        comparator: One of ==, !=, <, <=, > and >=.
+        left: The getter and constant of the left operand.
+        right: The getter and constant of the right operand.
+    """
+    (get_left, left_constant), (get_right, right_constant) = left, right
+    if comparator in ("==", "!="):
+        if right_constant is None and left_constant is not None:
+            get_left, get_right = get_right, get_left
+            right_constant = left_constant
+        if right_constant is not None:
+            equals = compile_equals_constant(get_left, right_constant)
+        else:
+            equals = lambda node: nodes_equal(get_left(node), get_right(node))
+        if comparator == "==":
+            return equals
+        return lambda node: not equals(node)
+
+    compare = ORDERINGS[comparator]
+    if right_constant is not None:
+        if right_constant.type != NodeType.NUMBER:
+            return lambda node: False
+        bound = right_constant.value
+        # the common "field > literal" shape compares against a plain Python number
+        if comparator == ">":
+            return compile_number_check(get_left, lambda v: v > bound)
+        if comparator == ">=":
+            return compile_number_check(get_left, lambda v: v >= bound)
+        if comparator == "<":
+            return compile_number_check(get_left, lambda v: v < bound)
+        return compile_number_check(get_left, lambda v: v <= bound)
+
+    def ordering(node: jtt_tree.TreeNode) -> bool:
+        a = get_left(node)
+        b = get_right(node)
+        return (
+            a is not None
+            and b is not None
+            and a.type == NodeType.NUMBER
+            and b.type == NodeType.NUMBER
+            and compare(a.value, b.value)
+        )
+
+    return ordering
+
+
+def compile_number_check(getter: Getter, check: Callable[[Any], bool]) -> Predicate:
+    def number_check(node: jtt_tree.TreeNode) -> bool:
+        target = getter(node)
+        return (
+            target is not None
+            and target.type == NodeType.NUMBER
+            and check(target.value)
+        )
+
+    return number_check
+
+
+def compile_equals_constant(getter: Getter, constant: jtt_tree.TreeNode) -> Predicate:
+    constant_type = constant.type
+    if constant_type == NodeType.NULL:
+        return lambda node: nodes_equal(getter(node), None)
+    if constant_type in CONTAINER_TYPES:
+        return lambda node: nodes_equal(getter(node), constant)
+    value = constant.value
+
+    def equals_scalar(node: jtt_tree.TreeNode) -> bool:
+        target = getter(node)
+        return (
+            target is not None
+            and target.type == constant_type
+            and target.value == value
+        )
+
+    return equals_scalar
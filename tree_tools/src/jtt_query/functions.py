@@ -0,0 +1,315 @@
+import json
+import math
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from tree_tools.src import jtt_tree
+from tree_tools.src.jtt_tree import NodeType
+from tree_tools.src.jtt_query import filters
+
+
+TYPE_NAMES = {
+    NodeType.NULL: "null",
+    NodeType.STRING: "string",
+    NodeType.NUMBER: "number",
+    NodeType.ARRAY: "array",
+    NodeType.OBJECT: "object",
+    NodeType.BOOLEAN: "boolean",
+}
+
+# argument types besides the JSON types; array-number and array-string also constrain
+# the elements, and an expref is an expression reference such as &age
+ANY = "any"
+EXPREF = "expref"
+ARRAY_NUMBER = "array-number"
+ARRAY_STRING = "array-string"
+
+
+class JMESPathTypeError(Exception):
+    pass
+
+
+class Function(NamedTuple):
+    """
+    A built-in function of the query language.
+    - name: the name the function is called by
+    - implementation: called with the argument nodes, and getters for expression references
+    - signature: the types accepted by each argument
+    - variadic: if True, the last argument may be repeated
+    """
+
+    name: str
+    implementation: Callable[..., Optional[jtt_tree.TreeNode]]
+    signature: Tuple[Tuple[str, ...], ...]
+    variadic: bool = False
+
+    def check_arity(self, count: int) -> Optional[str]:
+        """
+        Returns why a call with count arguments is invalid, or None if it is valid.
+        """
+        expected = len(self.signature)
+        plural = "s" if expected != 1 else ""
+        if self.variadic and count < expected:
+            return f"{self.name}() takes at least {expected} argument{plural}, got {count}."
+        if not self.variadic and count != expected:
+            return f"{self.name}() takes {expected} argument{plural}, got {count}."
+        return None
+
+    def accepts_reference(self, position: int) -> bool:
+        """
+        Returns True if the argument at position is an expression reference.
+        """
+        return EXPREF in self.signature[min(position, len(self.signature) - 1)]
+
+    def __call__(self, arguments: List[Any]) -> Optional[jtt_tree.TreeNode]:
+        signature = self.signature
+        for position, argument in enumerate(arguments):
+            allowed = signature[min(position, len(signature) - 1)]
+            if ANY not in allowed and EXPREF not in allowed:
+                check_type(self.name, position, argument, allowed)
+        return self.implementation(*arguments)
+
+
+def check_type(
+    name: str, position: int, node: jtt_tree.TreeNode, allowed: Tuple[str, ...]
+) -> None:
+    """
+    Raise JMESPathTypeError unless the node has one of the allowed types.
+    """
+    node_type = TYPE_NAMES[node.type]
+    if node_type in allowed:
+        return
+    if node_type == "array":
+        if ARRAY_NUMBER in allowed and all_of(node, NodeType.NUMBER):
+            return
+        if ARRAY_STRING in allowed and all_of(node, NodeType.STRING):
+            return
+    raise JMESPathTypeError(
+        f"{name}() expected argument {position + 1} to be {' or '.join(allowed)},"
+        f" received {node_type}."
+    )
+
+
+def all_of(node: jtt_tree.TreeNode, node_type: NodeType) -> bool:
+    return all(element.type == node_type for element in node.value)
+
+
+def sort_keys(name: str, keys: List[Optional[jtt_tree.TreeNode]]) -> List[Any]:
+    """
+    Returns the payloads of the keys, which must be all numbers or all strings.
+    """
+    key_type = keys[0].type if keys and keys[0] is not None else None
+    if key_type not in (NodeType.NUMBER, NodeType.STRING) or any(
+        key is None or key.type != key_type for key in keys
+    ):
+        raise JMESPathTypeError(
+            f"{name}() expected every key to be a number, or every key to be a string."
+        )
+    return [key.value for key in keys]
+
+
+def by_key(
+    name: str, array: jtt_tree.TreeNode, reference: filters.Getter
+) -> Tuple[List[jtt_tree.TreeNode], List[Any]]:
+    elements = array.value
+    return elements, sort_keys(name, [reference(element) for element in elements])
+
+
+def box(value: Any) -> jtt_tree.TreeNode:
+    return jtt_tree.box_value(value)
+
+
+def abs_(number: jtt_tree.TreeNode) -> jtt_tree.TreeNode:
+    return box(abs(number.value))
+
+
+def avg(array: jtt_tree.TreeNode) -> Optional[jtt_tree.TreeNode]:
+    if not array.value:
+        return None
+    return box(sum(element.value for element in array.value) / len(array.value))
+
+
+def ceil(number: jtt_tree.TreeNode) -> jtt_tree.TreeNode:
+    return box(math.ceil(number.value))
+
+
+def contains(
+    subject: jtt_tree.TreeNode, search: jtt_tree.TreeNode
+) -> jtt_tree.TreeNode:
+    if subject.type == NodeType.STRING:
+        return box(search.type == NodeType.STRING and search.value in subject.value)
+    return box(any(filters.nodes_equal(element, search) for element in subject.value))
+
+
+def ends_with(
+    subject: jtt_tree.TreeNode, suffix: jtt_tree.TreeNode
+) -> jtt_tree.TreeNode:
+    return box(subject.value.endswith(suffix.value))
+
+
+def floor(number: jtt_tree.TreeNode) -> jtt_tree.TreeNode:
+    return box(math.floor(number.value))
+
+
+def join(glue: jtt_tree.TreeNode, array: jtt_tree.TreeNode) -> jtt_tree.TreeNode:
+    return box(glue.value.join(element.value for element in array.value))
+
+
+def keys(obj: jtt_tree.TreeNode) -> jtt_tree.TreeNode:
+    return jtt_tree.ListTreeNode.from_nodes(
+        [jtt_tree.StringTreeNode(key) for key in obj.value]
+    )
+
+
+def length(subject: jtt_tree.TreeNode) -> jtt_tree.TreeNode:
+    return box(len(subject.value))
+
+
+def map_(reference: filters.Getter, array: jtt_tree.TreeNode) -> jtt_tree.TreeNode:
+    return jtt_tree.ListTreeNode.from_nodes(
+        [reference(element) or jtt_tree.NullTreeNode() for element in array.value]
+    )
+
+
+def max_(array: jtt_tree.TreeNode) -> Optional[jtt_tree.TreeNode]:
+    return max(array.value, key=lambda element: element.value, default=None)
+
+
+def max_by(
+    array: jtt_tree.TreeNode, reference: filters.Getter
+) -> Optional[jtt_tree.TreeNode]:
+    if not array.value:
+        return None
+    elements, values = by_key("max_by", array, reference)
+    return elements[max(range(len(values)), key=values.__getitem__)]
+
+
+def merge(*objects: jtt_tree.TreeNode) -> jtt_tree.TreeNode:
+    merged = {}
+    for obj in objects:
+        merged.update(obj.value)
+    return jtt_tree.ObjectTreeNode.from_nodes(merged)
+
+
+def min_(array: jtt_tree.TreeNode) -> Optional[jtt_tree.TreeNode]:
+    return min(array.value, key=lambda element: element.value, default=None)
+
+
+def min_by(
+    array: jtt_tree.TreeNode, reference: filters.Getter
+) -> Optional[jtt_tree.TreeNode]:
+    if not array.value:
+        return None
+    elements, values = by_key("min_by", array, reference)
+    return elements[min(range(len(values)), key=values.__getitem__)]
+
+
+def not_null(*arguments: jtt_tree.TreeNode) -> Optional[jtt_tree.TreeNode]:
+    for argument in arguments:
+        if argument.type != NodeType.NULL:
+            return argument
+    return None
+
+
+def reverse(subject: jtt_tree.TreeNode) -> jtt_tree.TreeNode:
+    if subject.type == NodeType.STRING:
+        return box(subject.value[::-1])
+    return jtt_tree.ListTreeNode.from_nodes(subject.value[::-1])
+
+
+def sort(array: jtt_tree.TreeNode) -> jtt_tree.TreeNode:
+    return jtt_tree.ListTreeNode.from_nodes(
+        sorted(array.value, key=lambda element: element.value)
+    )
+
+
+def sort_by(array: jtt_tree.TreeNode, reference: filters.Getter) -> jtt_tree.TreeNode:
+    if not array.value:
+        return array
+    elements, values = by_key("sort_by", array, reference)
+    order = sorted(range(len(values)), key=values.__getitem__)
+    return jtt_tree.ListTreeNode.from_nodes([elements[i] for i in order])
+
+
+def starts_with(
+    subject: jtt_tree.TreeNode, prefix: jtt_tree.TreeNode
+) -> jtt_tree.TreeNode:
+    return box(subject.value.startswith(prefix.value))
+
+
+def sum_(array: jtt_tree.TreeNode) -> jtt_tree.TreeNode:
+    return box(sum(element.value for element in array.value))
+
+
+def to_array(subject: jtt_tree.TreeNode) -> jtt_tree.TreeNode:
+    if subject.type == NodeType.ARRAY:
+        return subject
+    return jtt_tree.ListTreeNode.from_nodes([subject])
+
+
+def to_number(subject: jtt_tree.TreeNode) -> Optional[jtt_tree.TreeNode]:
+    if subject.type == NodeType.NUMBER:
+        return subject
+    if subject.type != NodeType.STRING:
+        return None
+    try:
+        number = float(subject.value)
+    except ValueError:
+        return None
+    if not math.isfinite(number):
+        return None
+    try:
+        return box(int(subject.value))
+    except ValueError:
+        return box(number)
+
+
+def to_string(subject: jtt_tree.TreeNode) -> jtt_tree.TreeNode:
+    if subject.type == NodeType.STRING:
+        return subject
+    return box(json.dumps(subject.serialize(), separators=(",", ":")))
+
+
+def type_(subject: jtt_tree.TreeNode) -> jtt_tree.TreeNode:
+    return box(TYPE_NAMES[subject.type])
+
+
+def values(obj: jtt_tree.TreeNode) -> jtt_tree.TreeNode:
+    return jtt_tree.ListTreeNode.from_nodes(list(obj.value.values()))
+
+
+NUMBER = ("number",)
+STRING = ("string",)
+ARRAY = ("array",)
+OBJECT = ("object",)
+
+FUNCTIONS: Dict[str, Function] = {
+    function.name: function
+    for function in (
+        Function("abs", abs_, (NUMBER,)),
+        Function("avg", avg, ((ARRAY_NUMBER,),)),
+        Function("ceil", ceil, (NUMBER,)),
+        Function("contains", contains, (("array", "string"), (ANY,))),
+        Function("ends_with", ends_with, (STRING, STRING)),
+        Function("floor", floor, (NUMBER,)),
+        Function("join", join, (STRING, (ARRAY_STRING,))),
+        Function("keys", keys, (OBJECT,)),
+        Function("length", length, (("string", "array", "object"),)),
+        Function("map", map_, ((EXPREF,), ARRAY)),
+        Function("max", max_, ((ARRAY_NUMBER, ARRAY_STRING),)),
+        Function("max_by", max_by, (ARRAY, (EXPREF,))),
+        Function("merge", merge, (OBJECT,), variadic=True),
+        Function("min", min_, ((ARRAY_NUMBER, ARRAY_STRING),)),
+        Function("min_by", min_by, (ARRAY, (EXPREF,))),
+        Function("not_null", not_null, ((ANY,),), variadic=True),
+        Function("reverse", reverse, (("string", "array"),)),
+        Function("sort", sort, ((ARRAY_NUMBER, ARRAY_STRING),)),
+        Function("sort_by", sort_by, (ARRAY, (EXPREF,))),
+        Function("starts_with", starts_with, (STRING, STRING)),
+        Function("sum", sum_, ((ARRAY_NUMBER,),)),
+        Function("to_array", to_array, ((ANY,),)),
+        Function("to_number", to_number, ((ANY,),)),
+        Function("to_string", to_string, ((ANY,),)),
+        Function("type", type_, ((ANY,),)),
+        Function("values", values, (OBJECT,)),
+    )
+}
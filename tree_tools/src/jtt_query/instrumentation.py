@@ -0,0 +1,262 @@
+import contextlib
+import contextvars
+import time
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from tree_tools.src import jtt_tree
+from tree_tools.src.jtt_query import operations
+
+
+PHASES = ("build", "parse", "execute", "serialize")
+
+_active_profile: contextvars.ContextVar = contextvars.ContextVar(
+    "active_profile", default=None
+)
+
+
+class Counters:
+    """
+    Counters of a single phase or operation.
+    - calls: number of times the phase or operation ran
+    - wall_time: total time spent, in seconds
+    - nodes_visited: number of nodes read
+    - nodes_allocated: number of nodes built, including lazy nodes materialized
+    """
+
+    __slots__ = ("calls", "wall_time", "nodes_visited", "nodes_allocated")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.wall_time = 0.0
+        self.nodes_visited = 0
+        self.nodes_allocated = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {slot: getattr(self, slot) for slot in Counters.__slots__}
+
+
+class OperationStats(Counters):
+    """
+    Counters of one operation of a compiled query, with its position in the chain.
+    """
+
+    __slots__ = ("operation", "position")
+
+    def __init__(self, operation: operations.QueryOperation, position: int) -> None:
+        super().__init__()
+        self.operation = operation
+        self.position = position
+
+    @property
+    def name(self) -> str:
+        return type(self.operation).__name__
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = super().to_dict()
+        result["operation"] = self.name
+        result["position"] = self.position
+        return result
+
+
+def pending_children(node: Optional[jtt_tree.TreeNode]) -> int:
+    """
+    Returns the number of child nodes a lazy container will build when it is first read,
+    or 0 for any other node.
+    """
+    if isinstance(node, (jtt_tree.LazyObjectTreeNode, jtt_tree.LazyListTreeNode)):
+        if not node.is_materialized():
+            return len(node.raw)
+    return 0
+
+
+def count_materialized(node: jtt_tree.TreeNode, pending: int) -> int:
+    if pending and node.is_materialized():
+        return pending
+    return 0
+
+
+class ProfiledOperation(operations.QueryOperation):
+    """
+    Wraps an operation to record its counters. Only built while profiling is enabled.
+    """
+
+    def __init__(
+        self, operation: operations.QueryOperation, stats: OperationStats
+    ) -> None:
+        self.operation = operation
+        self.stats = stats
+        self.next = None
+
+    def perform(self, node: jtt_tree.TreeNode) -> Optional[jtt_tree.TreeNode]:
+        stats = self.stats
+        pending = pending_children(node)
+        start = time.perf_counter()
+        result = self.operation.perform(node)
+        stats.wall_time += time.perf_counter() - start
+        stats.calls += 1
+        stats.nodes_visited += 1
+        stats.nodes_allocated += count_materialized(node, pending)
+        return result
+
+
+class ProfiledProjection(operations.ProjectionOperation):
+    """
+    Wraps a projection to record its counters. Every element pulled from the projection
+    counts as a visited node, and only the time spent producing elements is recorded, not
+    the time the rest of the pipeline spends on them.
+    """
+
+    def __init__(
+        self, operation: operations.ProjectionOperation, stats: OperationStats
+    ) -> None:
+        self.operation = operation
+        self.stats = stats
+        self.next = None
+
+    def elements(
+        self, node: jtt_tree.TreeNode
+    ) -> Optional[Iterator[jtt_tree.TreeNode]]:
+        stats = self.stats
+        pending = pending_children(node)
+        start = time.perf_counter()
+        elements = self.operation.elements(node)
+        stats.wall_time += time.perf_counter() - start
+        stats.calls += 1
+        stats.nodes_visited += 1
+        stats.nodes_allocated += count_materialized(node, pending)
+        if elements is None:
+            return None
+        return self.timed(elements)
+
+    def flatten(
+        self, nodes: Iterator[jtt_tree.TreeNode]
+    ) -> Iterator[jtt_tree.TreeNode]:
+        self.stats.calls += 1
+        return self.timed(self.operation.flatten(nodes))
+
+    def timed(
+        self, elements: Iterator[jtt_tree.TreeNode]
+    ) -> Iterator[jtt_tree.TreeNode]:
+        stats = self.stats
+        while True:
+            start = time.perf_counter()
+            try:
+                element = next(elements)
+            except StopIteration:
+                stats.wall_time += time.perf_counter() - start
+                return
+            stats.wall_time += time.perf_counter() - start
+            stats.nodes_visited += 1
+            yield element
+
+
+class QueryProfile:
+    """
+    This class collects the counters of every query evaluated while it is active.
+    Counters are kept per phase (tree building, parsing, execution and serialization) and
+    per operation of each compiled query; executing the same compiled query again adds to
+    the same operation counters. Use to_dict() to export the counters.
+    """
+
+    phases: Dict[str, Counters]
+    operations: Dict[int, OperationStats]
+
+    def __init__(self) -> None:
+        self.phases = {phase: Counters() for phase in PHASES}
+        self.operations = {}
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[Counters]:
+        """
+        Time a phase; node counters are filled in by the caller.
+        """
+        counters = self.phases[name]
+        start = time.perf_counter()
+        try:
+            yield counters
+        finally:
+            counters.wall_time += time.perf_counter() - start
+            counters.calls += 1
+
+    def operation_totals(self) -> Tuple[int, int]:
+        """
+        Returns the nodes visited and allocated by all operations so far.
+        """
+        stats = self.operations.values()
+        return (
+            sum(s.nodes_visited for s in stats),
+            sum(s.nodes_allocated for s in stats),
+        )
+
+    def instrument(self, chain: operations.QueryOperationChain, plan: Any) -> Any:
+        """
+        Returns a copy of a QueryPlan whose operations record into this profile.
+        """
+        wrapped = {}
+        for position, operation in enumerate(chain):
+            if isinstance(operation, operations.PipeOperation):
+                continue
+            stats = self.operations.get(id(operation))
+            if stats is None:
+                stats = self.operations[id(operation)] = OperationStats(
+                    operation, position
+                )
+            if isinstance(operation, operations.ProjectionOperation):
+                wrapped[id(operation)] = ProfiledProjection(operation, stats)
+            else:
+                wrapped[id(operation)] = ProfiledOperation(operation, stats)
+        return self.copy_plan(plan, wrapped)
+
+    def copy_plan(self, plan: Any, wrapped: Dict[int, Any]) -> Any:
+        copy = type(plan).__new__(type(plan))
+        # merged key paths are split again, so that every key selection is recorded
+        copy.leading = tuple(
+            wrapped[id(unmerged)]
+            for operation in plan.leading
+            for unmerged in getattr(operation, "operations", (operation,))
+        )
+        copy.stages = tuple(
+            (wrapped[id(operation)], self.copy_plan(rhs, wrapped) if rhs else None)
+            for operation, rhs in plan.stages
+        )
+        copy.pipe = self.copy_plan(plan.pipe, wrapped) if plan.pipe else None
+        return copy
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "phases": {
+                name: counters.to_dict() for name, counters in self.phases.items()
+            },
+            "operations": [stats.to_dict() for stats in self.operations.values()],
+        }
+
+
+def active_profile() -> Optional[QueryProfile]:
+    """
+    Returns the QueryProfile enabled in the current context, if any.
+    """
+    return _active_profile.get()
+
+
+@contextlib.contextmanager
+def profile(
+    callback: Optional[Callable[[QueryProfile], None]] = None
+) -> Iterator[QueryProfile]:
+    """
+    Enable profiling for the queries evaluated inside the block.
+    Profiling is off by default; when it is off, query evaluation runs the original
+    operations and only checks once per query whether a profile is active.
+    The profile is stored in a context variable, so each thread and async task only sees
+    the profile it enabled itself.
+
+    Args:
+        callback: Called with the profile when the block exits, e.g. to export counters.
+    """
+    query_profile = QueryProfile()
+    token = _active_profile.set(query_profile)
+    try:
+        yield query_profile
+    finally:
+        _active_profile.reset(token)
+        if callback is not None:
+            callback(query_profile)
@@ -1,7 +1,8 @@
 from abc import abstractmethod
-from typing import Optional, Generator
+from typing import Any, Callable, Optional, Generator, Iterable, Iterator, List, Tuple
 
 from tree_tools.src import jtt_tree
+from tree_tools.src.jtt_query import filters, utils
 
 
 class QueryOperationError(Exception):
@@ -47,6 +48,431 @@ class KeySelectOperation(QueryOperation):
             return None
 
 
+class KeyPathOperation(QueryOperation):
+    """
+    This class is used to represent adjacent key selections such as a.b.c as a single step.
+    It is never parsed: QueryPlan merges KeySelectOperations into it, so a path of keys is
+    followed in one call. The merged operations are kept for instrumentation.
+    """
+
+    keys: Tuple[str, ...]
+    operations: Tuple[KeySelectOperation, ...]
+
+    def __init__(self, operations: Tuple[KeySelectOperation, ...]) -> None:
+        self.keys = tuple(operation.key for operation in operations)
+        self.operations = operations
+        self.next = None
+
+    def perform(self, node: jtt_tree.TreeNode) -> Optional[jtt_tree.TreeNode]:
+        """
+        Follow every key in turn, returning nothing as soon as one does not apply.
+        """
+        for key in self.keys:
+            if node.type != jtt_tree.NodeType.OBJECT:
+                return None
+            node = node.value.get(key, None)
+            if node is None:
+                return None
+        return node
+
+
+class IndexOperation(QueryOperation):
+    """
+    This class is used to represent an index expression such as [0] in a query.
+    An index only applies to ListTreeNodes; negative indexes count from the end.
+    """
+
+    index: int
+
+    def __init__(self, index: int) -> None:
+        self.index = index
+        self.next = None
+
+    def perform(self, node: jtt_tree.TreeNode) -> Optional[jtt_tree.TreeNode]:
+        """
+        If the node is a list and the index is in bounds, return the element.
+        Otherwise, return nothing
+        """
+        if node.type == jtt_tree.NodeType.ARRAY and utils.index_within_list(
+            self.index, node.value
+        ):
+            return node.value[self.index]
+        return None
+
+
+class ProjectionOperation(QueryOperation):
+    """
+    Base class for operations that start a projection.
+    A projection produces a sequence of elements, and the operations that follow it are
+    applied to each element in turn. Elements are produced lazily by elements(), so a
+    projection never builds an intermediate list of its own.
+    """
+
+    @abstractmethod
+    def elements(
+        self, node: jtt_tree.TreeNode
+    ) -> Optional[Iterator[jtt_tree.TreeNode]]:
+        """
+        Returns an iterator over the elements to project, or None if the projection
+        does not apply to the node.
+        """
+        pass
+
+    def perform(self, node: jtt_tree.TreeNode) -> Optional[jtt_tree.TreeNode]:
+        """
+        Collect the projected elements into a new list node.
+        """
+        elements = self.elements(node)
+        if elements is None:
+            return None
+        return jtt_tree.ListTreeNode.from_nodes(list(elements))
+
+
+class WildcardIndexOperation(ProjectionOperation):
+    """
+    This class is used to represent a list wildcard [*], which projects every element of a list.
+    """
+
+    def __init__(self) -> None:
+        self.next = None
+
+    def elements(
+        self, node: jtt_tree.TreeNode
+    ) -> Optional[Iterator[jtt_tree.TreeNode]]:
+        if node.type == jtt_tree.NodeType.ARRAY:
+            return iter(node.value)
+        return None
+
+
+class WildcardValueOperation(ProjectionOperation):
+    """
+    This class is used to represent an object wildcard .*, which projects every value of an object.
+    """
+
+    def __init__(self) -> None:
+        self.next = None
+
+    def elements(
+        self, node: jtt_tree.TreeNode
+    ) -> Optional[Iterator[jtt_tree.TreeNode]]:
+        if node.type == jtt_tree.NodeType.OBJECT:
+            return iter(node.value.values())
+        return None
+
+
+class FlattenOperation(ProjectionOperation):
+    """
+    This class is used to represent a flatten [], which merges nested lists one level deep
+    and projects the result. Unlike other projections, a flatten applies to the result of
+    any projection before it, so it also ends that projection.
+    """
+
+    def __init__(self) -> None:
+        self.next = None
+
+    def elements(
+        self, node: jtt_tree.TreeNode
+    ) -> Optional[Iterator[jtt_tree.TreeNode]]:
+        if node.type == jtt_tree.NodeType.ARRAY:
+            return self.flatten(iter(node.value))
+        return None
+
+    @staticmethod
+    def flatten(
+        nodes: Iterator[jtt_tree.TreeNode],
+    ) -> Iterator[jtt_tree.TreeNode]:
+        for node in nodes:
+            if node.type == jtt_tree.NodeType.ARRAY:
+                yield from node.value
+            else:
+                yield node
+
+
+class SliceOperation(ProjectionOperation):
+    """
+    This class is used to represent a slice such as [1:10:2], which projects part of a list.
+    Omitted bounds follow Python slicing rules; a step of zero is invalid.
+    """
+
+    start: Optional[int]
+    stop: Optional[int]
+    step: Optional[int]
+
+    def __init__(
+        self, start: Optional[int], stop: Optional[int], step: Optional[int]
+    ) -> None:
+        if step == 0:
+            raise QueryOperationError("Slice step cannot be zero.")
+        self.start = start
+        self.stop = stop
+        self.step = step
+        self.next = None
+
+    def elements(
+        self, node: jtt_tree.TreeNode
+    ) -> Optional[Iterator[jtt_tree.TreeNode]]:
+        if node.type != jtt_tree.NodeType.ARRAY:
+            return None
+        values = node.value
+        indexes = range(*slice(self.start, self.stop, self.step).indices(len(values)))
+        return (values[i] for i in indexes)
+
+
+class FilterOperation(ProjectionOperation):
+    """
+    This class is used to represent a filter projection such as [?price > `10`].
+    The filter expression is compiled once into a predicate over element nodes, and only
+    the elements it accepts are projected.
+    """
+
+    expression: str
+    predicate: Callable[[jtt_tree.TreeNode], bool]
+
+    def __init__(
+        self, expression: str, predicate: Callable[[jtt_tree.TreeNode], bool]
+    ) -> None:
+        self.expression = expression
+        self.predicate = predicate
+        self.next = None
+
+    def elements(
+        self, node: jtt_tree.TreeNode
+    ) -> Optional[Iterator[jtt_tree.TreeNode]]:
+        if node.type == jtt_tree.NodeType.ARRAY:
+            return filter(self.predicate, node.value)
+        return None
+
+
+class PipeOperation(QueryOperation):
+    """
+    This class is used to represent a pipe |, which ends every projection before it.
+    It only marks a boundary: QueryPlan evaluates the operations before the pipe in full
+    and feeds their result, or null, to the operations after it.
+    """
+
+    def __init__(self) -> None:
+        self.next = None
+
+    def perform(self, node: jtt_tree.TreeNode) -> Optional[jtt_tree.TreeNode]:
+        return node
+
+
+class GroupOperation(QueryOperation):
+    """
+    This class is used to represent a parenthesized expression such as (a[*].b).c.
+    The projections and pipes of the group are evaluated inside it, so the operations
+    that follow apply to the group's result instead of being projected.
+    """
+
+    getter: filters.Getter
+
+    def __init__(self, getter: filters.Getter) -> None:
+        self.getter = getter
+        self.next = None
+
+    def perform(self, node: jtt_tree.TreeNode) -> Optional[jtt_tree.TreeNode]:
+        return self.getter(node)
+
+
+class LiteralOperation(QueryOperation):
+    """
+    This class is used to represent a JSON literal such as `[1, 2]` or a raw string such
+    as 'foo'. The value is boxed once when the query is parsed.
+    """
+
+    constant: jtt_tree.TreeNode
+
+    def __init__(self, constant: jtt_tree.TreeNode) -> None:
+        self.constant = constant
+        self.next = None
+
+    def perform(self, node: jtt_tree.TreeNode) -> Optional[jtt_tree.TreeNode]:
+        return self.constant
+
+
+class ComparisonOperation(QueryOperation):
+    """
+    This class is used to represent a comparison such as a == b, which produces a boolean.
+    Ordering comparisons between anything but numbers produce nothing, as in JMESPath.
+    Inside a filter, the predicate compiled by filters.compile_comparison is used directly.
+    """
+
+    comparator: str
+    left: filters.Getter
+    right: filters.Getter
+    predicate: filters.Predicate
+
+    def __init__(
+        self,
+        comparator: str,
+        left: filters.Getter,
+        right: filters.Getter,
+        predicate: filters.Predicate,
+    ) -> None:
+        self.comparator = comparator
+        self.left = left
+        self.right = right
+        self.predicate = predicate
+        self.next = None
+
+    def perform(self, node: jtt_tree.TreeNode) -> Optional[jtt_tree.TreeNode]:
+        compare = filters.ORDERINGS.get(self.comparator)
+        if compare is None:
+            return jtt_tree.BooleanTreeNode(self.predicate(node))
+        left = self.left(node)
+        right = self.right(node)
+        if (
+            left is None
+            or right is None
+            or left.type != jtt_tree.NodeType.NUMBER
+            or right.type != jtt_tree.NodeType.NUMBER
+        ):
+            return None
+        return jtt_tree.BooleanTreeNode(compare(left.value, right.value))
+
+
+class NotOperation(QueryOperation):
+    """
+    This class is used to represent a negation !a, which produces a boolean.
+    """
+
+    predicate: filters.Predicate
+
+    def __init__(self, operand: filters.Predicate) -> None:
+        self.predicate = filters.compile_not(operand)
+        self.next = None
+
+    def perform(self, node: jtt_tree.TreeNode) -> Optional[jtt_tree.TreeNode]:
+        return jtt_tree.BooleanTreeNode(self.predicate(node))
+
+
+class AndOperation(QueryOperation):
+    """
+    This class is used to represent a && b, which produces a if it is false, otherwise b.
+    """
+
+    left: filters.Getter
+    right: filters.Getter
+    predicate: filters.Predicate
+
+    def __init__(
+        self, left: filters.Getter, right: filters.Getter, predicate: filters.Predicate
+    ) -> None:
+        self.left = left
+        self.right = right
+        self.predicate = predicate
+        self.next = None
+
+    def perform(self, node: jtt_tree.TreeNode) -> Optional[jtt_tree.TreeNode]:
+        left = self.left(node)
+        if not filters.is_truthy(left):
+            return left
+        return self.right(node)
+
+
+class OrOperation(QueryOperation):
+    """
+    This class is used to represent a || b, which produces a if it is true, otherwise b.
+    """
+
+    left: filters.Getter
+    right: filters.Getter
+    predicate: filters.Predicate
+
+    def __init__(
+        self, left: filters.Getter, right: filters.Getter, predicate: filters.Predicate
+    ) -> None:
+        self.left = left
+        self.right = right
+        self.predicate = predicate
+        self.next = None
+
+    def perform(self, node: jtt_tree.TreeNode) -> Optional[jtt_tree.TreeNode]:
+        left = self.left(node)
+        if filters.is_truthy(left):
+            return left
+        return self.right(node)
+
+
+class MultiSelectListOperation(QueryOperation):
+    """
+    This class is used to represent a multiselect list such as [name, age], which
+    evaluates every expression against the node and collects the results, nulls included.
+    """
+
+    getters: Tuple[filters.Getter, ...]
+
+    def __init__(self, getters: Tuple[filters.Getter, ...]) -> None:
+        self.getters = getters
+        self.next = None
+
+    def perform(self, node: jtt_tree.TreeNode) -> Optional[jtt_tree.TreeNode]:
+        if node.type == jtt_tree.NodeType.NULL:
+            return None
+        return jtt_tree.ListTreeNode.from_nodes(
+            [getter(node) or jtt_tree.NullTreeNode() for getter in self.getters]
+        )
+
+
+class MultiSelectHashOperation(QueryOperation):
+    """
+    This class is used to represent a multiselect hash such as {n: name, a: age}, which
+    evaluates every expression against the node and collects the results by key.
+    """
+
+    keys: Tuple[str, ...]
+    getters: Tuple[filters.Getter, ...]
+
+    def __init__(
+        self, keys: Tuple[str, ...], getters: Tuple[filters.Getter, ...]
+    ) -> None:
+        self.keys = keys
+        self.getters = getters
+        self.next = None
+
+    def perform(self, node: jtt_tree.TreeNode) -> Optional[jtt_tree.TreeNode]:
+        if node.type == jtt_tree.NodeType.NULL:
+            return None
+        return jtt_tree.ObjectTreeNode.from_nodes(
+            {
+                key: getter(node) or jtt_tree.NullTreeNode()
+                for key, getter in zip(self.keys, self.getters)
+            }
+        )
+
+
+class FunctionOperation(QueryOperation):
+    """
+    This class is used to represent a function call such as length(items).
+    Arguments are evaluated against the node, except expression references such as
+    &age, which are passed to the function as getters. See functions.FUNCTIONS.
+    """
+
+    name: str
+    function: Callable[[List[Any]], Optional[jtt_tree.TreeNode]]
+    arguments: Tuple[Tuple[filters.Getter, bool], ...]
+
+    def __init__(
+        self,
+        name: str,
+        function: Callable[[List[Any]], Optional[jtt_tree.TreeNode]],
+        arguments: Tuple[Tuple[filters.Getter, bool], ...],
+    ) -> None:
+        self.name = name
+        self.function = function
+        self.arguments = arguments
+        self.next = None
+
+    def perform(self, node: jtt_tree.TreeNode) -> Optional[jtt_tree.TreeNode]:
+        values = []
+        for getter, reference in self.arguments:
+            if reference:
+                values.append(getter)
+            else:
+                values.append(getter(node) or jtt_tree.NullTreeNode())
+        return self.function(values)
+
+
 class QueryOperationChain:
     """
     This class is used to represent the operations in a query in proper order.
@@ -76,6 +502,23 @@ class QueryOperationChain:
             current = current.next
         current.next = op
 
+    def extend(self, operations: Iterable[QueryOperation]) -> None:
+        """
+        Append several operations, linking them in a single pass over the chain.
+
+        Args:
+            operations: The operations to append, in order.
+        """
+        current = self.head
+        while current and current.next:
+            current = current.next
+        for op in operations:
+            if current is None:
+                self.head = op
+            else:
+                current.next = op
+            current = op
+
     def has_next(self) -> bool:
         """
         Returns True if there are more operations to perform.
@@ -98,11 +541,26 @@ class QueryOperationChain:
     def __iter__(self) -> Generator[QueryOperation, None, None]:
         """
         Returns a generator that yields each operation in the chain.
-        This is a destructive operation as each yield calls pop_operation.
+        Iteration follows the links without consuming them, so a chain can be executed
+        any number of times. Use pop_operation to consume the chain instead.
         """
 
-        while self.has_next():
-            yield self.pop_operation()
+        current = self.head
+        while current:
+            yield current
+            current = current.next
+
+    def key_path(self) -> Optional[Tuple[str, ...]]:
+        """
+        Returns the keys selected by the chain if it consists only of key selections,
+        otherwise None. Such a chain can be resolved through a PathIndex.
+        """
+        keys = []
+        for operation in self:
+            if not isinstance(operation, KeySelectOperation):
+                return None
+            keys.append(operation.key)
+        return tuple(keys)
 
     def __len__(self) -> int:
         """
@@ -1,30 +1,253 @@
-from typing import List
+from typing import Any, List, NoReturn, Optional, Tuple
+import json
 import re
 
 
-from tree_tools.src.jtt_query.operations import QueryOperationChain, KeySelectOperation
+from tree_tools.src import jtt_tree
+from tree_tools.src.jtt_query.operations import (
+    QueryOperation,
+    QueryOperationChain,
+    KeySelectOperation,
+    IndexOperation,
+    SliceOperation,
+    WildcardIndexOperation,
+    WildcardValueOperation,
+    FlattenOperation,
+    FilterOperation,
+    ProjectionOperation,
+    PipeOperation,
+    GroupOperation,
+    LiteralOperation,
+    ComparisonOperation,
+    NotOperation,
+    AndOperation,
+    OrOperation,
+    MultiSelectListOperation,
+    MultiSelectHashOperation,
+    FunctionOperation,
+)
+from tree_tools.src.jtt_query import filters, functions, queries
 
 
-PATTERN_START_WITH_WORD = re.compile(r"[a-zA-Z_]+")
-PATTERN_QUOTE_CHARACTERS = re.compile(r'["\']')
+PATTERN_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+PATTERN_QUOTED = re.compile(r'"(?:[^"\\]|\\.)*"')
+PATTERN_RAW_STRING = re.compile(r"'(?:[^'\\]|\\.)*'")
+PATTERN_LITERAL = re.compile(r"`(?:[^`\\]|\\.)*`")
+# an index, slice or list wildcard is a single token, so the parser never sees numbers
+PATTERN_BRACKET = re.compile(
+    r"""
+    \[\s*(?:
+        (?P<wildcard>\*)
+        |(?P<index>-?\d+)
+        |(?P<start>-?\d+)?\s*:\s*(?P<stop>-?\d+)?\s*(?::\s*(?P<step>-?\d+)?)?
+    )\s*\]
+    """,
+    re.VERBOSE,
+)
+
+IDENTIFIER_START = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_")
+WHITESPACE = frozenset(" \t\n\r")
+SIMPLE_TOKENS = {
+    ".": "dot",
+    "*": "star",
+    ",": "comma",
+    ":": "colon",
+    "@": "current",
+    "(": "lparen",
+    ")": "rparen",
+    "{": "lbrace",
+    "}": "rbrace",
+    "]": "rbracket",
+}
+OPERATOR_TOKENS = {
+    "||": "or",
+    "&&": "and",
+    "==": "comparator",
+    "!=": "comparator",
+    "<=": "comparator",
+    ">=": "comparator",
+    "<": "comparator",
+    ">": "comparator",
+    "|": "pipe",
+    "&": "expref",
+    "!": "not",
+}
+
+# how tightly each token binds to the expression on its left, as in the JMESPath grammar
+BINDING_POWERS = {
+    "eof": 0,
+    "identifier": 0,
+    "quoted": 0,
+    "literal": 0,
+    "raw_string": 0,
+    "current": 0,
+    "expref": 0,
+    "comma": 0,
+    "colon": 0,
+    "rbracket": 0,
+    "rbrace": 0,
+    "rparen": 0,
+    "pipe": 1,
+    "or": 2,
+    "and": 3,
+    "comparator": 5,
+    "flatten": 9,
+    "star": 20,
+    "filter": 21,
+    "dot": 40,
+    "not": 45,
+    "lbrace": 50,
+    "lbracket": 55,
+    "index": 55,
+    "slice": 55,
+    "wildcard": 55,
+    "lparen": 60,
+}
+# tokens binding less tightly than this end the right hand side of a projection
+PROJECTION_STOP = 10
+
+PREDICATE_OPERATIONS = (ComparisonOperation, NotOperation, AndOperation, OrOperation)
+
+# kind, value, start and end position in the query string
+Token = Tuple[str, Any, int, int]
 
 
 class JMESPathValidationError(Exception):
     pass
 
 
+def scan(query: str) -> List[Token]:
+    """
+    Split a query string into tokens in a single pass, ending with an eof token.
+    Each token is recognized from its first character; quoted strings and literals are
+    decoded, and bracket expressions such as [0], [1:-1] and [*] become a single token.
+
+    Args:
+        query: The query string to scan.
+    """
+    tokens = []
+    append = tokens.append
+    length = len(query)
+    pos = 0
+    while pos < length:
+        character = query[pos]
+        kind = SIMPLE_TOKENS.get(character)
+        if kind is not None:
+            append((kind, character, pos, pos + 1))
+            pos += 1
+        elif character in IDENTIFIER_START:
+            end = PATTERN_IDENTIFIER.match(query, pos).end()
+            append(("identifier", query[pos:end], pos, end))
+            pos = end
+        elif character in WHITESPACE:
+            pos += 1
+        elif character == "[":
+            pos = scan_bracket(query, pos, append)
+        elif character == '"':
+            end = match_end(PATTERN_QUOTED, query, pos, "quoted identifier")
+            try:
+                value = json.loads(query[pos:end])
+            except ValueError as error:
+                raise JMESPathValidationError(
+                    f"Invalid quoted identifier {query[pos:end]} at position {pos}."
+                ) from error
+            append(("quoted", value, pos, end))
+            pos = end
+        elif character == "'":
+            end = match_end(PATTERN_RAW_STRING, query, pos, "raw string")
+            value = query[pos + 1 : end - 1].replace("\\'", "'")
+            append(("raw_string", value, pos, end))
+            pos = end
+        elif character == "`":
+            end = match_end(PATTERN_LITERAL, query, pos, "literal")
+            try:
+                value = json.loads(query[pos + 1 : end - 1].replace("\\`", "`"))
+            except ValueError as error:
+                raise JMESPathValidationError(
+                    f"Invalid literal {query[pos:end]} at position {pos}."
+                ) from error
+            append(("literal", value, pos, end))
+            pos = end
+        else:
+            pos = scan_operator(query, pos, append)
+    append(("eof", None, length, length))
+    return tokens
+
+
+def match_end(pattern: re.Pattern, query: str, pos: int, name: str) -> int:
+    match = pattern.match(query, pos)
+    if not match:
+        raise JMESPathValidationError(f"Unterminated {name} at position {pos}.")
+    return match.end()
+
+
+def scan_bracket(query: str, pos: int, append: Any) -> int:
+    """
+    Scan the token starting with [ and return the position after it.
+    """
+    following = query[pos + 1 : pos + 2]
+    if following == "]":
+        append(("flatten", "[]", pos, pos + 2))
+        return pos + 2
+    if following == "?":
+        append(("filter", "[?", pos, pos + 2))
+        return pos + 2
+    match = PATTERN_BRACKET.match(query, pos)
+    if not match:
+        append(("lbracket", "[", pos, pos + 1))
+        return pos + 1
+    end = match.end()
+    if match.group("wildcard"):
+        append(("wildcard", None, pos, end))
+    elif match.group("index") is not None:
+        append(("index", int(match.group("index")), pos, end))
+    else:
+        bounds = tuple(
+            None if bound is None else int(bound)
+            for bound in match.group("start", "stop", "step")
+        )
+        append(("slice", bounds, pos, end))
+    return end
+
+
+def scan_operator(query: str, pos: int, append: Any) -> int:
+    """
+    Scan an operator of one or two characters and return the position after it.
+    """
+    for end in (pos + 2, pos + 1):
+        kind = OPERATOR_TOKENS.get(query[pos:end])
+        if kind is not None:
+            append((kind, query[pos:end], pos, end))
+            return end
+    raise JMESPathValidationError(
+        f"Unexpected character {query[pos]!r} at position {pos}."
+    )
+
+
 class JMESPathParser:
     """
     This class is used to parse JMESPath query strings into query operations to execute.
     JMESPath is a query language for JSON-like data, explained in detail at https://jmespath.org/.
+    The query is scanned once into tokens, see scan, and parsed by precedence climbing:
+    each token either starts an expression (nud_ methods) or extends the expression on
+    its left (led_ methods) if it binds more tightly than its context, see BINDING_POWERS.
+    Paths, projections and pipes become operations of a single chain, which QueryPlan
+    arranges for evaluation; sub-expressions such as function arguments, multiselects and
+    operands are compiled into getters held by the operation that uses them.
     """
 
     identifiers: List[str]
     operation_queue: QueryOperationChain
+    query: str
+    tokens: List[Token]
+    pos: int
 
     def __init__(self) -> None:
         self.identifiers = []
         self.operation_queue = QueryOperationChain()
+        self.query = ""
+        self.tokens = []
+        self.pos = 0
 
     def validate_query(self, query: str) -> None:
         """
@@ -34,48 +257,342 @@ class JMESPathParser:
         Args:
             query: The query string to validate.
         """
-        if not query:
-            raise JMESPathValidationError("Query string cannot be empty.")
-
-        if not PATTERN_START_WITH_WORD.match(
-            query
-        ) and not PATTERN_QUOTE_CHARACTERS.match(query):
-            raise JMESPathValidationError(
-                "Query string must start with a word character or a quote character."
-            )
+        self.parse(query)
 
     def tokenize(self, query: str) -> None:
         """
-        This method breaks up a query string into tokens using expected delimiters and special symbols.
-        A query string is processed from left to right.
+        This method scans a query string and stores the text of its tokens in identifiers.
+        Dots only separate tokens and are not stored. Tokens are not checked against the
+        grammar, use validate_query for that.
 
         Args:
             query: The query string to tokenize.
         """
-
-        if "." in query:
-            self.identifiers = query.split(".")
-        else:
-            self.identifiers.append(query)
-
-    def create_query_operations(self) -> None:
-        """
-        This method creates query objects from stored tokens and adds them to the operation queue.
-        """
-        for identifier in self.identifiers:
-            key_operation = KeySelectOperation(identifier)
-            self.operation_queue.append(key_operation)
+        self.query = query
+        self.tokens = scan(query)
+        self.pos = 0
+        self.identifiers = [
+            query[start:end]
+            for kind, _, start, end in self.tokens
+            if kind != "dot" and kind != "eof"
+        ]
 
     def parse(self, query: str) -> QueryOperationChain:
         """
         Main method to parse a query string into a query chain.
-        This calls validate_query, and may raise a JMESPathValidationError.
+        Raises JMESPathValidationError if the query is invalid.
 
         Args:
             query: The query string to parse.
         """
-
-        self.validate_query(query)
-        self.tokenize(query)
-        self.create_query_operations()
+        operations = self.parse_operations(query)
+        self.operation_queue = QueryOperationChain()
+        self.operation_queue.extend(operations)
         return self.operation_queue
+
+    def parse_predicate(self, expression: str) -> filters.Predicate:
+        """
+        Parse an expression into a predicate over nodes, as in a filter projection.
+        Raises JMESPathValidationError if the expression is invalid.
+
+        Args:
+            expression: The expression to parse, such as price > `10`.
+        """
+        return self.predicate(self.parse_operations(expression))
+
+    def parse_operations(self, query: str) -> List[QueryOperation]:
+        if not query:
+            raise JMESPathValidationError("Query string cannot be empty.")
+        self.query = query
+        self.tokens = scan(query)
+        self.pos = 0
+        try:
+            operations = self.expression(0)
+        except RecursionError:
+            raise JMESPathValidationError("Query string is nested too deeply.")
+        if self.tokens[self.pos][0] != "eof":
+            self.unexpected(self.tokens[self.pos])
+        return operations
+
+    def expression(self, binding_power: int) -> List[QueryOperation]:
+        """
+        Parse the expression starting at the current token, extending it with every
+        following token that binds more tightly than binding_power.
+        """
+        tokens = self.tokens
+        token = tokens[self.pos]
+        self.pos += 1
+        nud = getattr(self, "nud_" + token[0], None)
+        if nud is None:
+            self.unexpected(token)
+        left = nud(token)
+        while binding_power < BINDING_POWERS[tokens[self.pos][0]]:
+            token = tokens[self.pos]
+            led = getattr(self, "led_" + token[0], None)
+            if led is None:
+                self.unexpected(token)
+            self.pos += 1
+            left = led(token, left)
+        return left
+
+    def unexpected(self, token: Token) -> NoReturn:
+        if token[0] == "eof":
+            raise JMESPathValidationError("Unexpected end of query.")
+        raise JMESPathValidationError(
+            f"Unexpected token {self.query[token[2]:token[3]]!r} at position {token[2]}."
+        )
+
+    def expect(self, kind: str) -> Token:
+        token = self.tokens[self.pos]
+        if token[0] != kind:
+            self.unexpected(token)
+        self.pos += 1
+        return token
+
+    def match(self, kind: str) -> bool:
+        if self.tokens[self.pos][0] == kind:
+            self.pos += 1
+            return True
+        return False
+
+    def projection_rhs(self, binding_power: int) -> List[QueryOperation]:
+        """
+        Parse the operations a projection applies to each element, which may be none.
+        """
+        token = self.tokens[self.pos]
+        kind = token[0]
+        if BINDING_POWERS[kind] < PROJECTION_STOP:
+            return []
+        if kind == "dot":
+            self.pos += 1
+            return self.dot_rhs(binding_power)
+        if kind in ("lbracket", "index", "slice", "wildcard", "filter"):
+            return self.expression(binding_power)
+        self.unexpected(token)
+
+    def dot_rhs(self, binding_power: int) -> List[QueryOperation]:
+        token = self.tokens[self.pos]
+        kind = token[0]
+        if kind in ("identifier", "quoted", "star"):
+            return self.expression(binding_power)
+        if kind == "lbracket":
+            self.pos += 1
+            return self.nud_lbracket(token)
+        if kind == "lbrace":
+            self.pos += 1
+            return self.nud_lbrace(token)
+        self.unexpected(token)
+
+    def nud_identifier(self, token: Token) -> List[QueryOperation]:
+        if self.tokens[self.pos][0] == "lparen":
+            self.pos += 1
+            return [self.function_call(token)]
+        return [KeySelectOperation(token[1])]
+
+    def nud_quoted(self, token: Token) -> List[QueryOperation]:
+        return [KeySelectOperation(token[1])]
+
+    def nud_current(self, token: Token) -> List[QueryOperation]:
+        # the current node is where evaluation already is
+        return []
+
+    def nud_literal(self, token: Token) -> List[QueryOperation]:
+        return [LiteralOperation(jtt_tree.box_value(token[1]))]
+
+    def nud_raw_string(self, token: Token) -> List[QueryOperation]:
+        return [LiteralOperation(jtt_tree.StringTreeNode(token[1]))]
+
+    def nud_index(self, token: Token) -> List[QueryOperation]:
+        return [IndexOperation(token[1])]
+
+    def nud_star(self, token: Token) -> List[QueryOperation]:
+        operations = [WildcardValueOperation()]
+        operations.extend(self.projection_rhs(BINDING_POWERS["star"]))
+        return operations
+
+    def nud_wildcard(self, token: Token) -> List[QueryOperation]:
+        return self.led_wildcard(token, [])
+
+    def nud_slice(self, token: Token) -> List[QueryOperation]:
+        return self.led_slice(token, [])
+
+    def nud_flatten(self, token: Token) -> List[QueryOperation]:
+        return self.led_flatten(token, [])
+
+    def nud_filter(self, token: Token) -> List[QueryOperation]:
+        return self.led_filter(token, [])
+
+    def nud_not(self, token: Token) -> List[QueryOperation]:
+        operand = self.expression(BINDING_POWERS["not"])
+        return [NotOperation(self.predicate(operand))]
+
+    def nud_lparen(self, token: Token) -> List[QueryOperation]:
+        operations = self.expression(0)
+        self.expect("rparen")
+        # a projection or pipe inside the group must not extend to what follows it
+        if BINDING_POWERS[self.tokens[self.pos][0]] >= PROJECTION_STOP and any(
+            isinstance(operation, (ProjectionOperation, PipeOperation))
+            for operation in operations
+        ):
+            return [GroupOperation(self.getter(operations))]
+        return operations
+
+    def nud_lbracket(self, token: Token) -> List[QueryOperation]:
+        getters = []
+        while True:
+            getters.append(self.getter(self.expression(0)))
+            if not self.match("comma"):
+                break
+        self.expect("rbracket")
+        return [MultiSelectListOperation(tuple(getters))]
+
+    def nud_lbrace(self, token: Token) -> List[QueryOperation]:
+        keys = []
+        getters = []
+        while True:
+            key = self.tokens[self.pos]
+            if key[0] != "identifier" and key[0] != "quoted":
+                self.unexpected(key)
+            self.pos += 1
+            self.expect("colon")
+            keys.append(key[1])
+            getters.append(self.getter(self.expression(0)))
+            if not self.match("comma"):
+                break
+        self.expect("rbrace")
+        return [MultiSelectHashOperation(tuple(keys), tuple(getters))]
+
+    def led_dot(self, token: Token, left: List[QueryOperation]) -> List[QueryOperation]:
+        left.extend(self.dot_rhs(BINDING_POWERS["dot"]))
+        return left
+
+    def led_index(
+        self, token: Token, left: List[QueryOperation]
+    ) -> List[QueryOperation]:
+        left.append(IndexOperation(token[1]))
+        return left
+
+    def led_slice(
+        self, token: Token, left: List[QueryOperation]
+    ) -> List[QueryOperation]:
+        start, stop, step = token[1]
+        if step == 0:
+            raise JMESPathValidationError("Slice step cannot be zero.")
+        left.append(SliceOperation(start, stop, step))
+        left.extend(self.projection_rhs(BINDING_POWERS["star"]))
+        return left
+
+    def led_wildcard(
+        self, token: Token, left: List[QueryOperation]
+    ) -> List[QueryOperation]:
+        left.append(WildcardIndexOperation())
+        left.extend(self.projection_rhs(BINDING_POWERS["star"]))
+        return left
+
+    def led_flatten(
+        self, token: Token, left: List[QueryOperation]
+    ) -> List[QueryOperation]:
+        left.append(FlattenOperation())
+        left.extend(self.projection_rhs(BINDING_POWERS["flatten"]))
+        return left
+
+    def led_filter(
+        self, token: Token, left: List[QueryOperation]
+    ) -> List[QueryOperation]:
+        condition = self.expression(0)
+        end = self.expect("rbracket")[2]
+        expression = self.query[token[3] : end].strip()
+        left.append(FilterOperation(expression, self.predicate(condition)))
+        left.extend(self.projection_rhs(BINDING_POWERS["filter"]))
+        return left
+
+    def led_pipe(
+        self, token: Token, left: List[QueryOperation]
+    ) -> List[QueryOperation]:
+        left.append(PipeOperation())
+        left.extend(self.expression(BINDING_POWERS["pipe"]))
+        return left
+
+    def led_or(self, token: Token, left: List[QueryOperation]) -> List[QueryOperation]:
+        right = self.expression(BINDING_POWERS["or"])
+        predicate = filters.compile_or(self.predicate(left), self.predicate(right))
+        return [OrOperation(self.getter(left), self.getter(right), predicate)]
+
+    def led_and(self, token: Token, left: List[QueryOperation]) -> List[QueryOperation]:
+        right = self.expression(BINDING_POWERS["and"])
+        predicate = filters.compile_and(self.predicate(left), self.predicate(right))
+        return [AndOperation(self.getter(left), self.getter(right), predicate)]
+
+    def led_comparator(
+        self, token: Token, left: List[QueryOperation]
+    ) -> List[QueryOperation]:
+        right = self.expression(BINDING_POWERS["comparator"])
+        left_operand = self.operand(left)
+        right_operand = self.operand(right)
+        predicate = filters.compile_comparison(token[1], left_operand, right_operand)
+        return [
+            ComparisonOperation(token[1], left_operand[0], right_operand[0], predicate)
+        ]
+
+    def function_call(self, name: Token) -> FunctionOperation:
+        function = functions.FUNCTIONS.get(name[1])
+        if function is None:
+            raise JMESPathValidationError(
+                f"Unknown function {name[1]}() at position {name[2]}."
+            )
+        arguments = []
+        if not self.match("rparen"):
+            while True:
+                reference = self.match("expref")
+                if reference != function.accepts_reference(len(arguments)):
+                    raise JMESPathValidationError(
+                        f"{name[1]}() expected argument {len(arguments) + 1}"
+                        f" {'not ' if reference else ''}to be an expression reference."
+                    )
+                arguments.append((self.getter(self.expression(0)), reference))
+                if not self.match("comma"):
+                    break
+            self.expect("rparen")
+        error = function.check_arity(len(arguments))
+        if error:
+            raise JMESPathValidationError(error)
+        return FunctionOperation(name[1], function, tuple(arguments))
+
+    @staticmethod
+    def getter(operations: List[QueryOperation]) -> filters.Getter:
+        """
+        Compile the operations of a sub-expression into a getter over nodes.
+        Paths of keys and indexes become a single closure, see filters.compile_path.
+        """
+        path = []
+        for operation in operations:
+            if type(operation) == KeySelectOperation:
+                path.append(operation.key)
+            elif type(operation) == IndexOperation:
+                path.append(operation.index)
+            else:
+                break
+        else:
+            return filters.compile_path(tuple(path))
+        if len(operations) == 1:
+            return operations[0].perform
+        return queries.QueryPlan(operations).evaluate
+
+    def predicate(self, operations: List[QueryOperation]) -> filters.Predicate:
+        """
+        Compile the operations of a sub-expression into a predicate over nodes.
+        Comparisons and boolean operators provide their own predicate.
+        """
+        if len(operations) == 1 and isinstance(operations[0], PREDICATE_OPERATIONS):
+            return operations[0].predicate
+        return filters.compile_truthy(self.getter(operations))
+
+    def operand(
+        self, operations: List[QueryOperation]
+    ) -> Tuple[filters.Getter, Optional[jtt_tree.TreeNode]]:
+        """
+        Returns the getter of a comparison operand, plus the boxed value if it is a literal.
+        """
+        if len(operations) == 1 and type(operations[0]) == LiteralOperation:
+            return operations[0].perform, operations[0].constant
+        return self.getter(operations), None
@@ -0,0 +1,115 @@
+from typing import Any, Dict, Tuple, Union
+
+from tree_tools.src import jtt_tree
+from tree_tools.src.jtt_query import operations
+
+
+class Step:
+    """
+    A step of a reach path that applies to every child of a container rather than one.
+    """
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __repr__(self) -> str:
+        return self.name
+
+
+# every element of a list, or every value of an object
+ELEMENTS = Step("ELEMENTS")
+VALUES = Step("VALUES")
+
+ReachPath = Tuple[Union[str, int, Step], ...]
+
+
+def reach_path(chain: operations.QueryOperationChain) -> ReachPath:
+    """
+    Returns the steps a query can take from the root: object keys, list indexes, and
+    ELEMENTS or VALUES for projections. Whatever the last step reaches may be read in full,
+    as the result or by a filter, so it must be kept whole.
+    Operations whose access cannot be predicted end the path where they start, so the
+    path stays safe as operations are added.
+
+    Args:
+        chain: The operation chain of a parsed query.
+    """
+    steps = []
+    for operation in chain:
+        if isinstance(operation, operations.KeySelectOperation):
+            steps.append(operation.key)
+        elif isinstance(operation, operations.IndexOperation):
+            steps.append(operation.index)
+        elif isinstance(
+            operation, (operations.WildcardIndexOperation, operations.SliceOperation)
+        ):
+            steps.append(ELEMENTS)
+        elif isinstance(operation, operations.WildcardValueOperation):
+            steps.append(VALUES)
+        else:
+            # filters read any part of the elements, flattens mix two levels together
+            break
+    return tuple(steps)
+
+
+def prune_data(value: Any, path: ReachPath) -> Any:
+    """
+    Returns a copy of decoded JSON holding only what a query can reach, see reach_path.
+    Object members off the path are left out and list elements off an index are replaced
+    by None, so lengths and negative indexes still hold; containers of the wrong type for
+    a step are emptied, since the query cannot read them anyway. Only the containers on
+    the path are copied: whatever the path ends at is shared with the input.
+
+    Args:
+        value: The decoded JSON value.
+        path: The reach path of the query.
+    """
+    # copies are filled slot by slot from an explicit stack, so long query paths over
+    # deep data do not recurse
+    root = [None]
+    stack = [(value, 0, root, 0)]
+    while stack:
+        value, depth, target, slot = stack.pop()
+        if depth == len(path) or (type(value) != dict and type(value) != list):
+            target[slot] = value
+            continue
+        step = path[depth]
+        depth += 1
+        if type(value) == dict:
+            if step is VALUES:
+                copy = target[slot] = dict.fromkeys(value)
+                stack.extend((v, depth, copy, k) for k, v in value.items())
+            elif type(step) == str and step in value:
+                copy = target[slot] = {step: None}
+                stack.append((value[step], depth, copy, step))
+            else:
+                target[slot] = {}
+        elif step is ELEMENTS:
+            copy = target[slot] = [None] * len(value)
+            stack.extend((v, depth, copy, i) for i, v in enumerate(value))
+        elif type(step) == int and -len(value) <= step < len(value):
+            copy = target[slot] = [None] * len(value)
+            stack.append((value[step], depth, copy, step))
+        else:
+            target[slot] = []
+    return root[0]
+
+
+def build_pruned(
+    data: Dict[str, Any], path: ReachPath, lazy: bool = True
+) -> jtt_tree.ObjectTreeNode:
+    """
+    Build a tree holding only the branches a query can reach, see prune_data.
+    Evaluating the query against the pruned tree gives the same result as against the full
+    tree, but other queries may not. Descendant counts describe the pruned tree.
+
+    Args:
+        data: The decoded JSON object.
+        path: The reach path of the query.
+        lazy: If True, child nodes are only built when they are first accessed.
+    """
+    if type(data) != dict:
+        raise ValueError(f"Invalid type: {type(data)} for value {data}")
+    return jtt_tree.create_tree(prune_data(data, path), lazy=lazy)
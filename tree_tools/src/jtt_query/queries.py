@@ -1,7 +1,8 @@
-from typing import Optional
+import itertools
+from typing import Any, Iterable, Iterator, Optional, Tuple
 
 from tree_tools.src import jtt_tree
-from tree_tools.src.jtt_query import operations
+from tree_tools.src.jtt_query import instrumentation, operations, pruning
 
 
 class NodeQueryError(Exception):
@@ -32,34 +33,355 @@ class Cursor:
         self.node = node
 
 
+class QueryPlan:
+    """
+    This class arranges the operations of a chain for evaluation.
+    Operations before the first projection are applied one after another. Each projection
+    then becomes a stage: its elements are fed through the operations that follow it (the
+    stage's rhs plan) and null results are dropped. A flatten ends the current projection
+    and starts a new stage over the results so far, as in JMESPath.
+    Stages are chained as generators, so elements flow through the whole pipeline one at
+    a time and no stage materializes an intermediate list.
+    Adjacent key selections are merged into one KeyPathOperation, see merge_keys.
+    A pipe ends the plan: the operations after it form the plan stored in pipe, which is
+    evaluated against the collected result of this one, or null if there is none.
+    """
+
+    __slots__ = ("leading", "stages", "pipe")
+
+    leading: Tuple[operations.QueryOperation, ...]
+    stages: Tuple[Tuple[operations.ProjectionOperation, Optional["QueryPlan"]], ...]
+    pipe: Optional["QueryPlan"]
+
+    def __init__(self, chain: Iterable[operations.QueryOperation]) -> None:
+        leading = []
+        stages = []
+        self.pipe = None
+        chain = iter(chain)
+        for operation in chain:
+            if isinstance(operation, operations.PipeOperation):
+                self.pipe = QueryPlan(chain)
+                break
+            if isinstance(operation, operations.FlattenOperation) or (
+                isinstance(operation, operations.ProjectionOperation) and not stages
+            ):
+                stages.append((operation, []))
+            elif stages:
+                stages[-1][1].append(operation)
+            else:
+                leading.append(operation)
+        self.leading = self.merge_keys(leading)
+        self.stages = tuple(
+            (operation, QueryPlan(rhs) if rhs else None) for operation, rhs in stages
+        )
+
+    @property
+    def last(self) -> "QueryPlan":
+        """
+        Returns the plan after the last pipe, which produces the final result.
+        """
+        plan = self
+        while plan.pipe is not None:
+            plan = plan.pipe
+        return plan
+
+    @staticmethod
+    def merge_keys(
+        chain: Iterable[operations.QueryOperation],
+    ) -> Tuple[operations.QueryOperation, ...]:
+        """
+        Returns the operations with every run of two or more key selections merged.
+        """
+        merged = []
+        for is_key, run in itertools.groupby(
+            chain,
+            lambda operation: isinstance(operation, operations.KeySelectOperation),
+        ):
+            run = tuple(run)
+            if is_key and len(run) > 1:
+                merged.append(operations.KeyPathOperation(run))
+            else:
+                merged.extend(run)
+        return tuple(merged)
+
+    def follow(self, node: jtt_tree.TreeNode) -> Optional[jtt_tree.TreeNode]:
+        """
+        Apply the operations before the first projection.
+        """
+        for operation in self.leading:
+            node = operation.perform(node)
+            if node is None:
+                return None
+        return node
+
+    def project(self, node: jtt_tree.TreeNode) -> Optional[Iterator[jtt_tree.TreeNode]]:
+        """
+        Returns a lazy iterator over the projected results starting from node, or None if
+        the first projection does not apply to the node.
+        """
+        operation, rhs = self.stages[0]
+        elements = operation.elements(node)
+        if elements is None:
+            return None
+        results = self.project_elements(elements, rhs)
+        for operation, rhs in self.stages[1:]:
+            results = self.project_elements(operation.flatten(results), rhs)
+        return results
+
+    @staticmethod
+    def project_elements(
+        elements: Iterator[jtt_tree.TreeNode], rhs: Optional["QueryPlan"]
+    ) -> Iterator[jtt_tree.TreeNode]:
+        for element in elements:
+            result = rhs.evaluate(element) if rhs else element
+            if result is not None and result.type != jtt_tree.NodeType.NULL:
+                yield result
+
+    def collect(self, node: jtt_tree.TreeNode) -> Optional[jtt_tree.TreeNode]:
+        """
+        Evaluate this plan up to its pipe, collecting projections into list nodes.
+        """
+        node = self.follow(node)
+        if node is None or not self.stages:
+            return node
+        results = self.project(node)
+        if results is None:
+            return None
+        return jtt_tree.ListTreeNode.from_nodes(list(results))
+
+    def evaluate(self, node: jtt_tree.TreeNode) -> Optional[jtt_tree.TreeNode]:
+        """
+        Evaluate the whole plan against a node, collecting projections into list nodes.
+        """
+        plan = self
+        node = plan.collect(node)
+        while plan.pipe is not None:
+            plan = plan.pipe
+            node = plan.collect(node or jtt_tree.NullTreeNode())
+        return node
+
+
 class QueryProcessor:
     """
     This class is used to evaluate queries against TreeNode objects.
     """
 
     operation_chain: operations.QueryOperationChain
+    plan: QueryPlan
     result_tree: jtt_tree.TreeNode
     read_tree: jtt_tree.TreeNode
     cursor: Cursor
 
     def __init__(
-        self, tree: jtt_tree.TreeNode, operation_chain: operations.QueryOperationChain
+        self,
+        tree: jtt_tree.TreeNode,
+        operation_chain: operations.QueryOperationChain,
+        plan: Optional[QueryPlan] = None,
     ) -> None:
         self.read_tree = tree
         self.result_tree = None
         self.operation_chain = operation_chain
+        self.plan = plan or QueryPlan(operation_chain)
         self.cursor = Cursor()
         self.cursor.visit(self.read_tree)
 
-    def execute(self) -> jtt_tree.TreeNode:
+    def walk(self, plan: Optional[QueryPlan] = None) -> Optional[jtt_tree.TreeNode]:
         """
-        Execute the query operations and store the result in the result_tree attribute.
+        Move the cursor from the root through the operations before the first projection.
+        If the query has pipes, the plans before the last pipe are evaluated in full first,
+        and the cursor stops before the first projection of the last plan.
+        Returns the node reached, or None if an operation did not apply.
+
+        Args:
+            plan: The plan to follow instead of the processor's own plan.
         """
-        for operation in self.operation_chain:
+        plan = plan or self.plan
+        self.cursor.visit(self.read_tree)
+        while plan.pipe is not None:
+            self.cursor.visit(plan.collect(self.cursor.node) or jtt_tree.NullTreeNode())
+            plan = plan.pipe
+        for operation in plan.leading:
             self.cursor.visit(operation.perform(self.cursor.node))
             if not self.cursor.node:
-                self.result_tree = jtt_tree.NullTreeNode()
-                return self.result_tree
+                return None
+        return self.cursor.node
+
+    def iter_results(self, limit: Optional[int] = None) -> Iterator[jtt_tree.TreeNode]:
+        """
+        Yield the results of the query one at a time.
+        A projection yields each non-null projected element as soon as it is found, and any
+        other query yields its single result unless it is null. The traversal stops as soon
+        as the caller stops iterating or limit results have been produced.
+
+        Args:
+            limit: The maximum number of results to produce.
+        """
+        plan = self.plan
+        profile = instrumentation.active_profile()
+        if profile is not None:
+            plan = profile.instrument(self.operation_chain, plan)
+        node = self.walk(plan)
+        plan = plan.last
+        if node is None:
+            return
+        if not plan.stages:
+            if node.type != jtt_tree.NodeType.NULL and limit != 0:
+                yield node
+            return
+        results = plan.project(node)
+        if results is None:
+            return
+        if limit is not None:
+            results = itertools.islice(results, limit)
+        yield from results
+
+    def first(self) -> jtt_tree.TreeNode:
+        """
+        Return the first result of the query without evaluating the rest of it,
+        or a NullTreeNode if there is none.
+        """
+        for result in self.iter_results(limit=1):
+            return result
+        return jtt_tree.NullTreeNode()
+
+    def execute(self, limit: Optional[int] = None) -> jtt_tree.TreeNode:
+        """
+        Execute the query operations and store the result in the result_tree attribute.
+        The cursor starts from the root on every call, so a processor can be re-executed.
+        If the tree carries a PathIndex, a chain of key selections is a single lookup.
+        A projection produces a list node; limit caps the number of elements collected,
+        and the traversal stops once it is reached.
+        While a profile is active (see instrumentation.profile), the execution is recorded
+        in its execute phase and per operation.
+
+        Args:
+            limit: The maximum number of projected elements to collect.
+        """
+        profile = instrumentation.active_profile()
+        if profile is None:
+            self.result_tree = self.evaluate(self.plan, limit)
+            return self.result_tree
 
-        self.result_tree = self.cursor.node
+        with profile.phase("execute") as counters:
+            plan = profile.instrument(self.operation_chain, self.plan)
+            visited, allocated = profile.operation_totals()
+            self.result_tree = self.evaluate(plan, limit)
+            total_visited, total_allocated = profile.operation_totals()
+            counters.nodes_visited += total_visited - visited
+            counters.nodes_allocated += total_allocated - allocated
+            if plan.last.stages or self.result_tree.type == jtt_tree.NodeType.NULL:
+                counters.nodes_allocated += 1
         return self.result_tree
+
+    def evaluate(
+        self, plan: QueryPlan, limit: Optional[int] = None
+    ) -> jtt_tree.TreeNode:
+        """
+        Evaluate a plan against the tree, see execute.
+        """
+        path_index = getattr(self.read_tree, "path_index", None)
+        if path_index is not None:
+            key_path = self.operation_chain.key_path()
+            if key_path:
+                return path_index.lookup(key_path) or jtt_tree.NullTreeNode()
+
+        node = self.walk(plan)
+        plan = plan.last
+        if node is not None and plan.stages:
+            results = plan.project(node)
+            if results is None:
+                node = None
+            else:
+                if limit is not None:
+                    results = itertools.islice(results, limit)
+                node = jtt_tree.ListTreeNode.from_nodes(list(results))
+
+        return node or jtt_tree.NullTreeNode()
+
+
+class CompiledQuery:
+    """
+    This class holds a parsed query so that it can be executed against any number of trees.
+    Execution only reads the operation chain, so a compiled query can be cached and shared.
+    """
+
+    __slots__ = ("_query", "_operation_chain", "_plan", "_reach")
+
+    def __init__(
+        self, query: str, operation_chain: operations.QueryOperationChain
+    ) -> None:
+        self._query = query
+        self._operation_chain = operation_chain
+        self._plan = QueryPlan(operation_chain)
+        self._reach = pruning.reach_path(operation_chain)
+
+    @property
+    def query(self) -> str:
+        return self._query
+
+    @property
+    def operation_chain(self) -> operations.QueryOperationChain:
+        return self._operation_chain
+
+    @property
+    def plan(self) -> QueryPlan:
+        return self._plan
+
+    @property
+    def reach(self) -> pruning.ReachPath:
+        return self._reach
+
+    def build_tree(self, data: Any) -> jtt_tree.ObjectTreeNode:
+        """
+        Build a lazy tree holding only the branches this query can reach, see
+        pruning.build_pruned. Use it for one-shot queries; a tree that serves several
+        queries should be built with create_tree.
+
+        Args:
+            data: The decoded JSON object.
+        """
+        return pruning.build_pruned(data, self._reach)
+
+    def __repr__(self) -> str:
+        return f"CompiledQuery({self._query!r})"
+
+    def processor(self, tree: jtt_tree.TreeNode) -> QueryProcessor:
+        """
+        Create a QueryProcessor that evaluates this query against a tree.
+
+        Args:
+            tree: The TreeNode to search.
+        """
+        return QueryProcessor(tree, self._operation_chain, self._plan)
+
+    def execute(
+        self, tree: jtt_tree.TreeNode, limit: Optional[int] = None
+    ) -> jtt_tree.TreeNode:
+        """
+        Evaluate the query against a tree and return the resulting node.
+
+        Args:
+            tree: The TreeNode to search.
+            limit: The maximum number of projected elements to collect.
+        """
+        return self.processor(tree).execute(limit)
+
+    def first(self, tree: jtt_tree.TreeNode) -> jtt_tree.TreeNode:
+        """
+        Return the first result of the query against a tree, see QueryProcessor.first.
+
+        Args:
+            tree: The TreeNode to search.
+        """
+        return self.processor(tree).first()
+
+    def search(self, data: Any) -> Any:
+        """
+        Evaluate the query against a decoded JSON object or a tree and serialize the result.
+
+        Args:
+            data: The decoded JSON object, or an already built TreeNode.
+        """
+        if not isinstance(data, jtt_tree.TreeNode):
+            data = self.build_tree(data)
+        return self.execute(data).serialize()
@@ -0,0 +1,304 @@
+import asyncio
+import itertools
+import json
+import socket
+import typing
+
+from tree_tools.src import jtt_binary, jtt_output, jtt_stream, jtt_tree, search
+from tree_tools.src.jtt_query.cache import ResultCache
+
+
+BINARY_SUFFIX = ".jttb"
+# responses are written to the socket in chunks of about this many characters
+RESPONSE_CHUNK_SIZE = 64 * 1024
+STREAM_LIMIT = 16 * 1024 * 1024
+RESULT_PREFIX = b'{"result": '
+
+
+class QueryServerError(Exception):
+    pass
+
+
+def load_document(path: str) -> typing.Tuple[jtt_tree.TreeNode, typing.Any]:
+    """
+    Load a document from a JSON file, or from a JTT binary file if the path ends with
+    .jttb. Returns the root node and the object owning its storage, if any.
+
+    Args:
+        path: The path of the file to load.
+    """
+    if path.endswith(BINARY_SUFFIX):
+        mapped = jtt_binary.open_binary(path)
+        return mapped.root, mapped
+    with open(path, "rb") as file:
+        return jtt_stream.create_tree_from_stream(file), None
+
+
+def error_response(error: Exception) -> str:
+    return json.dumps({"error": f"{type(error).__name__}: {error}"}) + "\n"
+
+
+def chunk_response(pieces: typing.Iterable[str]) -> typing.Iterator[str]:
+    """
+    Join the pieces of a response into chunks of about RESPONSE_CHUNK_SIZE characters,
+    ending with the line break that terminates the response.
+    """
+    chunk = []
+    size = 0
+    for piece in pieces:
+        chunk.append(piece)
+        size += len(piece)
+        if size >= RESPONSE_CHUNK_SIZE:
+            yield "".join(chunk)
+            chunk.clear()
+            size = 0
+    chunk.append("\n")
+    yield "".join(chunk)
+
+
+class QueryServer:
+    """
+    This class keeps named trees resident in memory and answers queries against them.
+    Clients send one JSON request per line and receive one JSON response per line:
+    - {"document": name, "query": query} answers {"result": ...}
+    - {"op": "list"} answers {"result": [names of the documents]}
+    - {"op": "stats"} answers {"result": statistics of the result cache}
+    Failures answer {"error": message}. Results are encoded straight from the tree,
+    see jtt_output. Queries are compiled once and cached, see search.compile, and so
+    are their results until the document is edited, see ResultCache.
+    Queries are evaluated and encoded in worker threads, so a slow query does not hold
+    up the other connections.
+    """
+
+    documents: typing.Dict[str, jtt_tree.TreeNode]
+    cache: ResultCache
+
+    def __init__(
+        self,
+        documents: typing.Dict[str, jtt_tree.TreeNode],
+        cache: typing.Optional[ResultCache] = None,
+    ) -> None:
+        self.documents = dict(documents)
+        self.cache = ResultCache() if cache is None else cache
+        self.owners = []
+        self.server = None
+
+    @classmethod
+    def from_paths(cls, paths: typing.Dict[str, str]) -> "QueryServer":
+        """
+        Create a server holding the documents loaded from files.
+
+        Args:
+            paths: The path of each document, by name.
+        """
+        server = cls({})
+        for name, path in paths.items():
+            tree, owner = load_document(path)
+            server.documents[name] = tree
+            if owner is not None:
+                server.owners.append(owner)
+        return server
+
+    def close(self) -> None:
+        """
+        Release the documents that are mapped from files.
+        """
+        for owner in self.owners:
+            owner.close()
+        self.owners = []
+
+    def answer(self, request: typing.Any) -> typing.Iterator[str]:
+        """
+        Evaluate a decoded request and return an iterator over the JSON text of the
+        response. Invalid requests raise before anything is returned.
+        """
+        if type(request) != dict:
+            raise QueryServerError("Request must be a JSON object")
+        op = request.get("op", "query")
+        if op == "list":
+            return iter([json.dumps({"result": sorted(self.documents)})])
+        if op == "stats":
+            return iter([json.dumps({"result": self.cache.cache_info()._asdict()})])
+        if op != "query":
+            raise QueryServerError(f"Unknown op: {op!r}")
+        name = request.get("document")
+        tree = self.documents.get(name)
+        if tree is None:
+            raise QueryServerError(f"Unknown document: {name!r}")
+        query = request.get("query")
+        if type(query) != str:
+            raise QueryServerError("Request must hold a query string")
+        result = self.cache.execute(search.compile(query), tree)
+        return itertools.chain(
+            [RESULT_PREFIX.decode()], jtt_output.iterencode(result), ["}"]
+        )
+
+    def respond(self, line: bytes) -> typing.Tuple[str, typing.Iterator[str]]:
+        """
+        Answer a request line with the first chunk of the response and an iterator over
+        the rest, see chunk_response. Runs in a worker thread, like every later chunk, so
+        evaluating and encoding a query never blocks the event loop. A request that fails
+        before the first chunk is written answers an error instead.
+        """
+        try:
+            chunks = chunk_response(self.answer(json.loads(line)))
+            return next(chunks), chunks
+        except Exception as error:
+            return error_response(error), iter(())
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """
+        Answer the requests of one connection until the client closes it.
+        A response that fails after its first chunk was sent is cut off by a line break
+        and followed by an error response on the next line.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                chunk, chunks = await loop.run_in_executor(None, self.respond, line)
+                while chunk is not None:
+                    writer.write(chunk.encode("utf-8"))
+                    await writer.drain()
+                    try:
+                        chunk = await loop.run_in_executor(None, next, chunks, None)
+                    except Exception as error:
+                        chunk = "\n" + error_response(error)
+                        chunks = iter(())
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(
+        self,
+        socket_path: typing.Optional[str] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> asyncio.AbstractServer:
+        """
+        Start listening on a Unix domain socket if socket_path is given, otherwise on TCP.
+
+        Args:
+            socket_path: The path of the Unix domain socket to create.
+            host: The TCP host to bind.
+            port: The TCP port to bind, 0 for any free port.
+        """
+        if socket_path is not None:
+            self.server = await asyncio.start_unix_server(
+                self.handle, socket_path, limit=STREAM_LIMIT
+            )
+        else:
+            self.server = await asyncio.start_server(
+                self.handle, host, port, limit=STREAM_LIMIT
+            )
+        return self.server
+
+    async def serve_forever(
+        self,
+        socket_path: typing.Optional[str] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        server = await self.start(socket_path, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+class QueryClient:
+    """
+    This class sends queries to a QueryServer over a single blocking connection.
+    Use as a context manager, or call close() when done.
+    """
+
+    def __init__(
+        self,
+        socket_path: typing.Optional[str] = None,
+        host: str = "127.0.0.1",
+        port: typing.Optional[int] = None,
+        timeout: typing.Optional[float] = None,
+    ) -> None:
+        if socket_path is not None:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            address = socket_path
+        elif port is not None:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            address = (host, port)
+        else:
+            raise QueryServerError("Either a socket path or a port is required")
+        self.socket.settimeout(timeout)
+        try:
+            self.socket.connect(address)
+        except OSError:
+            self.socket.close()
+            raise
+        self.file = self.socket.makefile("rwb")
+
+    def __enter__(self) -> "QueryClient":
+        return self
+
+    def __exit__(self, *exc_info: typing.Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.file.close()
+        self.socket.close()
+
+    def request_text(self, request: typing.Dict[str, typing.Any]) -> bytes:
+        """
+        Send a request and return the raw JSON line of the response.
+        """
+        self.file.write(json.dumps(request).encode("utf-8") + b"\n")
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise QueryServerError("Server closed the connection")
+        return line
+
+    def request(self, request: typing.Dict[str, typing.Any]) -> typing.Any:
+        response = json.loads(self.request_text(request))
+        if "error" in response:
+            raise QueryServerError(response["error"])
+        return response["result"]
+
+    def query_text(self, document: str, query: str) -> str:
+        """
+        Evaluate a query against a resident document and return the JSON text of the
+        result as the server encoded it, without decoding it.
+
+        Args:
+            document: The name the document was loaded under.
+            query: The JMESPath query string to use.
+        """
+        line = self.request_text({"document": document, "query": query})
+        if line.startswith(RESULT_PREFIX):
+            return line[len(RESULT_PREFIX) : -len(b"}\n")].decode("utf-8")
+        raise QueryServerError(json.loads(line)["error"])
+
+    def query(self, document: str, query: str) -> typing.Any:
+        """
+        Evaluate a query against a resident document and return the decoded result.
+
+        Args:
+            document: The name the document was loaded under.
+            query: The JMESPath query string to use.
+        """
+        return self.request({"document": document, "query": query})
+
+    def documents(self) -> typing.List[str]:
+        """
+        Returns the names of the resident documents.
+        """
+        return self.request({"op": "list"})
+
+    def stats(self) -> typing.Dict[str, int]:
+        """
+        Returns the statistics of the server's result cache, see ResultCache.cache_info.
+        """
+        return self.request({"op": "stats"})
@@ -0,0 +1,209 @@
+import collections
+import concurrent.futures
+import threading
+import typing
+
+from tree_tools.src import jtt_tree
+from tree_tools.src.jtt_query import queries
+
+
+Source = typing.Callable[[typing.Hashable], typing.Dict[str, typing.Any]]
+
+
+class StoreInfo(typing.NamedTuple):
+    """
+    Statistics of a TreeStore.
+    - hits: lookups answered with a stored tree, or with a load already in progress
+    - misses: lookups that loaded the document from the source
+    - evictions: trees dropped to stay within the byte budget
+    - budget: the byte budget
+    - currbytes: the retained bytes of the stored trees
+    - currsize: the number of stored trees
+    """
+
+    hits: int
+    misses: int
+    evictions: int
+    budget: int
+    currbytes: int
+    currsize: int
+
+
+class TreeStore:
+    """
+    This class keeps the trees of many documents resident, keyed by document ID, within
+    a byte budget. A tree is built from the decoded JSON object returned by the source
+    callback the first time its document is requested, and the least recently used
+    trees are evicted once the retained bytes of the stored trees exceed the budget.
+    Sizes are measured with jtt_tree.TreeStatistics while a tree is built; a document
+    that would not fit in the whole budget on its own raises jtt_tree.TreeTooLargeError
+    as soon as the build crosses it, and is not stored.
+    Evicting a tree only drops the store's reference, so callers still holding it keep
+    it alive. Sizes are measured once, so trees stored here should not be edited.
+    All methods are thread safe. Concurrent requests for a document that is not stored
+    share a single load, and loads run outside the lock, so other documents are served
+    meanwhile. A put, discard or clear during a load supersedes it: its callers still
+    get the loaded tree, but it is not stored.
+    """
+
+    budget: int
+    source: Source
+    index: bool
+
+    def __init__(self, source: Source, budget: int, index: bool = False) -> None:
+        """
+        Args:
+            source: Called with a document ID, returns the decoded JSON object to build.
+            budget: The maximum number of retained bytes of the stored trees.
+            index: If True, a PathIndex is built for every tree, see jtt_tree.create_tree.
+                Indexes are not counted against the budget.
+        """
+        if budget < 1:
+            raise ValueError("budget must be at least 1")
+        self.source = source
+        self.budget = budget
+        self.index = index
+        self.entries = collections.OrderedDict()
+        self.loading = {}
+        self.lock = threading.Lock()
+        self.currbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, document_id: typing.Hashable) -> bool:
+        return document_id in self.entries
+
+    def get(self, document_id: typing.Hashable) -> jtt_tree.ObjectTreeNode:
+        """
+        Return the tree of a document, loading it from the source if it is not stored.
+        Errors raised by the source or while building are raised to every caller waiting
+        on the load, and nothing is stored.
+
+        Args:
+            document_id: The ID passed to the source.
+        """
+        with self.lock:
+            entry = self.entries.get(document_id)
+            if entry is not None:
+                self.hits += 1
+                self.entries.move_to_end(document_id)
+                return entry[0]
+            pending = self.loading.get(document_id)
+            if pending is None:
+                self.misses += 1
+                pending = self.loading[document_id] = concurrent.futures.Future()
+                owner = True
+            else:
+                self.hits += 1
+                owner = False
+        if not owner:
+            return pending.result()
+
+        try:
+            tree, size = self.build(self.source(document_id))
+        except BaseException as error:
+            with self.lock:
+                if self.loading.get(document_id) is pending:
+                    del self.loading[document_id]
+            pending.set_exception(error)
+            raise
+        with self.lock:
+            if self.loading.get(document_id) is pending:
+                del self.loading[document_id]
+                self.store(document_id, tree, size)
+        pending.set_result(tree)
+        return tree
+
+    def put(
+        self, document_id: typing.Hashable, data: typing.Dict[str, typing.Any]
+    ) -> None:
+        """
+        Build and store the tree of a document, replacing any stored one and
+        superseding any load of it in progress.
+
+        Args:
+            document_id: The ID to store the tree under.
+            data: The decoded JSON object.
+        """
+        tree, size = self.build(data)
+        with self.lock:
+            self.loading.pop(document_id, None)
+            self.store(document_id, tree, size)
+
+    def build(
+        self, data: typing.Dict[str, typing.Any]
+    ) -> typing.Tuple[jtt_tree.ObjectTreeNode, int]:
+        """
+        Returns the tree of a decoded JSON object and its retained bytes.
+        """
+        statistics = jtt_tree.TreeStatistics(largest=0, budget=self.budget)
+        tree = jtt_tree.create_tree(data, index=self.index, statistics=statistics)
+        return tree, statistics.retained_bytes
+
+    def store(
+        self, document_id: typing.Hashable, tree: jtt_tree.ObjectTreeNode, size: int
+    ) -> None:
+        """
+        Store a tree and evict the least recently used others until the budget is met.
+        Must be called with the lock held.
+        """
+        self.discard_entry(document_id)
+        self.entries[document_id] = (tree, size)
+        self.currbytes += size
+        while self.currbytes > self.budget:
+            evicted = next(iter(self.entries))
+            self.discard_entry(evicted)
+            self.evictions += 1
+
+    def discard_entry(self, document_id: typing.Hashable) -> None:
+        entry = self.entries.pop(document_id, None)
+        if entry is not None:
+            self.currbytes -= entry[1]
+
+    def discard(self, document_id: typing.Hashable) -> None:
+        """
+        Drop the tree of a document if it is stored, so that the next request reloads it.
+        A load of it in progress is not stored.
+        """
+        with self.lock:
+            self.loading.pop(document_id, None)
+            self.discard_entry(document_id)
+
+    def processor(
+        self, document_id: typing.Hashable, compiled: queries.CompiledQuery
+    ) -> queries.QueryProcessor:
+        """
+        Create a QueryProcessor that evaluates a compiled query against the tree of a
+        document, loading the tree if needed.
+
+        Args:
+            document_id: The ID of the document to search.
+            compiled: The CompiledQuery to evaluate, typically from search.compile.
+        """
+        return compiled.processor(self.get(document_id))
+
+    def store_info(self) -> StoreInfo:
+        with self.lock:
+            return StoreInfo(
+                self.hits,
+                self.misses,
+                self.evictions,
+                self.budget,
+                self.currbytes,
+                len(self.entries),
+            )
+
+    def clear(self) -> None:
+        """
+        Drop every stored tree and reset the statistics.
+        Loads in progress are not stored.
+        """
+        with self.lock:
+            self.loading.clear()
+            self.entries.clear()
+            self.currbytes = 0
+            self.hits = self.misses = self.evictions = 0
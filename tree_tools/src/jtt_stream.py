@@ -0,0 +1,315 @@
+import codecs
+import json
+import json.decoder
+import json.scanner
+import typing
+
+from tree_tools.src import jtt_tree
+
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+WHITESPACE = " \t\n\r"
+LITERALS = {
+    "null": None,
+    "true": True,
+    "false": False,
+    "NaN": float("nan"),
+    "Infinity": float("inf"),
+    "-Infinity": float("-inf"),
+}
+
+EXPECT_VALUE = 0
+EXPECT_VALUE_OR_END = 1
+EXPECT_KEY = 2
+EXPECT_KEY_OR_END = 3
+EXPECT_COLON = 4
+EXPECT_COMMA_OR_END = 5
+DONE = 6
+
+
+class StreamTreeBuilder:
+    """
+    Incremental JSON reader that builds TreeNodes directly from a file object.
+    The input is read in fixed size chunks and only the unread remainder of the current
+    chunk is buffered, so the decoded document is never held in memory next to the tree.
+    Containers are tracked on an explicit stack, and each descendant count is added to
+    the parent when the container closes.
+    """
+
+    fileobj: typing.IO
+    chunk_size: int
+    buffer: str
+    pos: int
+    eof: bool
+    # characters and line breaks dropped from the front of the buffer so far, and the
+    # document offset of the line holding the buffer start
+    consumed: int
+    lines: int
+    line_start: int
+
+    def __init__(self, fileobj: typing.IO, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.consumed = 0
+        self.lines = 0
+        self.line_start = 0
+        self.decoder = None
+
+    def fill(self) -> bool:
+        """
+        Read the next chunk into the buffer, dropping the consumed prefix.
+        Returns False once the input is exhausted.
+        """
+        if self.eof:
+            return False
+        chunk = self.fileobj.read(self.chunk_size)
+        if isinstance(chunk, bytes):
+            if self.decoder is None:
+                self.decoder = codecs.getincrementaldecoder("utf-8")()
+            data = chunk
+            chunk = self.decoder.decode(data, final=not data)
+            while data and not chunk:
+                # the chunk ended inside a multi-byte character
+                data = self.fileobj.read(self.chunk_size)
+                chunk = self.decoder.decode(data, final=not data)
+        if not chunk:
+            self.eof = True
+            return False
+        newlines = self.buffer.count("\n", 0, self.pos)
+        if newlines:
+            self.lines += newlines
+            self.line_start = self.consumed + self.buffer.rindex("\n", 0, self.pos) + 1
+        self.consumed += self.pos
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def error(
+        self, message: str, pos: typing.Optional[int] = None
+    ) -> json.JSONDecodeError:
+        """
+        Returns a JSONDecodeError whose position, line and column count from the start
+        of the document rather than of the buffer. Its doc is the current buffer.
+
+        Args:
+            message: The reason the input is invalid.
+            pos: The offset in the buffer, by default the current position.
+        """
+        pos = self.pos if pos is None else pos
+        error = json.JSONDecodeError(message, self.buffer, pos)
+        error.pos = self.consumed + pos
+        newlines = self.buffer.count("\n", 0, pos)
+        error.lineno = self.lines + newlines + 1
+        if newlines:
+            error.colno = pos - self.buffer.rindex("\n", 0, pos)
+        else:
+            error.colno = error.pos - self.line_start + 1
+        error.args = (
+            f"{message}: line {error.lineno} column {error.colno} (char {error.pos})",
+        )
+        return error
+
+    def next_character(self) -> str:
+        """
+        Skip whitespace and return the next significant character, or "" at the end.
+        """
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ""
+
+    def read_string(self) -> str:
+        """
+        Read a string token starting at the opening quote.
+        """
+        while True:
+            try:
+                value, end = json.decoder.scanstring(self.buffer, self.pos + 1)
+            except json.JSONDecodeError as error:
+                if self.fill():
+                    continue
+                raise self.error(error.msg, error.pos) from None
+            self.pos = end
+            return value
+
+    def read_number(self) -> typing.Union[int, float]:
+        """
+        Read a number token, extending the buffer while the match is too close to its
+        end to rule out a longer number (an exponent needs up to two more characters).
+        """
+        while True:
+            match = json.scanner.NUMBER_RE.match(self.buffer, self.pos)
+            end = match.end() if match else self.pos + len("-Infinity")
+            if end + 2 >= len(self.buffer) and self.fill():
+                continue
+            if match is None:
+                return self.read_literal()
+            integer, fraction, exponent = match.groups()
+            self.pos = match.end()
+            if fraction or exponent:
+                return float(integer + (fraction or "") + (exponent or ""))
+            return int(integer)
+
+    def read_literal(self) -> typing.Any:
+        """
+        Read one of the keyword literals accepted by json.load.
+        """
+        while len(self.buffer) - self.pos < len("-Infinity") and self.fill():
+            pass
+        for word, value in LITERALS.items():
+            if self.buffer.startswith(word, self.pos):
+                self.pos += len(word)
+                return value
+        raise self.error("Expecting value")
+
+    def read_scalar(self, character: str) -> jtt_tree.TreeNode:
+        if character == '"':
+            return jtt_tree.StringTreeNode(self.read_string())
+        if character == "-" or character.isdigit():
+            return jtt_tree.NumberTreeNode(self.read_number())
+        value = self.read_literal()
+        if value is None:
+            return jtt_tree.NullTreeNode()
+        if type(value) == bool:
+            return jtt_tree.BooleanTreeNode(value)
+        return jtt_tree.NumberTreeNode(value)
+
+    def build(self) -> jtt_tree.TreeNode:
+        """
+        Consume the whole input and return the root node.
+        """
+        stack: typing.List[jtt_tree.TreeNode] = []
+        keys: typing.List[typing.Optional[str]] = []
+        root = None
+        state = EXPECT_VALUE
+
+        while True:
+            character = self.next_character()
+            if state == DONE:
+                if character:
+                    raise self.error("Extra data")
+                return root
+            if not character:
+                raise self.error("Unexpected end of input")
+
+            if state == EXPECT_VALUE or state == EXPECT_VALUE_OR_END:
+                if character == "]" and state == EXPECT_VALUE_OR_END:
+                    self.pos += 1
+                    root, state = self.close(stack, keys, root)
+                    continue
+                if character == "{" or character == "[":
+                    self.pos += 1
+                    if character == "{":
+                        node = jtt_tree.ObjectTreeNode.from_nodes({})
+                        state = EXPECT_KEY_OR_END
+                    else:
+                        node = jtt_tree.ListTreeNode.from_nodes([])
+                        state = EXPECT_VALUE_OR_END
+                    self.attach(stack, keys, node)
+                    stack.append(node)
+                    keys.append(None)
+                    continue
+                node = self.read_scalar(character)
+                self.attach(stack, keys, node)
+                if not stack:
+                    root = node
+                    state = DONE
+                else:
+                    stack[-1].descendant_count += 1
+                    state = EXPECT_COMMA_OR_END
+
+            elif state == EXPECT_KEY or state == EXPECT_KEY_OR_END:
+                if character == "}" and state == EXPECT_KEY_OR_END:
+                    self.pos += 1
+                    root, state = self.close(stack, keys, root)
+                    continue
+                if character != '"':
+                    raise self.error(
+                        "Expecting property name enclosed in double quotes"
+                    )
+                keys[-1] = self.read_string()
+                state = EXPECT_COLON
+
+            elif state == EXPECT_COLON:
+                if character != ":":
+                    raise self.error("Expecting ':' delimiter")
+                self.pos += 1
+                state = EXPECT_VALUE
+
+            elif state == EXPECT_COMMA_OR_END:
+                self.pos += 1
+                is_object = stack[-1].type == jtt_tree.NodeType.OBJECT
+                if character == ",":
+                    state = EXPECT_KEY if is_object else EXPECT_VALUE
+                elif (character == "}" and is_object) or (
+                    character == "]" and not is_object
+                ):
+                    root, state = self.close(stack, keys, root)
+                else:
+                    self.pos -= 1
+                    raise self.error("Expecting ',' delimiter")
+
+    def attach(
+        self,
+        stack: typing.List[jtt_tree.TreeNode],
+        keys: typing.List[typing.Optional[str]],
+        node: jtt_tree.TreeNode,
+    ) -> None:
+        """
+        Store a node in the innermost open container.
+        A duplicate key replaces the earlier value, as json.load does.
+        """
+        if not stack:
+            return
+        parent = stack[-1]
+        if isinstance(node, jtt_tree.ContainerTreeNode):
+            node.parent = parent
+        if parent.type == jtt_tree.NodeType.ARRAY:
+            parent.value.append(node)
+            return
+        replaced = parent.value.get(keys[-1])
+        if replaced is not None:
+            parent.descendant_count -= replaced.descendant_count + 1
+            parent.release(replaced)
+        parent.value[keys[-1]] = node
+
+    def close(
+        self,
+        stack: typing.List[jtt_tree.TreeNode],
+        keys: typing.List[typing.Optional[str]],
+        root: typing.Optional[jtt_tree.TreeNode],
+    ) -> typing.Tuple[typing.Optional[jtt_tree.TreeNode], int]:
+        """
+        Close the innermost container and roll its descendant count into the parent.
+        Returns the root (set once the outermost container closes) and the next state.
+        """
+        node = stack.pop()
+        keys.pop()
+        if not stack:
+            return node, DONE
+        stack[-1].descendant_count += node.descendant_count + 1
+        return root, EXPECT_COMMA_OR_END
+
+
+def create_tree_from_stream(
+    fileobj: typing.IO, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> jtt_tree.ObjectTreeNode:
+    """
+    Build a tree by reading JSON incrementally from a text or binary file object.
+    Binary input is decoded as UTF-8.
+
+    Args:
+        fileobj: The file object to read from.
+        chunk_size: The number of characters or bytes to read at a time.
+    """
+    tree = StreamTreeBuilder(fileobj, chunk_size).build()
+    if tree.type != jtt_tree.NodeType.OBJECT:
+        raise ValueError(f"Invalid type: {tree.type} for value {tree}")
+    return tree
@@ -1,4 +1,8 @@
+import collections
 import enum
+import heapq
+import itertools
+import sys
 import typing
 import reprlib
 
@@ -24,8 +28,11 @@ class TreeNode:
     Each node maintains the following metadata:
     - type of data contained
     - number of total descendants in the tree
+    Concrete node classes declare __slots__ so that nodes carry no per-instance __dict__.
     """
 
+    __slots__ = ()
+
     type: NodeType
     value: NodeValue
     descendant_count: int
@@ -46,6 +53,7 @@ class TreeNode:
 
 
 class NullTreeNode(TreeNode):
+    __slots__ = ("value", "descendant_count")
     type = NodeType.NULL
 
     def __init__(self):
@@ -54,6 +62,7 @@ class NullTreeNode(TreeNode):
 
 
 class StringTreeNode(TreeNode):
+    __slots__ = ("value", "descendant_count")
     type = NodeType.STRING
 
     def __init__(self, value: str):
@@ -62,6 +71,7 @@ class StringTreeNode(TreeNode):
 
 
 class NumberTreeNode(TreeNode):
+    __slots__ = ("value", "descendant_count")
     type = NodeType.NUMBER
 
     def __init__(self, value: typing.Union[int, float]):
@@ -70,6 +80,7 @@ class NumberTreeNode(TreeNode):
 
 
 class BooleanTreeNode(TreeNode):
+    __slots__ = ("value", "descendant_count")
     type = NodeType.BOOLEAN
 
     def __init__(self, value: bool):
@@ -77,69 +88,1237 @@ class BooleanTreeNode(TreeNode):
         self.descendant_count = 0
 
 
-class ListTreeNode(TreeNode):
+ChildKey = typing.Union[str, int]
+
+
+class ContainerTreeNode(TreeNode):
+    """
+    Base class of list and object nodes.
+    Containers keep a link to the container holding them, so that a change to their
+    children can be carried up the ancestor chain in O(depth): descendant counts are
+    adjusted, the version of every ancestor is bumped and any PathIndex attached above
+    is patched. The cached fingerprint of the ancestors, see fingerprint(), is cleared.
+    Scalar nodes have no parent link and can be shared freely.
+    A container belongs to at most one parent; the children of lists built with
+    from_nodes, such as query results, keep their links to the tree they came from.
+    """
+
+    __slots__ = ("value", "descendant_count", "parent", "version", "fingerprint")
+    parent: typing.Optional["ContainerTreeNode"]
+    version: int
+    fingerprint: typing.Optional[int]
+
+    def ancestors(self) -> typing.Iterator["ContainerTreeNode"]:
+        """
+        Yield this node and then every container above it, up to the root.
+        """
+        node = self
+        while node is not None:
+            yield node
+            node = node.parent
+
+    def root(self) -> "ContainerTreeNode":
+        """
+        Returns the topmost container above this node.
+        """
+        node = self
+        while node.parent is not None:
+            node = node.parent
+        return node
+
+    def key_of(self, child: TreeNode) -> ChildKey:
+        """
+        Returns the key or index under which a child is stored, comparing identity.
+        """
+        children = (
+            self.value.items() if type(self.value) == dict else enumerate(self.value)
+        )
+        for key, node in children:
+            if node is child:
+                return key
+        raise ValueError("Node is not a child of this container")
+
+    def path_indexes(self) -> typing.List[typing.Tuple["PathIndex", typing.Tuple]]:
+        """
+        Returns the PathIndexes attached to this node or its ancestors, each with the
+        path of this node relative to the indexed node.
+        """
+        if all(getattr(node, "path_index", None) is None for node in self.ancestors()):
+            return []
+        indexes = []
+        keys = []
+        child = None
+        for node in self.ancestors():
+            if child is not None:
+                keys.append(node.key_of(child))
+            if getattr(node, "path_index", None) is not None:
+                indexes.append((node.path_index, tuple(reversed(keys))))
+            child = node
+        return indexes
+
+    def adopt(self, value: typing.Any) -> TreeNode:
+        """
+        Box a decoded JSON value, or take an existing node, as a new child of this node.
+        """
+        node = value if isinstance(value, TreeNode) else box_value(value)
+        if isinstance(node, ContainerTreeNode) and type(node) not in SHARED_TYPES:
+            if node.parent is not None:
+                raise ValueError(
+                    "Node already has a parent, delete it from there first"
+                )
+            if any(ancestor is node for ancestor in self.ancestors()):
+                raise ValueError("A node cannot be stored inside itself")
+            node.parent = self
+        return node
+
+    def release(self, node: TreeNode) -> None:
+        """
+        Detach a removed child from this node.
+        """
+        if isinstance(node, ContainerTreeNode) and node.parent is self:
+            node.parent = None
+
+    def affected_children(
+        self, key: ChildKey
+    ) -> typing.Iterable[typing.Tuple[ChildKey, TreeNode]]:
+        """
+        Returns the children whose paths change when the child at key is edited.
+        Every child is returned by default, which holds for any layout; lists and objects
+        narrow it down.
+        """
+        value = self.value
+        return list(value.items() if type(value) == dict else enumerate(value))
+
+    def edit_children(
+        self,
+        removed: typing.Iterable[TreeNode],
+        added: typing.Iterable[TreeNode],
+        key: ChildKey,
+        edit: typing.Callable[[], None],
+    ) -> None:
+        """
+        Apply an edit to the children of this node and carry it up the ancestor chain.
+
+        Args:
+            removed: The children the edit removes.
+            added: The children the edit adds.
+            key: The key or index the edit applies to, see affected_children.
+            edit: Performs the edit on self.value.
+        """
+        ancestors = list(self.ancestors())
+        # lazy counts are computed from the raw data, which must happen before the edit
+        for node in ancestors:
+            node.descendant_count
+        indexes = self.path_indexes()
+        for index, path in indexes:
+            for child_key, child in self.affected_children(key):
+                index.discard(path + (child_key,), child)
+        delta = sum(child.descendant_count + 1 for child in added) - sum(
+            child.descendant_count + 1 for child in removed
+        )
+        edit()
+        for index, path in indexes:
+            for child_key, child in self.affected_children(key):
+                index.add(path + (child_key,), child)
+        for node in ancestors:
+            node.descendant_count += delta
+            node.version += 1
+            node.fingerprint = None
+
+
+class ListTreeNode(ContainerTreeNode):
+    __slots__ = ()
     value: typing.List[TreeNode]
     type = NodeType.ARRAY
 
-    def __init__(self, value: typing.List[TreeNode]):
+    def __init__(self, value: typing.List[typing.Any]):
         self.value = []
         self.descendant_count = 0
-        for v in value:
-            if v is None:
-                self.value.append(NullTreeNode())
-            elif type(v) == str:
-                self.value.append(StringTreeNode(v))
-            elif type(v) == int or type(v) == float:
-                self.value.append(NumberTreeNode(v))
-            elif type(v) == bool:
-                self.value.append(BooleanTreeNode(v))
-            elif type(v) == dict:
-                self.value.append(ObjectTreeNode(v))
-            elif type(v) == list:
-                self.value.append(ListTreeNode(v))
-            else:
-                raise TypeError(f"Invalid type: {type(v)} for value {v}")
-            self.descendant_count += self.value[-1].descendant_count + 1
+        self.parent = None
+        self.version = 0
+        self.fingerprint = None
+        build_children(self, value)
+
+    @classmethod
+    def from_nodes(cls, nodes: typing.List[TreeNode]) -> "ListTreeNode":
+        """
+        Build a list node around children that are already boxed.
+        The children keep their own parent links.
+
+        Args:
+            nodes: The child nodes, which are stored as-is.
+        """
+        node = cls.__new__(cls)
+        node.value = nodes
+        node.descendant_count = sum(n.descendant_count + 1 for n in nodes)
+        node.parent = None
+        node.version = 0
+        node.fingerprint = None
+        return node
 
     def serialize(self) -> typing.List[typing.Any]:
         """
         Serialize the object tree into a list.
         """
-        return [v.serialize() for v in self.value]
+        return serialize_tree(self)
+
+    def affected_children(
+        self, key: ChildKey
+    ) -> typing.Iterable[typing.Tuple[ChildKey, TreeNode]]:
+        # inserting or deleting shifts every later element, so the whole tail moves
+        return itertools.islice(enumerate(self.value), key, None)
+
+    def position(self, index: int) -> int:
+        if not -len(self.value) <= index < len(self.value):
+            raise IndexError("list index out of range")
+        return index % len(self.value)
+
+    def set(self, index: int, value: typing.Any) -> TreeNode:
+        """
+        Replace the element at index and return the node stored.
+
+        Args:
+            index: The index to replace, negative indexes count from the end.
+            value: A TreeNode or a decoded JSON value.
+        """
+        index = self.position(index)
+        old = self.value[index]
+        node = self.adopt(value)
+
+        def edit() -> None:
+            self.value[index] = node
+
+        self.edit_children([old], [node], index, edit)
+        self.release(old)
+        return node
+
+    def insert(self, index: int, value: typing.Any) -> TreeNode:
+        """
+        Insert an element before index, as list.insert does, and return the node stored.
+
+        Args:
+            index: The index to insert at.
+            value: A TreeNode or a decoded JSON value.
+        """
+        length = len(self.value)
+        index = max(0, length + index) if index < 0 else min(index, length)
+        node = self.adopt(value)
+
+        def edit() -> None:
+            self.value.insert(index, node)
+
+        self.edit_children([], [node], index, edit)
+        return node
+
+    def append(self, value: typing.Any) -> TreeNode:
+        """
+        Append an element and return the node stored.
+
+        Args:
+            value: A TreeNode or a decoded JSON value.
+        """
+        return self.insert(len(self.value), value)
+
+    def delete(self, index: int) -> TreeNode:
+        """
+        Remove the element at index and return it.
+
+        Args:
+            index: The index to remove, negative indexes count from the end.
+        """
+        index = self.position(index)
+        old = self.value[index]
 
+        def edit() -> None:
+            del self.value[index]
 
-class ObjectTreeNode(TreeNode):
+        self.edit_children([old], [], index, edit)
+        self.release(old)
+        return old
+
+
+class ObjectTreeNode(ContainerTreeNode):
+    """
+    Object nodes may carry a PathIndex over their subtree, see build_path_index.
+    """
+
+    __slots__ = ("path_index",)
     value: typing.Dict[str, TreeNode]
+    path_index: typing.Optional["PathIndex"]
     type = NodeType.OBJECT
 
-    def __init__(self, value: typing.Dict[str, TreeNode]):
+    def __init__(self, value: typing.Dict[str, typing.Any]):
         self.value = {}
         self.descendant_count = 0
-        for k, v in value.items():
-            if v is None:
-                self.value[k] = NullTreeNode()
-            elif type(v) == str:
-                self.value[k] = StringTreeNode(v)
-            elif type(v) == int or type(v) == float:
-                self.value[k] = NumberTreeNode(v)
-            elif type(v) == bool:
-                self.value[k] = BooleanTreeNode(v)
-            elif type(v) == dict:
-                self.value[k] = ObjectTreeNode(v)
-            elif type(v) == list:
-                self.value[k] = ListTreeNode(v)
-            else:
-                raise TypeError(f"Invalid type: {type(v)} for value {v}")
-            self.descendant_count += self.value[k].descendant_count + 1
+        self.parent = None
+        self.version = 0
+        self.fingerprint = None
+        self.path_index = None
+        build_children(self, value)
+
+    @classmethod
+    def from_nodes(cls, nodes: typing.Dict[str, TreeNode]) -> "ObjectTreeNode":
+        """
+        Build an object node around children that are already boxed.
+        The children keep their own parent links.
+
+        Args:
+            nodes: The child nodes by key, which are stored as-is.
+        """
+        node = cls.__new__(cls)
+        node.value = nodes
+        node.descendant_count = sum(n.descendant_count + 1 for n in nodes.values())
+        node.parent = None
+        node.version = 0
+        node.fingerprint = None
+        node.path_index = None
+        return node
 
     def serialize(self) -> typing.Dict[str, typing.Any]:
         """
         Serialize the object tree into a dictionary.
         """
-        return {k: v.serialize() for k, v in self.value.items()}
+        return serialize_tree(self)
+
+    def affected_children(
+        self, key: ChildKey
+    ) -> typing.Iterable[typing.Tuple[ChildKey, TreeNode]]:
+        if key in self.value:
+            return [(key, self.value[key])]
+        return []
+
+    def set(self, key: str, value: typing.Any) -> TreeNode:
+        """
+        Store a value under key, replacing any previous one, and return the node stored.
+
+        Args:
+            key: The key to store the value under.
+            value: A TreeNode or a decoded JSON value.
+        """
+        old = self.value.get(key)
+        node = self.adopt(value)
+
+        def edit() -> None:
+            self.value[key] = node
+
+        self.edit_children([old] if old is not None else [], [node], key, edit)
+        if old is not None:
+            self.release(old)
+        return node
+
+    def delete(self, key: str) -> TreeNode:
+        """
+        Remove the value stored under key and return it. Raises KeyError if it is missing.
+
+        Args:
+            key: The key to remove.
+        """
+        old = self.value[key]
+
+        def edit() -> None:
+            del self.value[key]
+
+        self.edit_children([old], [], key, edit)
+        self.release(old)
+        return old
+
+
+class LazyListTreeNode(ListTreeNode):
+    """
+    ListTreeNode that keeps the raw list and only boxes its children the first time
+    the value is read. Children are boxed lazily as well, so untouched branches of
+    the document are never converted into nodes.
+    The descendant count is likewise computed from the raw data on first access.
+    Editing a lazy node materializes it; the raw data itself is never modified.
+    """
+
+    __slots__ = ("raw",)
+    raw: typing.List[typing.Any]
+
+    def __init__(self, value: typing.List[typing.Any]):
+        self.raw = value
+        self.parent = None
+        self.version = 0
+        self.fingerprint = None
+
+    def __getattr__(self, name: str) -> typing.Any:
+        if name == "value":
+            self.value = [box_value(v, lazy=True) for v in self.raw]
+            adopt_lazy_children(self, self.value)
+            return self.value
+        if name == "descendant_count":
+            self.descendant_count = count_descendants(self.raw)
+            return self.descendant_count
+        raise AttributeError(name)
+
+    def is_materialized(self) -> bool:
+        """
+        Returns True if the children of this node have been boxed.
+        """
+        try:
+            object.__getattribute__(self, "value")
+        except AttributeError:
+            return False
+        return True
+
+
+class LazyObjectTreeNode(ObjectTreeNode):
+    """
+    ObjectTreeNode that keeps the raw dictionary and only boxes its children the
+    first time the value is read. See LazyListTreeNode.
+    """
+
+    __slots__ = ("raw",)
+    raw: typing.Dict[str, typing.Any]
+
+    def __init__(self, value: typing.Dict[str, typing.Any]):
+        self.raw = value
+        self.parent = None
+        self.version = 0
+        self.fingerprint = None
+        self.path_index = None
+
+    def __getattr__(self, name: str) -> typing.Any:
+        if name == "value":
+            self.value = {k: box_value(v, lazy=True) for k, v in self.raw.items()}
+            adopt_lazy_children(self, self.value.values())
+            return self.value
+        if name == "descendant_count":
+            self.descendant_count = count_descendants(self.raw)
+            return self.descendant_count
+        raise AttributeError(name)
+
+    def is_materialized(self) -> bool:
+        """
+        Returns True if the children of this node have been boxed.
+        """
+        try:
+            object.__getattribute__(self, "value")
+        except AttributeError:
+            return False
+        return True
+
+
+class SharedTreeNode:
+    """
+    Mixin of the containers built by interning, see build_interned.
+    A shared container can be stored in any number of places, so it has no parent link
+    and cannot be edited: edits raise TypeError. Edit the unshared root instead, or store
+    a fresh node where the shared one was.
+    """
+
+    __slots__ = ()
+
+    def adopt(self, value: typing.Any) -> TreeNode:
+        raise TypeError("Shared subtrees of an interned tree cannot be edited")
+
+    def edit_children(self, *args: typing.Any) -> None:
+        raise TypeError("Shared subtrees of an interned tree cannot be edited")
+
+
+class SharedListTreeNode(SharedTreeNode, ListTreeNode):
+    __slots__ = ()
+
 
+class SharedObjectTreeNode(SharedTreeNode, ObjectTreeNode):
+    __slots__ = ()
+
+
+def adopt_lazy_children(
+    node: ContainerTreeNode, children: typing.Iterable[TreeNode]
+) -> None:
+    for child in children:
+        if type(child) in LAZY_TYPES:
+            child.parent = node
+
+
+LAZY_TYPES = (LazyListTreeNode, LazyObjectTreeNode)
+SHARED_TYPES = (SharedListTreeNode, SharedObjectTreeNode)
+SCALAR_NODES = {
+    str: StringTreeNode,
+    int: NumberTreeNode,
+    float: NumberTreeNode,
+    bool: BooleanTreeNode,
+}
+SCALAR_NODE_TYPES = frozenset(
+    (NullTreeNode, StringTreeNode, NumberTreeNode, BooleanTreeNode)
+)
+# fingerprints hash the name of a node type, which is cheaper than hashing the enum
+SCALAR_TAGS = {node_class: node_class.type.value for node_class in SCALAR_NODE_TYPES}
+# containers nested deeper than this are serialized from an explicit stack
+SERIALIZE_DEPTH = 32
+
+
+def box_value(value: typing.Any, lazy: bool = False) -> TreeNode:
+    """
+    Box a decoded JSON value into the matching TreeNode type.
 
-def create_tree(data: typing.Dict[str, typing.Any]) -> ObjectTreeNode:
+    Args:
+        value: The decoded JSON value.
+        lazy: If True, containers are boxed as lazy nodes that defer building their children.
+    """
+    if value is None:
+        return NullTreeNode()
+    elif type(value) == str:
+        return StringTreeNode(value)
+    elif type(value) == int or type(value) == float:
+        return NumberTreeNode(value)
+    elif type(value) == bool:
+        return BooleanTreeNode(value)
+    elif type(value) == dict:
+        return LazyObjectTreeNode(value) if lazy else ObjectTreeNode(value)
+    elif type(value) == list:
+        return LazyListTreeNode(value) if lazy else ListTreeNode(value)
+    else:
+        raise TypeError(f"Invalid type: {type(value)} for value {value}")
+
+
+def count_descendants(value: typing.Any) -> int:
+    """
+    Count the nodes that a decoded JSON value would produce beneath its own node.
+    """
+    count = 0
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        if type(value) == dict:
+            count += len(value)
+            stack.extend(v for v in value.values() if type(v) in RAW_CONTAINERS)
+        elif type(value) == list:
+            count += len(value)
+            stack.extend(v for v in value if type(v) in RAW_CONTAINERS)
+    return count
+
+
+RAW_CONTAINERS = (dict, list)
+
+
+def build_children(
+    tree: TreeNode,
+    data: typing.Any,
+    statistics: typing.Optional["TreeStatistics"] = None,
+) -> None:
+    """
+    Box every value below a decoded JSON container into the children of an empty node.
+    Containers are opened from an explicit stack instead of recursing, so the nesting
+    depth is only limited by memory. Nodes are created in pre-order, so a reverse pass
+    over the containers completes every descendant count before it is added to the
+    parent's.
+
+    Args:
+        tree: The childless ObjectTreeNode or ListTreeNode to fill.
+        data: The decoded dict or list holding the children.
+        statistics: If given, every container is recorded in it as soon as its children
+            are boxed, see TreeStatistics.
+    """
+    scalar_nodes = SCALAR_NODES
+    new_object = ObjectTreeNode.__new__
+    new_list = ListTreeNode.__new__
+    # parallel lists rather than lists of tuples, to keep allocations per node down
+    nodes, raws = [tree], [data]
+    containers = []
+    while nodes:
+        node = nodes.pop()
+        raw = raws.pop()
+        boxed = []
+        append = boxed.append
+        for v in raw if type(raw) == list else raw.values():
+            node_class = scalar_nodes.get(type(v))
+            if node_class is not None:
+                append(node_class(v))
+            elif v is None:
+                append(NullTreeNode())
+            else:
+                if type(v) == dict:
+                    child = new_object(ObjectTreeNode)
+                    child.path_index = None
+                elif type(v) == list:
+                    child = new_list(ListTreeNode)
+                else:
+                    raise TypeError(f"Invalid type: {type(v)} for value {v}")
+                child.descendant_count = 0
+                child.parent = node
+                child.version = 0
+                child.fingerprint = None
+                nodes.append(child)
+                raws.append(v)
+                containers.append(child)
+                append(child)
+        node.value = boxed if type(raw) == list else dict(zip(raw, boxed))
+        node.descendant_count += len(boxed)
+        if statistics is not None:
+            statistics.add_container(
+                node, boxed, raw if type(raw) == list else raw.values(), node.parent
+            )
+    for i in range(len(containers) - 1, -1, -1):
+        container = containers[i]
+        container.parent.descendant_count += container.descendant_count
+    if statistics is not None:
+        statistics.finish()
+
+
+def build_interned(data: typing.Dict[str, typing.Any]) -> "ObjectTreeNode":
+    """
+    Build a tree in which equal scalars share one node and structurally identical
+    containers share one subtree, which is hash-consing: containers are created bottom-up
+    and looked up by their keys and the identities of their already shared children, so
+    each lookup costs one hash of the container's width. Object keys are interned.
+    Floats are told apart by their exact representation, so 0.0 and -0.0 stay distinct,
+    and numbers never share with booleans. Every container below the root is a shared,
+    read-only node with its fingerprint already computed; the root itself can be edited.
+
+    Args:
+        data: The decoded JSON object.
+    """
+    # containers in pre-order, so that the reversed list has children before parents
+    containers = []
+    stack = [data]
+    while stack:
+        raw = stack.pop()
+        containers.append(raw)
+        values = raw if type(raw) == list else raw.values()
+        stack.extend(v for v in values if type(v) in RAW_CONTAINERS)
+
+    scalar_nodes = SCALAR_NODES
+    new_object = SharedObjectTreeNode.__new__
+    new_list = SharedListTreeNode.__new__
+    # scalar keys map to a node and its fingerprint, container keys to a shared node
+    scalars = {}
+    shared = {}
+    finished = {}
+    for raw in reversed(containers):
+        children = []
+        child_fingerprints = []
+        for v in raw if type(raw) == list else raw.values():
+            value_type = type(v)
+            if value_type == dict or value_type == list:
+                node = finished[id(v)]
+                children.append(node)
+                child_fingerprints.append(node.fingerprint)
+                continue
+            key = (value_type, v.hex()) if value_type == float else (value_type, v)
+            entry = scalars.get(key)
+            if entry is None:
+                node_class = scalar_nodes.get(value_type)
+                if node_class is not None:
+                    node = node_class(v)
+                elif v is None:
+                    node = NullTreeNode()
+                else:
+                    raise TypeError(f"Invalid type: {value_type} for value {v}")
+                entry = scalars[key] = (node, hash((node.type.value, v)))
+            children.append(entry[0])
+            child_fingerprints.append(entry[1])
+        if type(raw) == dict:
+            keys = tuple(sys.intern(k) for k in raw)
+            key = (keys, tuple(map(id, children)))
+        else:
+            keys = None
+            key = tuple(map(id, children))
+        node = shared.get(key)
+        if node is None:
+            if keys is not None:
+                node = new_object(SharedObjectTreeNode)
+                node.value = dict(zip(keys, children))
+                node.path_index = None
+                node.fingerprint = object_fingerprint(keys, child_fingerprints)
+            else:
+                node = new_list(SharedListTreeNode)
+                node.value = children
+                node.fingerprint = array_fingerprint(child_fingerprints)
+            node.descendant_count = len(children) + sum(
+                child.descendant_count for child in children
+            )
+            node.parent = None
+            node.version = 0
+            shared[key] = node
+        finished[id(raw)] = node
+    top = finished[id(data)]
+    root = ObjectTreeNode.from_nodes(dict(top.value))
+    root.fingerprint = top.fingerprint
+    return root
+
+
+def serialize_tree(tree: TreeNode) -> typing.Any:
+    """
+    Serialize a tree into decoded JSON values in bounded Python stack.
+    Containers are copied recursively, which is the fastest way to run the bulk of a
+    document, but only SERIALIZE_DEPTH levels at a time: deeper containers are attached
+    to their parent as empty copies and filled later from an explicit stack.
+    Lazy containers that were never read are copied straight from their raw data, so
+    serializing does not materialize them. Nodes of other implementations, such as
+    arena views, serialize themselves.
+
+    Args:
+        tree: The ObjectTreeNode or ListTreeNode to serialize.
+    """
+    deferred = []
+    root = serialize_node(tree, SERIALIZE_DEPTH, deferred)
+    while deferred:
+        copy, source = deferred.pop()
+        if type(source) in RAW_CONTAINERS:
+            children = copy_raw(source, SERIALIZE_DEPTH, deferred)
+        else:
+            children = serialize_node(source, SERIALIZE_DEPTH, deferred)
+        if type(copy) == list:
+            copy.extend(children)
+        else:
+            copy.update(children)
+    return root
+
+
+def serialize_node(
+    node: TreeNode,
+    depth: int,
+    deferred: typing.List[typing.Tuple[typing.Any, typing.Any]],
+) -> typing.Any:
+    """
+    Serialize a node, recursing at most depth levels; deeper containers are returned
+    empty and queued on deferred together with their source.
+    """
+    if type(node) in LAZY_TYPES and not node.is_materialized():
+        return copy_raw(node.raw, depth, deferred)
+    if isinstance(node, ObjectTreeNode):
+        if not depth:
+            copy = {}
+            deferred.append((copy, node))
+            return copy
+        depth -= 1
+        scalar_types = SCALAR_NODE_TYPES
+        return {
+            k: v.value
+            if type(v) in scalar_types
+            else serialize_node(v, depth, deferred)
+            for k, v in node.value.items()
+        }
+    if isinstance(node, ListTreeNode):
+        if not depth:
+            copy = []
+            deferred.append((copy, node))
+            return copy
+        depth -= 1
+        scalar_types = SCALAR_NODE_TYPES
+        return [
+            v.value if type(v) in scalar_types else serialize_node(v, depth, deferred)
+            for v in node.value
+        ]
+    return node.serialize()
+
+
+def copy_raw(
+    value: typing.Any,
+    depth: int,
+    deferred: typing.List[typing.Tuple[typing.Any, typing.Any]],
+) -> typing.Any:
+    """
+    Copy decoded JSON containers the same way serialize_node copies nodes.
+    """
+    if not depth:
+        copy = {} if type(value) == dict else []
+        deferred.append((copy, value))
+        return copy
+    depth -= 1
+    if type(value) == dict:
+        return {
+            k: copy_raw(v, depth, deferred) if type(v) in RAW_CONTAINERS else v
+            for k, v in value.items()
+        }
+    return [
+        copy_raw(v, depth, deferred) if type(v) in RAW_CONTAINERS else v for v in value
+    ]
+
+
+def nodes_equal(left: TreeNode, right: TreeNode) -> bool:
+    """
+    Returns True if two trees hold equal JSON values.
+    Numbers compare by value regardless of int or float, but booleans never equal numbers.
+    Containers whose fingerprints are both cached and differ are unequal without being
+    read, and subtrees shared by interning compare equal by identity.
+
+    Args:
+        left: The first tree.
+        right: The second tree.
+    """
+    stack = [(left, right)]
+    while stack:
+        left, right = stack.pop()
+        if left is right:
+            continue
+        if left.type != right.type:
+            return False
+        if left.type == NodeType.OBJECT or left.type == NodeType.ARRAY:
+            left_fingerprint = getattr(left, "fingerprint", None)
+            right_fingerprint = getattr(right, "fingerprint", None)
+            if left_fingerprint is not None and right_fingerprint is not None:
+                if left_fingerprint != right_fingerprint:
+                    return False
+        if left.type == NodeType.OBJECT:
+            if left.value.keys() != right.value.keys():
+                return False
+            stack.extend((v, right.value[k]) for k, v in left.value.items())
+        elif left.type == NodeType.ARRAY:
+            if len(left.value) != len(right.value):
+                return False
+            stack.extend(zip(left.value, right.value))
+        elif left.value != right.value:
+            return False
+    return True
+
+
+def object_fingerprint(
+    keys: typing.Iterable[str], fingerprints: typing.Iterable[int]
+) -> int:
+    # members are combined by a sum, so the key order does not matter, as in nodes_equal
+    members = sum(map(hash, zip(keys, fingerprints))) & FINGERPRINT_MASK
+    return hash((NodeType.OBJECT.value, members))
+
+
+def array_fingerprint(fingerprints: typing.Iterable[int]) -> int:
+    return hash((NodeType.ARRAY.value, tuple(fingerprints)))
+
+
+FINGERPRINT_MASK = (1 << 64) - 1
+
+
+def fingerprint(tree: TreeNode) -> int:
+    """
+    Returns a structural hash of a tree: equal trees, as compared by nodes_equal, have
+    equal fingerprints, so different fingerprints prove two trees differ.
+    The fingerprint of every container reached is cached on the node and cleared when the
+    node or anything below it is edited, so asking again costs O(1).
+    Computing a fingerprint reads every node, so it materializes lazy trees completely.
+
+    Args:
+        tree: The TreeNode to hash, of any node implementation.
+    """
+    scalar_tags = SCALAR_TAGS
+    # fingerprints of the children that cannot cache their own, in document order
+    uncached = []
+    stack = [(tree, None, 0, None)]
+    while stack:
+        node, value, start, pushed = stack.pop()
+        if value is None:
+            tag = scalar_tags.get(type(node))
+            if tag is not None:
+                uncached.append(hash((tag, node.value)))
+                continue
+            cached = getattr(node, "fingerprint", None)
+            if cached is not None:
+                uncached.append(cached)
+                continue
+            node_type = node.type
+            if node_type != NodeType.OBJECT and node_type != NodeType.ARRAY:
+                uncached.append(hash((node_type.value, node.value)))
+                continue
+            value = node.value
+            children = list(value if node_type == NodeType.ARRAY else value.values())
+            # scalars and cached containers are read when the node closes instead; the
+            # pushed ones are recorded now, since closing them caches their fingerprint
+            pushed = [
+                type(child) not in scalar_tags
+                and getattr(child, "fingerprint", None) is None
+                for child in children
+            ]
+            stack.append((node, value, len(uncached), pushed))
+            stack.extend(
+                (child, None, 0, None)
+                for child, is_pushed in zip(reversed(children), reversed(pushed))
+                if is_pushed
+            )
+            continue
+        # the children pushed above are closed, in document order
+        position = start
+        fingerprints = []
+        is_array = type(value) == list or node.type == NodeType.ARRAY
+        for child, is_pushed in zip(value if is_array else value.values(), pushed):
+            if is_pushed:
+                fingerprints.append(uncached[position])
+                position += 1
+                continue
+            tag = scalar_tags.get(type(child))
+            if tag is not None:
+                fingerprints.append(hash((tag, child.value)))
+            else:
+                fingerprints.append(child.fingerprint)
+        del uncached[start:]
+        if is_array:
+            result = array_fingerprint(fingerprints)
+        else:
+            result = object_fingerprint(value, fingerprints)
+        if isinstance(node, ContainerTreeNode):
+            node.fingerprint = result
+        uncached.append(result)
+    return uncached[0]
+
+
+class PathIndex:
+    """
+    Maps the path of every node below a tree to the node itself. Paths are tuples of
+    object keys and list indexes, relative to the node the index was built from; the
+    empty path is not stored.
+    The index is a trie: every indexed node gets an integer ID and is stored under the
+    ID of its parent and its own key, so paths share their prefixes and building takes
+    time and memory linear in the number of nodes, however deep the tree. A lookup costs
+    one hash lookup per path element, and no node is visited.
+    Building the index reads every node, so it materializes lazy trees completely.
+    """
+
+    __slots__ = ("entries", "ids")
+
+    # (parent ID, key) -> (ID, node), the indexed node itself has ID 0
+    entries: typing.Dict[typing.Tuple[int, ChildKey], typing.Tuple[int, TreeNode]]
+    ids: typing.Iterator[int]
+
+    def __init__(self, tree: TreeNode):
+        self.entries = {}
+        self.ids = itertools.count(1)
+        self.add_children(0, tree)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add_children(self, identifier: int, tree: TreeNode) -> None:
+        """
+        Index everything below a node that is indexed under identifier.
+        """
+        entries = self.entries
+        ids = self.ids
+        stack = [(identifier, tree)]
+        while stack:
+            parent, node = stack.pop()
+            if node.type == NodeType.OBJECT:
+                children = node.value.items()
+            elif node.type == NodeType.ARRAY:
+                children = enumerate(node.value)
+            else:
+                continue
+            for key, child in children:
+                child_id = next(ids)
+                entries[(parent, key)] = (child_id, child)
+                stack.append((child_id, child))
+
+    def resolve(
+        self, path: typing.Tuple[ChildKey, ...]
+    ) -> typing.Optional[typing.Tuple[int, typing.Optional[TreeNode]]]:
+        """
+        Returns the ID and node stored at path, or None if the path does not exist.
+        The empty path resolves to ID 0 and no node.
+        """
+        entry = (0, None)
+        entries = self.entries
+        for key in path:
+            entry = entries.get((entry[0], key), None)
+            if entry is None:
+                return None
+        return entry
+
+    def add(self, path: typing.Tuple[ChildKey, ...], tree: TreeNode) -> None:
+        """
+        Index a subtree that was stored at path.
+
+        Args:
+            path: The path of the subtree root, relative to the indexed node.
+            tree: The subtree root.
+        """
+        parent = self.resolve(path[:-1])
+        if parent is None:
+            raise KeyError(path[:-1])
+        identifier = next(self.ids)
+        self.entries[(parent[0], path[-1])] = (identifier, tree)
+        self.add_children(identifier, tree)
+
+    def discard(self, path: typing.Tuple[ChildKey, ...], tree: TreeNode) -> None:
+        """
+        Remove a subtree that is about to leave path from the index.
+
+        Args:
+            path: The path of the subtree root, relative to the indexed node.
+            tree: The subtree root.
+        """
+        parent = self.resolve(path[:-1])
+        if parent is None:
+            return
+        entries = self.entries
+        entry = entries.pop((parent[0], path[-1]), None)
+        stack = [] if entry is None else [(entry[0], tree)]
+        while stack:
+            identifier, node = stack.pop()
+            if node.type == NodeType.OBJECT:
+                children = node.value.items()
+            elif node.type == NodeType.ARRAY:
+                children = enumerate(node.value)
+            else:
+                continue
+            for key, child in children:
+                entry = entries.pop((identifier, key), None)
+                if entry is not None:
+                    stack.append((entry[0], child))
+
+    def lookup(self, path: typing.Tuple[ChildKey, ...]) -> typing.Optional[TreeNode]:
+        """
+        Return the node stored at path, or None if the path does not exist.
+
+        Args:
+            path: Object keys and list indexes leading from the indexed node.
+        """
+        entry = self.resolve(path)
+        return None if entry is None else entry[1]
+
+
+def build_path_index(tree: ObjectTreeNode) -> PathIndex:
+    """
+    Build a PathIndex for an object node and attach it to the node.
+    Queries executed from that node then resolve pure key paths through the index.
+    An index that is already attached is returned as-is.
+
+    Args:
+        tree: The ObjectTreeNode to index.
+    """
+    if tree.path_index is None:
+        tree.path_index = PathIndex(tree)
+    return tree.path_index
+
+
+class TreeTooLargeError(ValueError):
+    """
+    Raised when a tree outgrows the byte budget of the TreeStatistics it is built with.
+    """
+
+    pass
+
+
+class TreeStatistics:
+    """
+    Size metadata of a tree or subtree:
+    - node_count: number of nodes, including the subtree root
+    - type_counts: number of nodes of each NodeType
+    - retained_bytes: approximate memory held by the nodes, their payloads, the lists
+      and dicts holding their children and the object keys. Objects that several nodes
+      share, such as small integers or the subtrees of interned trees, are counted at
+      each use.
+    - max_depth: number of edges from the subtree root down to its deepest node
+    - fan_out: number of containers by width, in power-of-two buckets: the bucket b holds
+      the widths from b to 2b - 1, and the bucket 0 holds empty containers
+    - largest: the paths and retained bytes of the largest containers below the subtree
+      root, largest first
+    Statistics are gathered while a tree is built, see create_tree, or by walking an
+    existing subtree, see tree_statistics. They describe the tree as it was measured and
+    are not updated by later edits.
+    """
+
+    __slots__ = (
+        "node_count",
+        "type_counts",
+        "retained_bytes",
+        "max_depth",
+        "fan_out",
+        "largest",
+        "largest_count",
+        "budget",
+        "_class_counts",
+        "_nodes",
+        "_positions",
+        "_parents",
+        "_bytes",
+        "_heights",
+    )
+
+    node_count: int
+    type_counts: typing.Dict[NodeType, int]
+    retained_bytes: int
+    max_depth: int
+    fan_out: typing.Dict[int, int]
+    largest: typing.List[typing.Tuple[typing.Tuple[ChildKey, ...], int]]
+
+    def __init__(self, largest: int = 10, budget: typing.Optional[int] = None):
+        """
+        Args:
+            largest: The number of largest subtrees to report.
+            budget: If given, building a tree whose retained bytes exceed it raises
+                TreeTooLargeError as soon as the budget is crossed.
+        """
+        self.node_count = 0
+        self.type_counts = dict.fromkeys(NodeType, 0)
+        self.retained_bytes = 0
+        self.max_depth = 0
+        self.fan_out = {}
+        self.largest = []
+        self.largest_count = largest
+        self.budget = budget
+        # node counts by class, folded into type_counts by finish
+        self._class_counts = collections.Counter()
+        # one entry per container in pre-order, released by finish
+        self._nodes = []
+        self._positions = {}
+        self._parents = []
+        self._bytes = []
+        self._heights = []
+
+    def add_container(
+        self,
+        node: ContainerTreeNode,
+        children: typing.Sequence[TreeNode],
+        values: typing.Iterable[typing.Any],
+        parent: typing.Optional[ContainerTreeNode],
+    ) -> None:
+        """
+        Record a container with its children. A container is added after its parent,
+        which has already counted its node and the list or dict it holds.
+
+        Args:
+            node: The container.
+            children: The child nodes of the container.
+            values: The payloads of the children in the same order. For container
+                children, the decoded list or dict they were built from can stand in for
+                their own, which has the same length.
+            parent: The container holding node, or None for the subtree root.
+        """
+        getsizeof = sys.getsizeof
+        size = sum(map(getsizeof, children)) + sum(map(getsizeof, values))
+        if type(node.value) == dict:
+            size += sum(map(getsizeof, node.value))
+        self._class_counts.update(map(type, children))
+        width = len(children)
+        bucket = 1 << (width.bit_length() - 1) if width else 0
+        self.fan_out[bucket] = self.fan_out.get(bucket, 0) + 1
+
+        positions = self._positions
+        if parent is None:
+            size += getsizeof(node) + getsizeof(node.value)
+            self._class_counts[type(node)] += 1
+            self._parents.append(-1)
+        else:
+            self._parents.append(positions[id(parent)])
+        positions[id(node)] = len(self._nodes)
+        self._nodes.append(node)
+        self._bytes.append(size)
+        self._heights.append(1 if width else 0)
+        self.retained_bytes += size
+        if self.budget is not None and self.retained_bytes > self.budget:
+            raise TreeTooLargeError(
+                f"Tree exceeds its budget of {self.budget} bytes"
+                f" after {len(self._nodes)} containers"
+            )
+
+    def finish(self) -> "TreeStatistics":
+        """
+        Complete the statistics once every container has been added: the sizes and
+        heights of the subtrees are carried up to their parents in reverse pre-order,
+        and the references to the nodes are released. The node and the list or dict of
+        a container were counted by its parent, so they only join its own subtree here.
+        """
+        getsizeof = sys.getsizeof
+        nodes, parents = self._nodes, self._parents
+        sizes, heights = self._bytes, self._heights
+        for position in range(len(parents) - 1, 0, -1):
+            parent = parents[position]
+            sizes[parent] += sizes[position]
+            node = nodes[position]
+            sizes[position] += getsizeof(node) + getsizeof(node.value)
+            if heights[position] + 1 > heights[parent]:
+                heights[parent] = heights[position] + 1
+        if heights:
+            self.max_depth = heights[0]
+        for node_class, count in self._class_counts.items():
+            self.type_counts[node_class.type] += count
+        self._class_counts = collections.Counter()
+        self.node_count = sum(self.type_counts.values())
+        self.largest = [
+            (self.path_of(position), sizes[position])
+            for position in heapq.nlargest(
+                self.largest_count, range(1, len(sizes)), key=sizes.__getitem__
+            )
+        ]
+        self._nodes, self._positions, self._parents = [], {}, []
+        self._bytes, self._heights = [], []
+        return self
+
+    def path_of(self, position: int) -> typing.Tuple[ChildKey, ...]:
+        """
+        Returns the path of a recorded container relative to the subtree root.
+        """
+        path = []
+        parent = self._parents[position]
+        while parent != -1:
+            path.append(self._nodes[parent].key_of(self._nodes[position]))
+            position, parent = parent, self._parents[parent]
+        return tuple(reversed(path))
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "node_count": self.node_count,
+            "type_counts": {t.value: n for t, n in self.type_counts.items()},
+            "retained_bytes": self.retained_bytes,
+            "max_depth": self.max_depth,
+            "fan_out": dict(sorted(self.fan_out.items())),
+            "largest": [
+                {"path": list(path), "retained_bytes": size}
+                for path, size in self.largest
+            ],
+        }
+
+
+def tree_statistics(tree: TreeNode, largest: int = 10) -> TreeStatistics:
+    """
+    Measure any subtree by walking it, see TreeStatistics. Walking materializes lazy
+    trees completely; a tree built with create_tree(statistics=...) has its statistics
+    gathered without a separate walk.
+
+    Args:
+        tree: The root of the subtree to measure.
+        largest: The number of largest subtrees to report.
+    """
+    statistics = TreeStatistics(largest)
+    if not isinstance(tree, ContainerTreeNode):
+        statistics.type_counts[tree.type] += 1
+        statistics.retained_bytes = sys.getsizeof(tree) + sys.getsizeof(tree.value)
+        return statistics.finish()
+    stack = [(tree, None)]
+    while stack:
+        node, parent = stack.pop()
+        children = list(node.value.values() if type(node.value) == dict else node.value)
+        statistics.add_container(
+            node, children, [child.value for child in children], parent
+        )
+        stack.extend(
+            (child, node) for child in children if isinstance(child, ContainerTreeNode)
+        )
+    return statistics.finish()
+
+
+def create_tree(
+    data: typing.Dict[str, typing.Any],
+    lazy: bool = False,
+    index: bool = False,
+    intern: bool = False,
+    statistics: typing.Optional[TreeStatistics] = None,
+) -> ObjectTreeNode:
+    """
+    Build a tree from a decoded JSON object.
+
+    Args:
+        data: The decoded JSON object.
+        lazy: If True, child nodes are only built when they are first accessed.
+        index: If True, a PathIndex is built and attached to the root.
+        intern: If True, identical scalars and subtrees share nodes, see build_interned.
+            Cannot be combined with lazy.
+        statistics: If given, a fresh TreeStatistics that is filled while the tree is
+            built, in the same pass. A budget set on it aborts the build with
+            TreeTooLargeError. Cannot be combined with lazy or intern.
+    """
     if type(data) != dict:
         raise ValueError(f"Invalid type: {type(data)} for value {data}")
-    return ObjectTreeNode(data)
+    if lazy and intern:
+        raise ValueError("Lazy trees cannot be interned")
+    if statistics is not None and (lazy or intern):
+        raise ValueError("Statistics are only gathered while building eager trees")
+    if intern:
+        tree = build_interned(data)
+    elif statistics is not None:
+        tree = ObjectTreeNode({})
+        build_children(tree, data, statistics)
+    else:
+        tree = LazyObjectTreeNode(data) if lazy else ObjectTreeNode(data)
+    if index:
+        build_path_index(tree)
+    return tree
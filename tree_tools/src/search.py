@@ -1,13 +1,57 @@
-from typing import Dict, Any, Optional
+import functools
+from typing import Dict, Any, List, Optional, Sequence, TextIO, BinaryIO, Union
 
+from tree_tools.src import jtt_output
 from tree_tools.src.jtt_tree import create_tree, NullTreeNode
 from tree_tools.src.jtt_query import queries
 from tree_tools.src.jtt_query import parsing
+from tree_tools.src.jtt_query import batch
+from tree_tools.src.jtt_query import instrumentation
+
+
+QUERY_CACHE_SIZE = 256
+
+
+@functools.lru_cache(maxsize=QUERY_CACHE_SIZE)
+def compile(query: str) -> queries.CompiledQuery:
+    """
+    This function parses a JMESPath query string into a reusable CompiledQuery.
+    The most recently used queries are cached, so compiling the same string again is a
+    dictionary lookup. Use compile.cache_info() to inspect the cache.
+
+    Args:
+        query: The JMESPath query string to compile.
+
+    Returns:
+        A CompiledQuery that can be executed against any number of trees.
+    """
+    parser = parsing.JMESPathParser()
+    return queries.CompiledQuery(query, parser.parse(query))
+
+
+@functools.lru_cache(maxsize=QUERY_CACHE_SIZE)
+def compile_many(queries: Sequence[str]) -> batch.QueryBatch:
+    """
+    This function compiles several JMESPath query strings into a QueryBatch that evaluates
+    all of them in one pass over a tree. Batches are cached like single queries.
+
+    Args:
+        queries: The JMESPath query strings to compile, as a tuple.
+
+    Returns:
+        A QueryBatch returning one result per query, in order.
+    """
+    return batch.QueryBatch([compile(query) for query in queries])
 
 
 def jmespath_search(query: str, tree: Dict[str, Any]) -> Dict[str, Any]:
     """
     This function is used to search for nodes in a TreeNode object using a JMESPath query string.
+    Only the branches of the data that the query can reach are turned into nodes, see
+    CompiledQuery.build_tree.
+
+    Inside instrumentation.profile(), the time spent building, parsing, executing and
+    serializing is recorded in the active profile.
 
     Args:
         query: The JMESPath query string to use.
@@ -16,9 +60,66 @@ def jmespath_search(query: str, tree: Dict[str, Any]) -> Dict[str, Any]:
     Returns:
         A list of TreeNode objects that match the query.
     """
-    tree = create_tree(tree)
-    parser = parsing.JMESPathParser()
-    operation_chain = parser.parse(query)
-    processor = queries.QueryProcessor(tree, operation_chain)
-    results = processor.execute()
+    profile = instrumentation.active_profile()
+    if profile is not None:
+        return profiled_search(profile, query, tree)
+    compiled = compile(query)
+    results = compiled.execute(compiled.build_tree(tree))
     return results.serialize()
+
+
+def profiled_search(
+    profile: instrumentation.QueryProfile, query: str, tree: Dict[str, Any]
+) -> Any:
+    """
+    jmespath_search, recording each phase into a profile.
+    """
+    with profile.phase("parse"):
+        compiled = compile(query)
+    with profile.phase("build") as counters:
+        tree = compiled.build_tree(tree)
+        counters.nodes_allocated += 1
+    results = compiled.execute(tree)
+    with profile.phase("serialize") as counters:
+        serialized = results.serialize()
+        counters.nodes_visited += results.descendant_count + 1
+    return serialized
+
+
+def jmespath_search_dump(
+    query: str,
+    tree: Dict[str, Any],
+    fileobj: Union[TextIO, BinaryIO],
+    chunk_size: int = jtt_output.DEFAULT_CHUNK_SIZE,
+) -> None:
+    """
+    This function searches like jmespath_search, but writes the result to a stream as
+    JSON instead of returning a copy of it. Parts of the result that the query did not
+    need to read are written straight from the decoded data.
+
+    Args:
+        query: The JMESPath query string to use.
+        tree: The TreeNode to search.
+        fileobj: A text or binary file object opened for writing.
+        chunk_size: The number of characters to gather before each write.
+    """
+    compiled = compile(query)
+    results = compiled.execute(compiled.build_tree(tree))
+    jtt_output.dump(results, fileobj, chunk_size)
+
+
+def jmespath_search_many(queries: Sequence[str], tree: Dict[str, Any]) -> List[Any]:
+    """
+    This function is used to run several JMESPath query strings against the same data.
+    Queries that share leading keys walk that shared path only once.
+
+    Args:
+        queries: The JMESPath query strings to use.
+        tree: The TreeNode to search.
+
+    Returns:
+        A list holding the result of each query, in the order the queries were given.
+    """
+    tree = create_tree(tree, lazy=True)
+    results = compile_many(tuple(queries)).execute(tree)
+    return [result.serialize() for result in results]
@@ -30,7 +30,11 @@ def fixture_sample_data_type_tree(fixture_sample_data_types):
 
 
 @pytest.fixture()
-def fixture_pokemon_tree():
-    file = open("tree_tools/tests/test_jsons/pokemon.json")
-    data = json.load(file)
-    return create_tree(data)
+def fixture_pokemon_data():
+    with open("tree_tools/tests/test_jsons/pokemon.json") as file:
+        return json.load(file)
+
+
+@pytest.fixture()
+def fixture_pokemon_tree(fixture_pokemon_data):
+    return create_tree(fixture_pokemon_data)
@@ -0,0 +1,53 @@
+import pytest
+
+from tree_tools.benchmarks import generators, grammar_examples, runner
+from tree_tools.src import jtt_tree, search
+from tree_tools.src.jtt_query import parsing
+
+
+class TestGenerators:
+    @pytest.mark.parametrize("name", sorted(generators.DOCUMENTS))
+    def test_documents_are_deterministic(self, name: str):
+        """Test generated documents only depend on size and seed"""
+
+        generate, make_query = generators.DOCUMENTS[name]
+
+        assert generate(50) == generate(50)
+        tree = jtt_tree.create_tree(generate(50))
+        assert search.compile(make_query(50)).execute(tree).type != (
+            jtt_tree.NodeType.NULL
+        )
+
+    @pytest.mark.parametrize("query", grammar_examples.EXAMPLES)
+    def test_grammar_examples_parse(self, query: str):
+        """Test every grammar example is accepted by the parser"""
+
+        assert parsing.JMESPathParser().parse(query) is not None
+
+
+class TestRunner:
+    def test_run_and_compare(self):
+        """Test a run reports every step and flags growth beyond the threshold"""
+
+        results = runner.run(["wide", "array"], [10], repeats=1)
+        entries = results["results"]
+
+        assert "array/10/create_tree" in entries
+        assert {"min", "median", "peak_bytes"} <= set(entries["wide/10/execute"])
+        assert runner.compare(results, results) == []
+
+        slower = {"results": {k: dict(v) for k, v in entries.items()}}
+        slower["results"]["wide/10/parse"]["min"] *= 2
+        assert runner.compare(results, slower) == [
+            f"wide/10/parse min: {entries['wide/10/parse']['min']:.6g}"
+            f" -> {entries['wide/10/parse']['min'] * 2:.6g} (+100%)"
+        ]
+
+    def test_run_query_suite(self):
+        """Test query suites are parsed once per run regardless of sizes"""
+
+        results = runner.run(["grammar"], [10, 100], repeats=1)
+        size = len(grammar_examples.EXAMPLES)
+
+        assert list(results["results"]) == [f"grammar/{size}/parse"]
+        assert results["results"][f"grammar/{size}/parse"]["min"] > 0
@@ -0,0 +1,118 @@
+import io
+import pytest
+from typing import Dict, Any
+
+from tree_tools.src import jtt_arena, jtt_binary, jtt_tree
+from tree_tools.src.jtt_query import parsing, queries
+
+
+class TestArenaTree:
+    @pytest.mark.parametrize("data", [(None), (1), (1.0), ("a"), (True), ([])])
+    def test_arena_creation_failure(self, data: Any):
+        """Test arena tree creation failure"""
+
+        with pytest.raises(ValueError):
+            jtt_arena.create_arena_tree(data)
+
+    def test_arena_matches_tree(self, fixture_sample_data_types: Dict[str, Any]):
+        """Test arena views expose the same types and counts as boxed nodes"""
+
+        tree = jtt_tree.create_tree(fixture_sample_data_types)
+        arena_tree = jtt_arena.create_arena_tree(fixture_sample_data_types)
+
+        assert arena_tree.type == jtt_tree.NodeType.OBJECT
+        assert arena_tree.descendant_count == tree.descendant_count
+        assert list(arena_tree.value.keys()) == list(tree.value.keys())
+        for key, node in tree.value.items():
+            assert arena_tree.value[key].type == node.type
+            assert arena_tree.value[key].descendant_count == node.descendant_count
+        assert arena_tree.value["i"].value[3].value["j"].value == 7
+        assert arena_tree.value["i"].value[-1].type == jtt_tree.NodeType.OBJECT
+        assert len(arena_tree.value["i"].value) == 4
+        assert arena_tree.value.get("missing") is None
+
+    def test_arena_serialize(self, fixture_sample_data_types: Dict[str, Any]):
+        """Test serialization works directly from the arena columns"""
+
+        arena_tree = jtt_arena.create_arena_tree(fixture_sample_data_types)
+
+        assert arena_tree.serialize() == fixture_sample_data_types
+        assert arena_tree.value["e"].serialize() == fixture_sample_data_types["e"]
+        assert arena_tree.value["i"].serialize() == fixture_sample_data_types["i"]
+        assert arena_tree.value["a"].serialize() == 1
+
+    def test_arena_parents(self, fixture_sample_data_types: Dict[str, Any]):
+        """Test parent offsets point back at the containing node"""
+
+        arena = jtt_arena.TreeArena.from_data(fixture_sample_data_types)
+
+        assert arena.parent(0) == jtt_arena.NO_PARENT
+        for offset in range(len(arena)):
+            for child in arena.children(offset):
+                assert arena.parent(child) == offset
+
+    def test_arena_query(self, fixture_sample_data_types: Dict[str, Any]):
+        """Test query evaluation runs against arena views"""
+
+        arena_tree = jtt_arena.create_arena_tree(fixture_sample_data_types)
+        chain = parsing.JMESPathParser().parse("e.g")
+        result = queries.QueryProcessor(arena_tree, chain).execute()
+
+        assert result.type == jtt_tree.NodeType.STRING
+        assert result.serialize() == "4"
+
+    def test_incomplete_layout(self):
+        """Test arena layouts missing an accessor fail when created, not when read"""
+
+        class PartialArena(jtt_arena.ArenaBase):
+            def type_tag(self, offset: int) -> int:
+                return jtt_arena.TAG_OBJECT
+
+        with pytest.raises(TypeError):
+            PartialArena()
+
+    @pytest.mark.parametrize("binary", [False, True])
+    def test_list_indexing(self, monkeypatch: pytest.MonkeyPatch, binary: bool):
+        """Test lengths and indexes are answered without walking the siblings again"""
+
+        data = {"items": [{"id": i} for i in range(100)], "name": "x"}
+        root = jtt_arena.create_arena_tree(data)
+        if binary:
+            buffer = io.BytesIO()
+            jtt_binary.dump_binary(root, buffer)
+            root = jtt_binary.load_binary(buffer.getvalue())
+        items = root.value["items"].value
+
+        assert len(items) == 100 and len(root.value) == 2
+        assert items[5].serialize() == {"id": 5}
+        assert items[-1].serialize() == {"id": 99}
+        assert items[-100].serialize() == {"id": 0}
+        assert [item.value["id"].value for item in items[-3:]] == [97, 98, 99]
+        for index in (100, -101):
+            with pytest.raises(IndexError):
+                items[index]
+
+        def walk(self, offset: int):
+            raise AssertionError("siblings walked again")
+
+        monkeypatch.setattr(type(root.arena), "children", walk)
+
+        assert len(items) == 100 and len(root.value) == 2
+        assert items[-2].value["id"].value == 98
+        assert root.value["name"].value == "x"
+
+
+class TestNodeSlots:
+    def test_nodes_have_no_instance_dict(
+        self, fixture_sample_data_types: Dict[str, Any]
+    ):
+        """Test boxed nodes are slotted and carry no per-instance dictionary"""
+
+        tree = jtt_tree.create_tree(fixture_sample_data_types)
+        lazy_tree = jtt_tree.create_tree(fixture_sample_data_types, lazy=True)
+
+        assert not hasattr(tree, "__dict__")
+        assert not hasattr(tree.value["a"], "__dict__")
+        assert not hasattr(tree.value["i"], "__dict__")
+        assert not hasattr(lazy_tree, "__dict__")
+        assert not hasattr(jtt_arena.create_arena_tree({}), "__dict__")
@@ -0,0 +1,98 @@
+import asyncio
+import concurrent.futures
+import threading
+import time
+import pytest
+from typing import Dict, Any
+
+from tree_tools.src import async_search, jtt_tree
+from tree_tools.src.jtt_query import parsing
+from tree_tools.src.search import jmespath_search
+
+
+class TestAsyncSearch:
+    def test_async_search(self, fixture_pokemon_data: Dict[str, Any]):
+        """Test awaited searches match jmespath_search, including with a process pool"""
+
+        query = "pokemon[?spawn_chance > `1`].name"
+        expected = jmespath_search(query, fixture_pokemon_data)
+
+        async def main():
+            with concurrent.futures.ProcessPoolExecutor(max_workers=1) as pool:
+                in_process = await async_search.async_search(
+                    query, fixture_pokemon_data, pool
+                )
+            return (
+                await async_search.async_search(query, fixture_pokemon_data),
+                in_process,
+            )
+
+        assert asyncio.run(main()) == (expected, expected)
+
+    def test_search_many_limits_concurrency(
+        self, fixture_sample_data_types: Dict[str, Any]
+    ):
+        """Test at most max_concurrency calls run in the executor at a time"""
+
+        lock = threading.Lock()
+        running = [0, 0]
+
+        def tracked(value: int) -> int:
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+            return value
+
+        async def main():
+            with concurrent.futures.ThreadPoolExecutor(max_workers=8) as pool:
+                processor = async_search.AsyncQueryProcessor(pool, max_concurrency=2)
+                values = await asyncio.gather(
+                    *(processor.run(tracked, i) for i in range(6))
+                )
+                results = await processor.search_many(
+                    [
+                        ("a", fixture_sample_data_types),
+                        ("e.f", fixture_sample_data_types),
+                    ]
+                )
+                with pytest.raises(parsing.JMESPathValidationError):
+                    await processor.search_many([("[a", fixture_sample_data_types)])
+            return values, results
+
+        values, results = asyncio.run(main())
+
+        assert values == list(range(6))
+        assert running == [0, 2]
+        assert results == [1, 3]
+
+    def test_iter_results_yields_to_the_loop(
+        self, fixture_pokemon_tree: jtt_tree.ObjectTreeNode
+    ):
+        """Test other tasks run between batches of results"""
+
+        events = []
+
+        async def ticker():
+            while True:
+                events.append("tick")
+                await asyncio.sleep(0)
+
+        async def main():
+            task = asyncio.ensure_future(ticker())
+            await asyncio.sleep(0)
+            processor = async_search.AsyncQueryProcessor(yield_every=50)
+            async for result in processor.iter_results(
+                "pokemon[*].id", fixture_pokemon_tree
+            ):
+                events.append(result.value)
+            task.cancel()
+
+        asyncio.run(main())
+
+        ids = [event for event in events if event != "tick"]
+        assert ids == list(range(1, 152))
+        assert events.index(51) > events.index(50) + 1
+        assert events[events.index(1) : events.index(50) + 1] == list(range(1, 51))
@@ -0,0 +1,82 @@
+import io
+import json
+import pytest
+from typing import Dict, Any
+
+from tree_tools.src import jtt_arena, jtt_binary, jtt_tree, search
+
+
+def dump(tree: jtt_tree.TreeNode) -> bytes:
+    buffer = io.BytesIO()
+    jtt_binary.dump_binary(tree, buffer)
+    return buffer.getvalue()
+
+
+class TestBinaryTree:
+    def test_round_trip(self, fixture_sample_data_types: Dict[str, Any]):
+        """Test a dumped tree loads back with the same types, counts and values"""
+
+        data = dict(fixture_sample_data_types, big=2**70, text="日本\U0001f600")
+        tree = jtt_tree.create_tree(data)
+
+        root = jtt_binary.load_binary(dump(tree))
+
+        assert root.serialize() == data
+        assert root.descendant_count == tree.descendant_count
+        assert root.value["i"].descendant_count == 5
+        assert type(root.value["a"].value) == int
+        assert type(root.value["c"].value) == float
+        assert root.value["d"].value is True
+        assert root.value["big"].value == 2**70
+        assert root.value["k"].type == jtt_tree.NodeType.NULL
+
+    def test_dump_any_node_type(self, fixture_sample_data_types: Dict[str, Any]):
+        """Test lazy and arena trees write the same bytes as boxed trees"""
+
+        expected = dump(jtt_tree.create_tree(fixture_sample_data_types))
+
+        assert dump(jtt_tree.create_tree(fixture_sample_data_types, lazy=True)) == (
+            expected
+        )
+        assert dump(jtt_arena.create_arena_tree(fixture_sample_data_types)) == (
+            expected
+        )
+
+    def test_strings_are_interned(self):
+        """Test repeated keys and string values are stored once"""
+
+        data = {"rows": [{"name": "same", "kind": "same"} for _ in range(100)]}
+        arena = jtt_binary.MappedArena(dump(jtt_tree.create_tree(data)))
+
+        assert sorted(arena.keys) == ["kind", "name", "rows"]
+        assert len(arena.string_offsets) == 2
+
+    def test_open_binary_query(self, fixture_pokemon_tree, tmp_path):
+        """Test a mapped file is queried in place"""
+
+        path = str(tmp_path / "pokemon.jttb")
+        with open(path, "wb") as file:
+            jtt_binary.dump_binary(fixture_pokemon_tree, file)
+
+        with jtt_binary.open_binary(path) as mapped:
+            names = search.compile("pokemon[?id > `149`].name").execute(mapped.root)
+            first = search.compile("pokemon[0].name").execute(mapped.root)
+            missing = search.compile("pokemon[0].missing").execute(mapped.root)
+
+            assert names.serialize() == ["Mewtwo", "Mew"]
+            assert first.value == "Bulbasaur"
+            assert missing.type == jtt_tree.NodeType.NULL
+            assert mapped.root.serialize() == fixture_pokemon_tree.serialize()
+
+    @pytest.mark.parametrize(
+        "buffer", [b"", b"JTTB", b"XXXX" + bytes(28), b"JTTB\x09\x00" + bytes(26)]
+    )
+    def test_invalid_buffer(self, buffer: bytes):
+        with pytest.raises(jtt_binary.BinaryFormatError):
+            jtt_binary.load_binary(buffer)
+
+    def test_truncated_buffer(self, fixture_sample_data_types: Dict[str, Any]):
+        data = dump(jtt_tree.create_tree(fixture_sample_data_types))
+
+        with pytest.raises(jtt_binary.BinaryFormatError):
+            jtt_binary.load_binary(data[:-16])
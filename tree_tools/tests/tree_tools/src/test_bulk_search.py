@@ -0,0 +1,91 @@
+import io
+import json
+import pytest
+from typing import Dict, Any
+
+from tree_tools.src import bulk_search
+from tree_tools.src.jtt_query import parsing
+from tree_tools.src.search import jmespath_search
+
+
+@pytest.fixture()
+def fixture_documents():
+    return [{"a": {"b": i}, "c": str(i)} if i % 3 else {"c": i} for i in range(50)]
+
+
+class TestBulkSearch:
+    @pytest.mark.parametrize("backend", ["serial", "thread", "process"])
+    def test_bulk_search_in_order(self, fixture_documents, backend: str):
+        """Test results come back in input order for every backend"""
+
+        results = bulk_search.bulk_search(
+            "a.b", fixture_documents, backend=backend, workers=2, chunk_size=4
+        )
+
+        assert list(results) == [
+            jmespath_search("a.b", document) for document in fixture_documents
+        ]
+
+    def test_bulk_search_backpressure(self, fixture_documents):
+        """Test the input is consumed lazily, a bounded number of chunks ahead"""
+
+        consumed = []
+
+        def documents():
+            for document in fixture_documents:
+                consumed.append(document)
+                yield document
+
+        results = bulk_search.bulk_search(
+            "c",
+            documents(),
+            backend="thread",
+            workers=1,
+            chunk_size=5,
+            max_pending_chunks=2,
+        )
+
+        assert next(results) == fixture_documents[0]["c"]
+        assert len(consumed) <= 15
+        assert len(list(results)) == len(fixture_documents) - 1
+
+    @pytest.mark.parametrize("backend", ["serial", "process"])
+    def test_bulk_search_ndjson(self, fixture_documents, backend: str, tmp_path):
+        """Test NDJSON files and file objects are searched line by line"""
+
+        text = "\n".join(json.dumps(document) for document in fixture_documents)
+        path = tmp_path / "documents.ndjson"
+        path.write_text(text + "\n\n")
+        expected = [document.get("c") for document in fixture_documents]
+
+        from_path = bulk_search.bulk_search_ndjson("c", str(path), backend=backend)
+        from_file = bulk_search.bulk_search_ndjson(
+            "c", io.StringIO(text), backend=backend, chunk_size=7
+        )
+
+        assert list(from_path) == expected
+        assert list(from_file) == expected
+
+    def test_bulk_search_invalid_backend(self, fixture_documents):
+        """Test an unknown backend is rejected before any work is done"""
+
+        with pytest.raises(ValueError):
+            bulk_search.bulk_search("a", fixture_documents, backend="gpu")
+        with pytest.raises(ValueError):
+            bulk_search.bulk_search_ndjson("a", io.StringIO(""), backend="gpu")
+
+    @pytest.mark.parametrize("backend", bulk_search.BACKENDS)
+    def test_bulk_search_invalid_query(
+        self, fixture_documents, backend: str, capfd: pytest.CaptureFixture
+    ):
+        """Test an invalid query raises its parse error on every backend"""
+
+        with pytest.raises(parsing.JMESPathValidationError):
+            list(bulk_search.bulk_search("foo[", fixture_documents, backend=backend))
+        with pytest.raises(parsing.JMESPathValidationError):
+            list(
+                bulk_search.bulk_search_ndjson(
+                    "foo[", io.StringIO('{"a": 1}\n'), backend=backend
+                )
+            )
+        assert capfd.readouterr().err == ""
@@ -0,0 +1,76 @@
+import pytest
+from typing import Dict, Any
+
+from tree_tools.src import jtt_tree, search
+from tree_tools.src.jtt_query.cache import ResultCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestResultCache:
+    def test_cache_hits(self, fixture_sample_data_type_tree: jtt_tree.ObjectTreeNode):
+        """Test repeated queries against an unchanged tree are served from the cache"""
+
+        cache = ResultCache()
+        compiled = search.compile("i[*]")
+
+        first = cache.execute(compiled, fixture_sample_data_type_tree)
+        second = cache.execute(compiled, fixture_sample_data_type_tree)
+        limited = cache.execute(compiled, fixture_sample_data_type_tree, limit=1)
+
+        assert second is first
+        assert limited.serialize() == [5]
+        info = cache.cache_info()
+        assert (info.hits, info.misses, info.currsize) == (1, 2, 2)
+
+    def test_cache_invalidated_by_edits(
+        self, fixture_sample_data_types: Dict[str, Any]
+    ):
+        """Test editing any node below the tree drops its stale results"""
+
+        tree = jtt_tree.create_tree(fixture_sample_data_types)
+        cache = ResultCache()
+        compiled = search.compile("i[3].j")
+
+        assert cache.execute(compiled, tree).value == 7
+        tree.value["i"].value[3].set("j", 8)
+
+        assert cache.execute(compiled, tree).value == 8
+        assert cache.execute(compiled, tree).value == 8
+        info = cache.cache_info()
+        assert (info.hits, info.misses, info.invalidations) == (1, 2, 1)
+
+    def test_cache_eviction(
+        self, fixture_sample_data_type_tree: jtt_tree.ObjectTreeNode
+    ):
+        """Test the least recently used entry is evicted and old entries expire"""
+
+        clock = FakeClock()
+        cache = ResultCache(maxsize=2, ttl=10, clock=clock)
+        tree = fixture_sample_data_type_tree
+        a, b, c = search.compile("a"), search.compile("b"), search.compile("c")
+
+        cache.execute(a, tree)
+        cache.execute(b, tree)
+        cache.execute(a, tree)
+        cache.execute(c, tree)
+        clock.now = 5
+        cache.execute(a, tree)
+        cache.execute(b, tree)
+        clock.now = 20
+        cache.execute(a, tree)
+
+        info = cache.cache_info()
+        assert (info.hits, info.misses) == (2, 5)
+        assert (info.evictions, info.expirations, info.currsize) == (2, 1, 2)
+
+        cache.clear()
+        assert cache.cache_info() == (0, 0, 0, 0, 0, 2, 0)
+        with pytest.raises(ValueError):
+            ResultCache(maxsize=0)
@@ -0,0 +1,128 @@
+import pytest
+
+from tree_tools.src import jtt_columns, jtt_tree
+
+numpy = pytest.importorskip("numpy")
+
+
+class TestColumns:
+    def test_extract_column(self, fixture_pokemon_tree):
+        """Test a projected field becomes a float vector with no masked entries"""
+
+        column = jtt_columns.extract_column(
+            fixture_pokemon_tree, "pokemon[*].spawn_chance"
+        )
+        expected = [
+            p.value["spawn_chance"].value
+            for p in fixture_pokemon_tree.value["pokemon"].value
+        ]
+
+        assert column.values.dtype == numpy.float64
+        assert len(column) == 151
+        assert not column.mask.any()
+        assert numpy.allclose(column.values, expected)
+        assert column.sum() == pytest.approx(sum(expected))
+        assert column.max() == max(expected)
+        assert column.mean() == pytest.approx(sum(expected) / len(expected))
+
+    def test_extract_column_mask(self, fixture_pokemon_tree):
+        """Test missing fields are masked and left out of aggregates"""
+
+        column = jtt_columns.extract_column(
+            fixture_pokemon_tree, "pokemon[*].candy_count", dtype="int64"
+        )
+        expected = [
+            p.value["candy_count"].value
+            for p in fixture_pokemon_tree.value["pokemon"].value
+            if "candy_count" in p.value
+        ]
+
+        assert column.values.dtype == numpy.int64
+        assert len(column) == 151
+        assert column.count() == len(expected)
+        assert list(column.valid()) == expected
+        assert column.sum() == sum(expected)
+        assert column.min() == min(expected)
+        assert column.to_masked_array().sum() == sum(expected)
+
+    def test_extract_field(self):
+        """Test fields are read per element of a list node, including nested paths"""
+
+        tree = jtt_tree.create_tree(
+            {"rows": [{"s": {"w": 1.5}}, {"s": {"w": None}}, {}, {"s": {"w": 3}}]}
+        )
+
+        column = jtt_columns.extract_field(tree.value["rows"], "s.w")
+
+        assert list(column.mask) == [False, True, True, False]
+        assert column.values[0] == 1.5 and column.values[3] == 3.0
+        assert column.mean() == pytest.approx(2.25)
+
+    def test_filtered_column(self, fixture_pokemon_tree):
+        """Test filter projections narrow the rows of a column"""
+
+        column = jtt_columns.extract_column(
+            fixture_pokemon_tree, "pokemon[?egg == '10 km'].avg_spawns"
+        )
+
+        assert 0 < len(column) < 151
+        assert column.count() == len(column)
+
+    def test_empty_aggregates(self):
+        """Test aggregates of a fully masked column"""
+
+        tree = jtt_tree.create_tree({"rows": [{}, {"a": None}]})
+        column = jtt_columns.extract_column(tree, "rows[*].a")
+
+        assert column.count() == 0
+        assert column.min() is None and column.mean() is None
+
+    @pytest.mark.parametrize(
+        "query,dtype",
+        [
+            ("rows", "float64"),
+            ("rows[*].a[*]", "float64"),
+            ("rows[*].s", "float64"),
+            ("rows[*].f", "int64"),
+            ("rows[*].a", "str"),
+            ("missing[*].a", "float64"),
+        ],
+    )
+    def test_invalid_columns(self, query: str, dtype: str):
+        tree = jtt_tree.create_tree({"rows": [{"a": 1, "s": "x", "f": 1.5}]})
+
+        with pytest.raises(jtt_columns.ColumnError):
+            jtt_columns.extract_column(tree, query, dtype=dtype)
+
+    @pytest.mark.parametrize(
+        "value,dtype",
+        [
+            (2**40, "int32"),
+            (-1, "uint8"),
+            (300, "int8"),
+            (2**64, "uint64"),
+            (1e300, "float32"),
+        ],
+    )
+    def test_values_out_of_range(self, value, dtype: str):
+        """Test values that do not fit a narrow dtype are rejected instead of wrapping"""
+
+        tree = jtt_tree.create_tree({"r": [{"v": 1}, {"v": value}]})
+
+        with pytest.raises(jtt_columns.ColumnError):
+            jtt_columns.extract_column(tree, "r[*].v", dtype)
+
+    def test_narrow_dtypes(self):
+        """Test narrow and unsigned dtypes are filled at their own width"""
+
+        tree = jtt_tree.create_tree({"r": [{"v": 2**31 - 1}, {"v": -5}, {}]})
+
+        column = jtt_columns.extract_column(tree, "r[*].v", "int32")
+
+        assert column.values.dtype == "int32"
+        assert column.values[:2].tolist() == [2**31 - 1, -5]
+        assert column.mask.tolist() == [False, False, True]
+        unsigned = jtt_columns.extract_column(
+            jtt_tree.create_tree({"r": [{"v": 2**64 - 1}]}), "r[*].v", "uint64"
+        )
+        assert unsigned.values.tolist() == [2**64 - 1]
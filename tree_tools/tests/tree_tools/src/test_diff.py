@@ -0,0 +1,94 @@
+import copy
+import pytest
+from typing import Dict, Any
+
+from tree_tools.src import jtt_diff, jtt_tree
+
+
+def changes(tree_a: jtt_tree.TreeNode, tree_b: jtt_tree.TreeNode) -> list:
+    return [change.to_dict() for change in jtt_diff.diff(tree_a, tree_b)]
+
+
+class TestDiff:
+    def test_identical_trees(self, fixture_sample_data_types: Dict[str, Any]):
+        """Test equal trees, of any implementation, have no changes"""
+
+        eager = jtt_tree.create_tree(fixture_sample_data_types)
+        lazy = jtt_tree.create_tree(fixture_sample_data_types, lazy=True)
+        interned = jtt_tree.create_tree(fixture_sample_data_types, intern=True)
+
+        assert jtt_diff.diff(eager, lazy) == []
+        assert jtt_diff.diff(interned, eager, verify=True) == []
+
+    def test_leaf_changes(self, fixture_sample_data_types: Dict[str, Any]):
+        """Test changed, added and removed members are reported by path in order"""
+
+        data = copy.deepcopy(fixture_sample_data_types)
+        data["a"] = 2
+        data["e"]["g"] = {"nested": "4"}
+        del data["e"]["h"]
+        data["e"]["new"] = None
+        data["i"][3]["j"] = 8
+        data["c"] = 1.5
+
+        result = changes(
+            jtt_tree.create_tree(fixture_sample_data_types), jtt_tree.create_tree(data)
+        )
+
+        assert result == [
+            {"kind": "changed", "path": ["a"], "before": 1, "after": 2},
+            {
+                "kind": "changed",
+                "path": ["e", "g"],
+                "before": "4",
+                "after": data["e"]["g"],
+            },
+            {"kind": "removed", "path": ["e", "h"], "before": False, "after": None},
+            {"kind": "added", "path": ["e", "new"], "before": None, "after": None},
+            {"kind": "changed", "path": ["i", 3, "j"], "before": 7, "after": 8},
+        ]
+
+    @pytest.mark.parametrize(
+        "before,after,expected",
+        [
+            ([1, 2, 3, 4], [1, 9, 2, 3, 4], [("added", [1], 9)]),
+            ([1, 2, 3, 4], [1, 3, 4], [("removed", [1], 2)]),
+            ([1, 2, 3], [1, 5, 3], [("changed", [1], 5)]),
+            ([1, True], [1.0, 1], [("changed", [1], 1)]),
+        ],
+    )
+    def test_list_changes(self, before: list, after: list, expected: list):
+        """Test list diffs skip the common prefix and suffix"""
+
+        result = jtt_diff.diff(
+            jtt_tree.create_tree({"l": before}), jtt_tree.create_tree({"l": after})
+        )
+
+        assert [
+            (c.kind, list(c.path[1:]), (c.after or c.before).value) for c in result
+        ] == expected
+
+    def test_diff_skips_equal_subtrees(
+        self, fixture_pokemon_data: Dict[str, Any], monkeypatch
+    ):
+        """Test only the subtrees on the way to a change are read once fingerprinted"""
+
+        tree_a = jtt_tree.create_tree(fixture_pokemon_data)
+        tree_b = jtt_tree.create_tree(fixture_pokemon_data)
+        jtt_tree.fingerprint(tree_a), jtt_tree.fingerprint(tree_b)
+        tree_b.value["pokemon"].value[10].set("name", "Changed")
+        read = []
+        fingerprint = jtt_tree.fingerprint
+
+        def counting(node: jtt_tree.TreeNode) -> int:
+            read.append(node)
+            return fingerprint(node)
+
+        monkeypatch.setattr(jtt_tree, "fingerprint", counting)
+        result = jtt_diff.diff(tree_a, tree_b)
+
+        assert [(c.kind, c.path) for c in result] == [
+            ("changed", ("pokemon", 10, "name"))
+        ]
+        # one pair per pokemon and per member of the changed one, and none further down
+        assert len(read) <= 2 * (151 + len(tree_a.value["pokemon"].value[10].value))
@@ -0,0 +1,116 @@
+import pytest
+from typing import Any
+
+from tree_tools.src import jtt_tree
+from tree_tools.src.jtt_query import parsing
+from tree_tools.src.search import jmespath_search
+
+
+@pytest.fixture()
+def fixture_items():
+    return {
+        "items": [
+            {"price": 5, "tag": "x"},
+            {"price": 12, "tag": "x", "n": {"v": [1, 2]}},
+            {"price": 20, "tag": "y"},
+            {"price": None},
+            {"price": True},
+            {"price": "11", "tag": "x"},
+            {"price": 0, "tag": ""},
+        ]
+    }
+
+
+class TestFilterCompilation:
+    @pytest.mark.parametrize(
+        "expression,value,expected",
+        [
+            ("price > `10`", {"price": 12}, True),
+            ("price > `10`", {"price": "12"}, False),
+            ("price > `10`", {"price": True}, False),
+            ("price <= `10`", {"price": 10.0}, True),
+            ("`10` < price", {"price": 11}, True),
+            ("price == `1`", {"price": True}, False),
+            ("tag == 'x'", {"tag": "x"}, True),
+            ("tag != 'x'", {}, True),
+            ("missing == null", {}, True),
+            ("a.b[1] == `2`", {"a": {"b": [1, 2]}}, True),
+            ("a == `[1, 2]`", {"a": [1, 2]}, True),
+            ("a == b", {"a": {"c": 1}, "b": {"c": 1}}, True),
+            ("a == b", {"a": 1, "b": 1.0}, True),
+            ("a < b", {"a": 1, "b": 2}, True),
+            ("a", {"a": 0}, True),
+            ("a", {"a": ""}, False),
+            ("!a", {"a": []}, True),
+            ("@.a && b", {"a": 1, "b": {}}, False),
+            ("(a || b) && c", {"b": 1, "c": "c"}, True),
+            ("a || b && c", {"a": 1}, True),
+        ],
+    )
+    def test_compiled_predicate(self, expression: str, value: Any, expected: bool):
+        """Test compiled predicates follow JMESPath comparison and truth rules"""
+
+        predicate = parsing.JMESPathParser().parse_predicate(expression)
+
+        assert predicate(jtt_tree.box_value(value)) is expected
+
+    def test_short_circuit(self):
+        """Test the right operand is not evaluated once the result is known"""
+
+        calls = []
+
+        class Spy(jtt_tree.ObjectTreeNode):
+            __slots__ = ()
+
+            @property
+            def type(self):
+                calls.append(True)
+                return jtt_tree.NodeType.OBJECT
+
+        predicate = parsing.JMESPathParser().parse_predicate("`false` && a")
+
+        assert predicate(Spy({"a": 1})) is False
+        assert not calls
+
+    @pytest.mark.parametrize(
+        "expression", ["", "a ==", "a = 1", "(a", "a b", "`{`", "a.`1`"]
+    )
+    def test_invalid_filter(self, expression: str):
+        with pytest.raises(parsing.JMESPathValidationError):
+            parsing.JMESPathParser().parse_predicate(expression)
+
+
+class TestFilterSearch:
+    @pytest.mark.parametrize(
+        "query,expected_result",
+        [
+            ("items[?price > `10` && tag == 'x'].price", [12]),
+            ("items[?price > `10`].tag", ["x", "y"]),
+            ("items[?tag].price", [5, 12, 20, "11"]),
+            ("items[?n.v[0] == `1`].price", [12]),
+            ("items[?price == `true`]", [{"price": True}]),
+            ("items[?tag == 'x'][0]", []),
+            ("items[?tag == 'z'].price", []),
+            ("items[0][?a]", None),
+            ("items[?tag && starts_with(tag, 'x') && price > `6`].price", [12]),
+            ("items[?length(@) > `2`].price", [12]),
+        ],
+    )
+    def test_filter_projection(self, fixture_items, query: str, expected_result: Any):
+        """Test filter projections select elements and project the rest of the query"""
+
+        assert jmespath_search(query, fixture_items) == expected_result
+
+    def test_filter_tokenization(self):
+        """Test brackets and quotes inside a filter do not end the filter"""
+
+        chain = parsing.JMESPathParser().parse("a[?b[0] == ']' && c == `[1]`].d")
+
+        operations = list(chain)
+        assert operations[1].expression == "b[0] == ']' && c == `[1]`"
+        assert operations[2].key == "d"
+
+    @pytest.mark.parametrize("query", ["a[?b", "a[?b ==]", "a[?]"])
+    def test_invalid_filter_query(self, query: str):
+        with pytest.raises(parsing.JMESPathValidationError):
+            parsing.JMESPathParser().parse(query)
@@ -0,0 +1,75 @@
+import pytest
+
+from tree_tools.src import search
+from tree_tools.src.jtt_query import functions
+
+
+DATA = {
+    "numbers": [3, -1.5, 2],
+    "words": ["b", "a", "c"],
+    "people": [
+        {"name": "x", "age": 30},
+        {"name": "y", "age": 20},
+        {"name": "z", "age": 40},
+    ],
+    "obj": {"k": 1, "j": "v"},
+    "text": "hello",
+}
+
+
+class TestFunctions:
+    @pytest.mark.parametrize(
+        "query,expected",
+        [
+            ("abs(numbers[1])", 1.5),
+            ("avg(numbers)", 3.5 / 3),
+            ("ceil(numbers[1])", -1),
+            ("floor(numbers[1])", -2),
+            ("contains(words, 'a')", True),
+            ("contains(text, 'ell')", True),
+            ("starts_with(text, 'he')", True),
+            ("ends_with(text, 'x')", False),
+            ("join('-', words)", "b-a-c"),
+            ("keys(obj)", ["k", "j"]),
+            ("values(obj)", [1, "v"]),
+            ("length(text)", 5),
+            ("length(obj)", 2),
+            ("map(&age, people)", [30, 20, 40]),
+            ("max(numbers)", 3),
+            ("min(words)", "a"),
+            ("max_by(people, &age).name", "z"),
+            ("min_by(people, &age).name", "y"),
+            ("sort_by(people, &age)[*].name", ["y", "x", "z"]),
+            ("sort(words)", ["a", "b", "c"]),
+            ("reverse(words)", ["c", "a", "b"]),
+            ("reverse(text)", "olleh"),
+            ('merge(obj, `{"k": 2}`)', {"k": 2, "j": "v"}),
+            ("not_null(missing, obj.j)", "v"),
+            ("sum(numbers)", 3.5),
+            ("to_array(text)", ["hello"]),
+            ("to_number('12')", 12),
+            ("to_number('1.5')", 1.5),
+            ("to_number(text)", None),
+            ("to_string(obj)", '{"k":1,"j":"v"}'),
+            ("type(numbers)", "array"),
+            ("people[?age > `25`] | length(@)", 2),
+        ],
+    )
+    def test_builtins(self, query: str, expected):
+        assert search.jmespath_search(query, DATA) == expected
+
+    @pytest.mark.parametrize(
+        "query",
+        ["abs(text)", "sum(words)", "sort_by(people, &name[0])", "keys(words)"],
+    )
+    def test_type_errors(self, query: str):
+        with pytest.raises(functions.JMESPathTypeError):
+            search.jmespath_search(query, DATA)
+
+    def test_registry(self):
+        assert all(name == f.name for name, f in functions.FUNCTIONS.items())
+        assert functions.FUNCTIONS["merge"].check_arity(0) == (
+            "merge() takes at least 1 argument, got 0."
+        )
+        assert functions.FUNCTIONS["sort_by"].accepts_reference(1)
+        assert not functions.FUNCTIONS["sort_by"].accepts_reference(0)
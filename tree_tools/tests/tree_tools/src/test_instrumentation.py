@@ -0,0 +1,60 @@
+from tree_tools.src import jtt_tree, search
+from tree_tools.src.jtt_query import instrumentation, queries
+
+
+class TestProfile:
+    def test_disabled_by_default(self, fixture_pokemon_tree):
+        """Test processors run the original plan when no profile is active"""
+
+        compiled = search.compile("pokemon[*].name")
+        processor = compiled.processor(fixture_pokemon_tree)
+
+        assert instrumentation.active_profile() is None
+        assert len(processor.execute().value) == 151
+        assert all(
+            not isinstance(operation, instrumentation.ProfiledProjection)
+            for operation, _ in processor.plan.stages
+        )
+
+    def test_operation_counters(self, fixture_pokemon_tree):
+        """Test every operation records its calls and visited nodes"""
+
+        compiled = search.compile("pokemon[*].next_evolution[0].name")
+
+        with instrumentation.profile() as profile:
+            results = compiled.execute(fixture_pokemon_tree)
+
+        pokemon = fixture_pokemon_tree.value["pokemon"].value
+        evolving = [p for p in pokemon if "next_evolution" in p.value]
+        counters = [(s.position, s.name, s.calls) for s in profile.operations.values()]
+        assert counters == [
+            (0, "KeySelectOperation", 1),
+            (1, "WildcardIndexOperation", 1),
+            (2, "KeySelectOperation", 151),
+            (3, "IndexOperation", len(evolving)),
+            (4, "KeySelectOperation", len(evolving)),
+        ]
+        assert list(profile.operations.values())[1].nodes_visited == 152
+        assert profile.phases["execute"].calls == 1
+        assert results.serialize() == compiled.execute(fixture_pokemon_tree).serialize()
+
+    def test_search_phases(self, fixture_sample_data_types):
+        """Test jmespath_search records every phase and calls back on exit"""
+
+        exported = []
+
+        with instrumentation.profile(lambda p: exported.append(p.to_dict())):
+            result = search.jmespath_search("e.*", fixture_sample_data_types)
+
+        phases = exported[0]["phases"]
+        assert result == list(fixture_sample_data_types["e"].values())
+        assert all(phases[name]["calls"] == 1 for name in instrumentation.PHASES)
+        assert phases["serialize"]["nodes_visited"] == len(result) + 1
+        # the pruned root only holds e, and the object under e is materialized
+        assert phases["execute"]["nodes_allocated"] >= 1 + len(
+            fixture_sample_data_types["e"]
+        )
+        assert [o["operation"] for o in exported[0]["operations"]] == [
+            "KeySelectOperation",
+            "WildcardValueOperation",
+        ]
@@ -0,0 +1,88 @@
+import io
+import json
+import pytest
+from typing import Any, Dict
+
+from tree_tools.src import jtt_arena, jtt_output, jtt_tree, search
+
+
+class TestOutput:
+    @pytest.mark.parametrize("lazy", [False, True])
+    @pytest.mark.parametrize(
+        "options",
+        [{}, {"ensure_ascii": False}, {"separators": (",", ":")}],
+    )
+    def test_dumps_matches_json(
+        self, fixture_sample_data_types: Dict[str, Any], lazy: bool, options: Dict
+    ):
+        """Test encoded trees match json.dumps of the serialized tree"""
+
+        data = dict(fixture_sample_data_types, u="café", n=[], o={}, f=[1.5, -2])
+        tree = jtt_tree.create_tree(data, lazy=lazy)
+
+        assert jtt_output.dumps(tree, **options) == json.dumps(data, **options)
+
+    def test_dumps_other_nodes(self, fixture_pokemon_data):
+        """Test arena views and projection results are encoded like serialized trees"""
+
+        arena = jtt_arena.create_arena_tree(fixture_pokemon_data)
+        result = search.compile("pokemon[*].next_evolution").execute(arena)
+
+        assert jtt_output.dumps(arena) == json.dumps(fixture_pokemon_data)
+        assert jtt_output.dumps(result) == json.dumps(result.serialize())
+
+    def test_dump_lazy_does_not_materialize(self, fixture_pokemon_data):
+        """Test writing an unread lazy subtree reuses the decoded data"""
+
+        tree = jtt_tree.create_tree(fixture_pokemon_data, lazy=True)
+        pokemon = tree.value["pokemon"]
+        output = io.StringIO()
+
+        jtt_output.dump(pokemon, output, chunk_size=128)
+
+        assert not pokemon.is_materialized()
+        assert json.loads(output.getvalue()) == fixture_pokemon_data["pokemon"]
+
+    def test_dump_chunks(self):
+        """Test binary streams get UTF-8 in chunks of about chunk_size characters"""
+
+        writes = []
+
+        class Sink(io.RawIOBase):
+            def write(self, data):
+                writes.append(data)
+                return len(data)
+
+        data = {"items": [{"id": i, "name": f"né{i}"} for i in range(200)]}
+        tree = jtt_tree.create_tree(data)
+
+        jtt_output.dump(tree, Sink(), chunk_size=256)
+
+        assert len(writes) > 10
+        assert all(type(w) == bytes for w in writes)
+        assert all(len(w.decode("utf-8")) < 512 for w in writes)
+        assert b"".join(writes) == json.dumps(data).encode("utf-8")
+
+    def test_dumps_deep(self):
+        """Test encoding nesting deeper than the recursion limit"""
+
+        data = {"leaf": [1]}
+        for _ in range(5000):
+            data = {"a": [data]}
+        tree = jtt_tree.create_tree(data)
+
+        text = jtt_output.dumps(tree)
+
+        assert text == '{"a": [' * 5000 + '{"leaf": [1]}' + "]}" * 5000
+        assert jtt_output.dumps(jtt_tree.create_tree(data, lazy=True)) == text
+
+    def test_search_dump(self, fixture_pokemon_data):
+        """Test jmespath_search_dump writes what jmespath_search returns"""
+
+        output = io.BytesIO()
+
+        search.jmespath_search_dump("pokemon[?id < `4`]", fixture_pokemon_data, output)
+
+        assert json.loads(output.getvalue()) == search.jmespath_search(
+            "pokemon[?id < `4`]", fixture_pokemon_data
+        )
@@ -1,6 +1,7 @@
 import pytest
 
-from tree_tools.src.jtt_query import parsing
+from tree_tools.src import search
+from tree_tools.src.jtt_query import parsing, queries
 
 
 @pytest.fixture(scope="class")
@@ -19,13 +20,11 @@ class TestJMESPathParserValidation:
         [
             "1",
             "!",
-            "@",
             "#",
             "$",
             "%",
             "^",
             "&",
-            "*",
             "(",
             ")",
             "-",
@@ -52,9 +51,8 @@ class TestJMESPathParserValidation:
     ):
         with pytest.raises(parsing.JMESPathValidationError) as validation_error:
             parser.validate_query(query)
-        assert "must start with a word character or a quote character" in str(
-            validation_error.value
-        )
+        message = str(validation_error.value)
+        assert "at position 0" in message or "end of query" in message
 
 
 class TestJMESPathParserTokenization:
@@ -69,9 +67,116 @@ class TestJMESPathParserTokenization:
 
 class TestJMESPathParserOperationCreation:
     def test_create_query_operations(self, parser: parsing.JMESPathParser):
-        parser.identifiers = ["foo", "bar", "baz"]
-        parser.create_query_operations()
+        parser.parse("foo.bar.baz")
         assert len(parser.operation_queue) == 3
         ops = [op for op in parser.operation_queue]
         assert all(isinstance(op, parsing.KeySelectOperation) for op in ops)
         assert [op.key for op in ops] == ["foo", "bar", "baz"]
+
+    def test_operation_chain_iteration_is_not_destructive(self):
+        chain = parsing.JMESPathParser().parse("foo.bar")
+        assert [op.key for op in chain] == ["foo", "bar"]
+        assert [op.key for op in chain] == ["foo", "bar"]
+        assert len(chain) == 2
+
+    @pytest.mark.parametrize(
+        "query,tokens",
+        [
+            ("foo[*].bar", ["foo", "[*]", "bar"]),
+            ("foo.*.bar", ["foo", "*", "bar"]),
+            ("foo[]", ["foo", "[]"]),
+            ("foo[-1][0]", ["foo", "[-1]", "[0]"]),
+            ("foo[1:2]", ["foo", "[1:2]"]),
+            ("foo[::-1]", ["foo", "[::-1]"]),
+            ('"foo.bar".baz', ['"foo.bar"', "baz"]),
+        ],
+    )
+    def test_projection_tokenization(self, query: str, tokens: list):
+        parser = parsing.JMESPathParser()
+        parser.tokenize(query)
+        assert parser.identifiers == tokens
+
+    @pytest.mark.parametrize(
+        "query", ["foo.", "foo..bar", "foo.[0]", "foo bar", "foo[a]"]
+    )
+    def test_invalid_tokenization(self, query: str):
+        with pytest.raises(parsing.JMESPathValidationError):
+            parsing.JMESPathParser().parse(query)
+
+    def test_create_projection_operations(self):
+        chain = parsing.JMESPathParser().parse('foo[*]."a.b"[0][1:-1:2].*[]')
+        ops = list(chain)
+        assert [type(op) for op in ops] == [
+            parsing.KeySelectOperation,
+            parsing.WildcardIndexOperation,
+            parsing.KeySelectOperation,
+            parsing.IndexOperation,
+            parsing.SliceOperation,
+            parsing.WildcardValueOperation,
+            parsing.FlattenOperation,
+        ]
+        assert ops[2].key == "a.b"
+        assert (ops[4].start, ops[4].stop, ops[4].step) == (1, -1, 2)
+
+    def test_zero_slice_step(self):
+        with pytest.raises(parsing.JMESPathValidationError):
+            parsing.JMESPathParser().parse("foo[::0]")
+
+
+class TestJMESPathGrammar:
+    @pytest.mark.parametrize(
+        "query,expected",
+        [
+            ("a | b", {"b": 1}),
+            ("a.b | [0]", None),
+            ("list[*].x | [0]", 1),
+            ("list[*].x | length(@)", 2),
+            ("[a.b, list[0].x]", [{"b": 1}, 1]),
+            ("{first: list[0].x, count: length(list)}", {"first": 1, "count": 2}),
+            ("list[*].[x, y]", [[1, "p"], [2, None]]),
+            ("`[1, 2]`", [1, 2]),
+            ("'raw'", "raw"),
+            ("list[?x > `1` || y == 'p'].x", [1, 2]),
+            ("list[?!(x == `1`)].x", [2]),
+            ("a.b || missing", {"b": 1}),
+            ("missing && a", None),
+            ("(list[*].x)[0]", 1),
+            ("list[*].x[0]", []),
+            ("list[].x | sort(@) | reverse(@)", [2, 1]),
+            ("max_by(list, &x).y", None),
+            ("list[*].x == `[1, 2]`", True),
+            ("a.b.b < `2`", True),
+            ("a.b < `2`", None),
+        ],
+    )
+    def test_expressions(self, query: str, expected):
+        data = {"a": {"b": {"b": 1}}, "list": [{"x": 1, "y": "p"}, {"x": 2}]}
+        assert search.jmespath_search(query, data) == expected
+
+    def test_pipe_splits_plan(self):
+        plan = queries.QueryPlan(parsing.JMESPathParser().parse("a[*].b | [0].c"))
+        assert plan.pipe is not None
+        assert plan.pipe.pipe is None
+        assert plan.last is plan.pipe
+
+    @pytest.mark.parametrize(
+        "query,message",
+        [
+            ("length()", "takes 1 argument, got 0"),
+            ("unknown(a)", "Unknown function unknown()"),
+            ("sort_by(a, b)", "expected argument 2 to be an expression reference"),
+            ("a | ", "Unexpected end of query."),
+            ("{a: b", "Unexpected end of query."),
+            ("a[?b", "Unexpected end of query."),
+            ("`{`", "position 0"),
+            ("a.b.", "Unexpected end of query."),
+        ],
+    )
+    def test_invalid_expressions(self, query: str, message: str):
+        with pytest.raises(parsing.JMESPathValidationError) as validation_error:
+            parsing.JMESPathParser().parse(query)
+        assert message in str(validation_error.value)
+
+    def test_deep_path_is_linear(self):
+        chain = parsing.JMESPathParser().parse(".".join(["a"] * 5000))
+        assert len(chain) == 5000
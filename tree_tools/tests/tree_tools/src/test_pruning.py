@@ -0,0 +1,122 @@
+import pytest
+
+from tree_tools.src import jtt_tree, search
+from tree_tools.src.jtt_query import instrumentation, operations, pruning
+
+
+class TestReachPath:
+    @pytest.mark.parametrize(
+        "query,expected",
+        [
+            ("a.b", ("a", "b")),
+            ("a[-1].b", ("a", -1, "b")),
+            ("a[*].b", ("a", pruning.ELEMENTS, "b")),
+            ("a[1:3].b", ("a", pruning.ELEMENTS, "b")),
+            ("a.*.b", ("a", pruning.VALUES, "b")),
+            ("a[?b > `1`].c", ("a",)),
+            ("a[].b", ("a",)),
+        ],
+    )
+    def test_reach_path(self, query, expected):
+        """Test reach paths stop at operations whose access cannot be predicted"""
+
+        assert search.compile(query).reach == expected
+
+    def test_prune_data(self):
+        """Test only the reachable branches are copied, and lists keep their length"""
+
+        data = {"a": [{"b": 1, "c": 2}, {"b": 3}], "d": {"e": 4}}
+
+        assert pruning.prune_data(data, ("a", -1, "b")) == {"a": [None, {"b": 3}]}
+        assert pruning.prune_data(data, ("a", pruning.ELEMENTS, "b")) == {
+            "a": [{"b": 1}, {"b": 3}]
+        }
+        assert pruning.prune_data(data, ("d", pruning.VALUES)) == {"d": {"e": 4}}
+        assert pruning.prune_data(data, ("d", 0)) == {"d": {}}
+        assert pruning.prune_data(data, ("a", 5)) == {"a": []}
+        assert pruning.prune_data(data, ("x",)) == {}
+        # the end of the path is shared with the input
+        assert pruning.prune_data(data, ("d",))["d"] is data["d"]
+
+
+class TestPrunedSearch:
+    @pytest.mark.parametrize(
+        "query",
+        [
+            "pokemon[0].name",
+            "pokemon[-1].next_evolution",
+            "pokemon[*].name",
+            "pokemon[10:20:3].type[0]",
+            "pokemon[*].next_evolution[-1].num",
+            "pokemon[?weight > `100`].name",
+            "pokemon[0].*",
+            "pokemon[*].missing",
+            "missing.key",
+        ],
+    )
+    def test_same_results(self, fixture_pokemon_data, query):
+        """Test pruned trees give the same results as full trees"""
+
+        compiled = search.compile(query)
+        full = jtt_tree.create_tree(fixture_pokemon_data)
+        pruned = compiled.build_tree(fixture_pokemon_data)
+
+        assert compiled.execute(pruned).serialize() == (
+            compiled.execute(full).serialize()
+        )
+        assert pruned.descendant_count <= full.descendant_count
+
+    def test_unreached_branches(self):
+        """Test branches off the query path are not built"""
+
+        data = {"a": {"b": [1, 2]}, "other": list(range(1000))}
+
+        tree = search.compile("a.b[1]").build_tree(data)
+
+        assert list(tree.value) == ["a"]
+        assert search.jmespath_search("a.b[1]", data) == 2
+
+    def test_deep_path(self):
+        """Test long query paths over deep data are pruned without recursion"""
+
+        data = leaf = {}
+        for _ in range(3000):
+            leaf["a"] = {}
+            leaf = leaf["a"]
+        leaf["a"] = [1, 2]
+
+        assert search.jmespath_search(".".join(["a"] * 3001), data) == [1, 2]
+        assert search.jmespath_search(".".join(["a"] * 3001) + "[-1]", data) == 2
+
+
+class TestKeyPaths:
+    def test_merged_plan(self):
+        """Test adjacent key selections run as a single operation"""
+
+        plan = search.compile("a.b.c[0].d").plan
+        merged = plan.leading[0]
+
+        assert isinstance(merged, operations.KeyPathOperation)
+        assert merged.keys == ("a", "b", "c")
+        assert isinstance(plan.leading[1], operations.IndexOperation)
+        assert isinstance(plan.leading[2], operations.KeySelectOperation)
+
+    def test_key_path(self):
+        """Test key paths stop at the first missing key or non-object node"""
+
+        tree = jtt_tree.create_tree({"a": {"b": [1]}})
+
+        assert search.compile("a.b").execute(tree).serialize() == [1]
+        assert search.compile("a.b.c").execute(tree).serialize() is None
+        assert search.compile("a.x.c").execute(tree).serialize() is None
+
+    def test_profiled_key_path(self):
+        """Test profiles still report each key selection"""
+
+        tree = jtt_tree.create_tree({"a": {"b": {"c": 1}}})
+
+        with instrumentation.profile() as profile:
+            search.compile("a.b.c").execute(tree)
+
+        counters = [(s.name, s.calls) for s in profile.operations.values()]
+        assert counters == [("KeySelectOperation", 1)] * 3
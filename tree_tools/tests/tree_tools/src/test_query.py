@@ -1,72 +1,136 @@
-from tree_tools.src import jtt_query
+import pytest
+from typing import Dict, Any
 
+from tree_tools.src import jtt_query, jtt_tree
+from tree_tools.src.jtt_query import parsing
 
-# class TestQueryProcessor:
 
-#     # def test
+def processor(tree: jtt_tree.TreeNode, query: str) -> jtt_query.QueryProcessor:
+    return jtt_query.QueryProcessor(tree, parsing.JMESPathParser().parse(query))
 
 
-# class TestNodeQuery:
-#     def test_blank_query(
-#         self, fixture_sample_data_type_tree, fixture_sample_data_types
-#     ):
-#         """Test empty query will deliver the root node"""
+class TestQueryProcessor:
+    def test_key_query(self, fixture_sample_data_type_tree):
+        """Test key selections return the node stored at the key"""
 
-#         query = jtt_query.TreeQuery(fixture_sample_data_type_tree)
-#         results = query.collect_results()
+        result = processor(fixture_sample_data_type_tree, "e.f").execute()
 
-#         assert len(results) == 1
-#         assert results[0].value.keys() == fixture_sample_data_types.keys()
+        assert result is fixture_sample_data_type_tree.value["e"].value["f"]
 
-#     def test_single_wildcard_query(
-#         self, fixture_sample_data_type_tree, fixture_sample_data_types
-#     ):
-#         """Test get-all query will deliver all nodes underneath the root node"""
+    def test_not_found_query(self, fixture_sample_data_type_tree):
+        """Test that a query that doesn't match anything returns a null node"""
 
-#         wildcard_query = jtt_query.TreeQuery(fixture_sample_data_type_tree).get_all()
-#         results = wildcard_query.collect_results()
+        result = processor(fixture_sample_data_type_tree, "non.existent").execute()
 
-#         assert len(results) == len(fixture_sample_data_types)
+        assert result.type == jtt_tree.NodeType.NULL
 
-#     def test_not_found_query(self, fixture_sample_data_type_tree):
-#         """Test that a query that doesn't match anything returns an empty list"""
+    def test_processor_is_reusable(self, fixture_sample_data_type_tree):
+        """Test executing a processor twice gives the same result"""
 
-#         query = jtt_query.TreeQuery(fixture_sample_data_type_tree).filter_key(
-#             "non-existent"
-#         )
-#         results = query.collect_results()
+        query = processor(fixture_sample_data_type_tree, "i[*]")
 
-#         assert not results
+        assert query.execute().serialize() == query.execute().serialize()
 
-#     def test_object_key_query(self, fixture_pokemon_tree):
-#         """Test that data is extracted from objects using keys"""
+    def test_single_wildcard_query(
+        self, fixture_sample_data_type_tree, fixture_sample_data_types
+    ):
+        """Test object wildcards project every value, dropping nulls"""
 
-#         query = (
-#             jtt_query.TreeQuery(fixture_pokemon_tree)
-#             .filter_key("pokemon")
-#             .get_all()
-#             .filter_key("id")
-#         )
+        results = processor(fixture_sample_data_type_tree, "e.*").execute()
 
-#         results = query.collect_results()
-#         assert len(results) == 151
-#         assert [r.value for r in results] == list(range(1, 152))
+        assert results.type == jtt_tree.NodeType.ARRAY
+        assert results.serialize() == list(fixture_sample_data_types["e"].values())
 
-#     def test_list_index_query(self, fixture_pokemon_tree):
-#         """Test that data is extracted from lists using indices"""
+    def test_object_key_query(self, fixture_pokemon_tree):
+        """Test that data is extracted from objects using keys"""
 
-#         query = (
-#             jtt_query.TreeQuery(fixture_pokemon_tree)
-#             .filter_key("pokemon")
-#             .get_all()
-#             .filter_key("multipliers")
-#             .filter_index(1)
-#         )
+        results = processor(fixture_pokemon_tree, "pokemon[*].id").execute()
 
-#         results = query.collect_results()
-#         assert len(results) == 37
-#         compare_results = []
-#         for p in fixture_pokemon_tree.value["pokemon"].value:
-#             if p.value["multipliers"].value and len(p.value["multipliers"].value) > 1:
-#                 compare_results.append(p.value["multipliers"].value[1].value)
-#         assert [r.value for r in results] == compare_results
+        assert len(results.value) == 151
+        assert [r.value for r in results.value] == list(range(1, 152))
+
+    def test_list_index_query(self, fixture_pokemon_tree):
+        """Test that data is extracted from lists using indices"""
+
+        results = processor(fixture_pokemon_tree, "pokemon[*].multipliers[1]").execute()
+
+        assert len(results.value) == 37
+        compare_results = []
+        for p in fixture_pokemon_tree.value["pokemon"].value:
+            if p.value["multipliers"].value and len(p.value["multipliers"].value) > 1:
+                compare_results.append(p.value["multipliers"].value[1].value)
+        assert [r.value for r in results.value] == compare_results
+
+    @pytest.mark.parametrize(
+        "query,expected_result",
+        [
+            ("i[0]", 5),
+            ("i[-1].j", 7),
+            ("i[4]", None),
+            ("i[1:3]", ["6", True]),
+            ("i[::-2]", [{"j": 7}, "6"]),
+            ("i[*].j", [7]),
+            ("a[*]", None),
+            ("e[0]", None),
+        ],
+    )
+    def test_index_and_slice_query(
+        self, fixture_sample_data_type_tree, query: str, expected_result: Any
+    ):
+        """Test indexes and slices, including out of range and mistyped targets"""
+
+        result = processor(fixture_sample_data_type_tree, query).execute()
+
+        assert result.serialize() == expected_result
+
+    def test_flatten_query(self):
+        """Test flatten merges one level of nesting and ends the previous projection"""
+
+        tree = jtt_tree.create_tree(
+            {"n": [{"b": [{"c": 1}, {"c": 2}]}, {"b": [{"c": 3}]}, {"b": None}]}
+        )
+
+        nested = processor(tree, "n[*].b[*].c").execute()
+        flat = processor(tree, "n[*].b[].c").execute()
+
+        assert nested.serialize() == [[1, 2], [3]]
+        assert flat.serialize() == [1, 2, 3]
+
+
+class TestQueryProcessorLimits:
+    def test_execute_limit(self, fixture_pokemon_tree):
+        """Test limit caps the number of projected elements"""
+
+        results = processor(fixture_pokemon_tree, "pokemon[*].name").execute(limit=3)
+
+        assert results.serialize() == ["Bulbasaur", "Ivysaur", "Venusaur"]
+
+    def test_first(self, fixture_pokemon_tree):
+        """Test first returns the first non-null match, or a null node"""
+
+        first = processor(fixture_pokemon_tree, "pokemon[*].prev_evolution[0].name")
+        missing = processor(fixture_pokemon_tree, "pokemon[*].missing")
+
+        assert first.first().value == "Bulbasaur"
+        assert missing.first().type == jtt_tree.NodeType.NULL
+        assert processor(fixture_pokemon_tree, "pokemon").first().descendant_count
+
+    def test_first_stops_traversal(self):
+        """Test iteration stops pulling elements once enough results are found"""
+
+        visited = []
+
+        class CountingList(list):
+            def __iter__(self):
+                for element in list.__iter__(self):
+                    visited.append(element)
+                    yield element
+
+        tree = jtt_tree.create_tree({"items": [{"id": i} for i in range(1000)]})
+        items = tree.value["items"]
+        items.value = CountingList(items.value)
+
+        results = processor(tree, "items[*].id").iter_results(limit=2)
+
+        assert [r.value for r in results] == [0, 1]
+        assert len(visited) == 2
@@ -1,6 +1,8 @@
 import pytest
 from typing import Dict, Any
 
+from tree_tools.src import search
+from tree_tools.src.jtt_tree import NodeType
 from tree_tools.src.search import jmespath_search
 
 
@@ -26,3 +28,104 @@ class TestSearchSampleData:
     ):
         results = jmespath_search(query, fixture_sample_data_types)
         assert results == expected_result
+
+
+class TestCompiledQuery:
+    def test_compiled_query_is_reusable(
+        self, fixture_sample_data_types: Dict[str, Any]
+    ):
+        """Test a compiled query can be executed repeatedly against different trees"""
+
+        compiled = search.compile("e.f")
+
+        assert compiled.search(fixture_sample_data_types) == 3
+        assert compiled.search(fixture_sample_data_types) == 3
+        assert compiled.search({"e": {"f": "x"}}) == "x"
+        assert len(compiled.operation_chain) == 2
+
+    def test_compiled_query_accepts_tree(self, fixture_sample_data_type_tree):
+        """Test a compiled query executes against an existing tree"""
+
+        compiled = search.compile("e")
+        result = compiled.execute(fixture_sample_data_type_tree)
+
+        assert result is fixture_sample_data_type_tree.value["e"]
+        assert compiled.search(fixture_sample_data_type_tree) == result.serialize()
+
+    def test_compiled_query_is_read_only(self):
+        """Test compiled query attributes cannot be reassigned"""
+
+        compiled = search.compile("a")
+
+        with pytest.raises(AttributeError):
+            compiled.query = "b"
+
+    def test_compile_cache(self, fixture_sample_data_types: Dict[str, Any]):
+        """Test repeated searches reuse the cached compiled query"""
+
+        search.compile.cache_clear()
+        search.jmespath_search("e.g", fixture_sample_data_types)
+        search.jmespath_search("e.g", fixture_sample_data_types)
+
+        assert search.compile("e.g") is search.compile("e.g")
+        info = search.compile.cache_info()
+        assert info.misses == 1
+        assert info.hits == 3
+        assert info.maxsize == search.QUERY_CACHE_SIZE
+
+
+class TestSearchMany:
+    def test_search_many_matches_single_searches(
+        self, fixture_sample_data_types: Dict[str, Any]
+    ):
+        """Test batch results match running each query on its own, in order"""
+
+        queries = ["e.f", "a", "e", "e.g", "missing.key", "e.h", "a.b", "e.f"]
+        results = search.jmespath_search_many(queries, fixture_sample_data_types)
+
+        assert results == [
+            jmespath_search(query, fixture_sample_data_types) for query in queries
+        ]
+        assert results[4] is None
+
+    def test_query_batch_shares_prefixes(self):
+        """Test shared leading keys are merged into one trie path"""
+
+        query_batch = search.compile_many(
+            ("meta.id", "meta.owner.name", "meta.owner.email", "other")
+        )
+
+        assert list(query_batch.root.children) == ["meta", "other"]
+        meta = query_batch.root.children["meta"]
+        assert list(meta.children) == ["id", "owner"]
+        assert sorted(meta.query_indexes()) == [0, 1, 2]
+        data = {"meta": {"id": 1, "owner": {"name": "n", "email": "e"}}}
+        assert query_batch.search(data) == [1, "n", "e", None]
+
+    def test_query_batch_pokemon(self, fixture_pokemon_tree):
+        """Test a batch runs against an existing tree"""
+
+        query_batch = search.compile_many(("pokemon", "pokemon.id"))
+        results = query_batch.execute(fixture_pokemon_tree)
+
+        assert results[0] is fixture_pokemon_tree.value["pokemon"]
+        assert results[1].type == NodeType.NULL
+
+    def test_query_batch_tails(self, fixture_pokemon_data):
+        """Test tails after the shared keys are planned once and match single searches"""
+
+        queries = (
+            "pokemon[0].name",
+            "pokemon[*].num | [2]",
+            "pokemon[?weight > `100`].name",
+            "pokemon[-1].missing",
+        )
+        query_batch = search.compile_many(queries)
+        tails = query_batch.root.children["pokemon"].tails
+        plans = [plan for _, plan in tails]
+
+        for _ in range(2):
+            assert query_batch.search(fixture_pokemon_data) == [
+                jmespath_search(query, fixture_pokemon_data) for query in queries
+            ]
+        assert [plan for _, plan in tails] == plans
@@ -0,0 +1,145 @@
+import asyncio
+import json
+import os
+import threading
+import pytest
+from click.testing import CliRunner
+
+from tree_tools.src import cli, jtt_binary, jtt_server, jtt_tree
+
+
+@pytest.fixture()
+def fixture_server_files(tmp_path, fixture_pokemon_data):
+    json_path = tmp_path / "pokemon.json"
+    json_path.write_text(json.dumps(fixture_pokemon_data))
+    binary_path = tmp_path / "pokemon.jttb"
+    with open(binary_path, "wb") as file:
+        jtt_binary.dump_binary(jtt_tree.create_tree(fixture_pokemon_data), file)
+    return {"pokemon": str(json_path), "mapped": str(binary_path)}
+
+
+@pytest.fixture()
+def fixture_socket_server(tmp_path, fixture_server_files):
+    server = jtt_server.QueryServer.from_paths(fixture_server_files)
+    socket_path = str(tmp_path / "jtt.sock")
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(server.start(socket_path))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield socket_path
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    server.server.close()
+    loop.run_until_complete(server.server.wait_closed())
+    loop.close()
+    server.close()
+
+
+class TestQueryServer:
+    def test_queries(self, fixture_socket_server, fixture_pokemon_data):
+        """Test a connection answers several queries against resident documents"""
+
+        with jtt_server.QueryClient(fixture_socket_server, timeout=10) as client:
+            names = client.query("pokemon", "pokemon[?id < `4`].name")
+            mapped = client.query("mapped", "pokemon[0]")
+            documents = client.documents()
+
+        assert names == ["Bulbasaur", "Ivysaur", "Venusaur"]
+        assert mapped == fixture_pokemon_data["pokemon"][0]
+        assert documents == ["mapped", "pokemon"]
+
+    def test_result_cache(self, fixture_socket_server):
+        """Test repeated queries are answered from the result cache"""
+
+        with jtt_server.QueryClient(fixture_socket_server, timeout=10) as client:
+            first = client.query_text("pokemon", "pokemon[*].name")
+            second = client.query_text("pokemon", "pokemon[*].name")
+            stats = client.stats()
+
+        assert first == second
+        assert (stats["hits"], stats["misses"], stats["currsize"]) == (1, 1, 1)
+
+    @pytest.mark.parametrize(
+        "request_line,message",
+        [
+            ({"document": "missing", "query": "a"}, "Unknown document"),
+            ({"document": "pokemon", "query": "[a"}, "JMESPathValidationError"),
+            ({"op": "drop"}, "Unknown op"),
+        ],
+    )
+    def test_errors(self, fixture_socket_server, request_line, message):
+        """Test failed requests answer an error and keep the connection usable"""
+
+        with jtt_server.QueryClient(fixture_socket_server, timeout=10) as client:
+            with pytest.raises(jtt_server.QueryServerError, match=message):
+                client.request(request_line)
+            assert client.query("pokemon", "pokemon[0].id") == 1
+
+    @pytest.mark.parametrize("pieces_before_error", [0, 20])
+    def test_encoding_errors(
+        self, fixture_socket_server, monkeypatch, pieces_before_error: int
+    ):
+        """Test a result that fails to encode answers an error, even mid-response"""
+
+        def failing_iterencode(result):
+            for _ in range(pieces_before_error):
+                yield "x" * 10000
+            raise ValueError("cannot encode")
+
+        monkeypatch.setattr(jtt_server.jtt_output, "iterencode", failing_iterencode)
+
+        with jtt_server.QueryClient(fixture_socket_server, timeout=10) as client:
+            line = client.request_text({"document": "pokemon", "query": "pokemon"})
+            if pieces_before_error:
+                # the first chunk was already sent, so the error follows on its own line
+                assert line.startswith(jtt_server.RESULT_PREFIX)
+                line = client.file.readline()
+            assert json.loads(line) == {"error": "ValueError: cannot encode"}
+            monkeypatch.undo()
+            assert client.query("pokemon", "pokemon[0].id") == 1
+
+    def test_slow_query_does_not_block(self, fixture_socket_server, monkeypatch):
+        """Test queries are evaluated off the event loop"""
+
+        release = threading.Event()
+        compile_query = jtt_server.search.compile
+
+        def slow_compile(query):
+            if query == "slow":
+                release.wait(10)
+            return compile_query(query)
+
+        monkeypatch.setattr(jtt_server.search, "compile", slow_compile)
+        slow_client = jtt_server.QueryClient(fixture_socket_server, timeout=10)
+        slow = threading.Thread(target=slow_client.query, args=("pokemon", "slow"))
+        slow.start()
+        try:
+            with jtt_server.QueryClient(fixture_socket_server, timeout=5) as client:
+                assert client.query("pokemon", "pokemon[0].id") == 1
+        finally:
+            release.set()
+            slow.join(10)
+            slow_client.close()
+
+    def test_cli_query(self, fixture_socket_server):
+        """Test the query command prints the JSON text of the result"""
+
+        result = CliRunner().invoke(
+            cli.main,
+            ["query", "pokemon", "pokemon[:2].num", "--socket", fixture_socket_server],
+        )
+
+        assert result.exit_code == 0
+        assert json.loads(result.output) == ["001", "002"]
+
+    def test_cli_requires_one_address(self, fixture_server_files):
+        """Test serve and query need exactly one of --socket and --port"""
+
+        runner = CliRunner()
+
+        serve = runner.invoke(cli.main, ["serve", "a=b.json"])
+        query = runner.invoke(
+            cli.main, ["query", "a", "b", "--socket", "s", "--port", "1"]
+        )
+
+        assert serve.exit_code == query.exit_code == 2
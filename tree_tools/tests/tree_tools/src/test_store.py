@@ -0,0 +1,181 @@
+import threading
+from typing import Any, Dict
+
+import pytest
+
+from tree_tools.src import jtt_store, jtt_tree, search
+
+
+def document(name: str) -> Dict[str, Any]:
+    return {"name": name, "items": [{"id": i, "tag": name} for i in range(50)]}
+
+
+def tree_size(data: Dict[str, Any]) -> int:
+    statistics = jtt_tree.TreeStatistics()
+    jtt_tree.create_tree(data, statistics=statistics)
+    return statistics.retained_bytes
+
+
+class CountingSource:
+    def __init__(self) -> None:
+        self.loads = []
+
+    def __call__(self, document_id: str) -> Dict[str, Any]:
+        self.loads.append(document_id)
+        if document_id == "missing":
+            raise KeyError(document_id)
+        return document(document_id)
+
+
+class TestTreeStore:
+    def test_hits_and_misses(self):
+        """Test trees are loaded once and then served from the store"""
+
+        source = CountingSource()
+        store = jtt_store.TreeStore(source, budget=10 * tree_size(document("a")))
+
+        tree = store.get("a")
+
+        assert store.get("a") is tree
+        assert "a" in store and len(store) == 1
+        assert source.loads == ["a"]
+        info = store.store_info()
+        assert (info.hits, info.misses, info.evictions) == (1, 1, 0)
+        assert info.currbytes == tree_size(document("a"))
+
+    def test_lru_eviction(self):
+        """Test the least recently used trees are evicted to stay within the budget"""
+
+        source = CountingSource()
+        store = jtt_store.TreeStore(source, budget=int(2.5 * tree_size(document("a"))))
+
+        store.get("a")
+        store.get("b")
+        store.get("a")
+        store.get("c")
+
+        assert "b" not in store
+        assert "a" in store and "c" in store
+        assert store.store_info().evictions == 1
+        assert store.store_info().currbytes <= store.budget
+
+        store.get("b")
+
+        assert source.loads == ["a", "b", "c", "b"]
+        assert "a" not in store
+
+    def test_oversized_document(self):
+        """Test documents larger than the whole budget are rejected while building"""
+
+        store = jtt_store.TreeStore(document, budget=tree_size(document("a")) // 2)
+
+        with pytest.raises(jtt_tree.TreeTooLargeError):
+            store.get("a")
+        assert len(store) == 0 and store.store_info().currbytes == 0
+
+    def test_source_errors(self):
+        """Test source errors reach the caller and a later request retries the load"""
+
+        source = CountingSource()
+        store = jtt_store.TreeStore(source, budget=1 << 20)
+
+        for _ in range(2):
+            with pytest.raises(KeyError):
+                store.get("missing")
+
+        assert source.loads == ["missing", "missing"]
+        assert store.loading == {}
+
+    def test_concurrent_loads(self):
+        """Test concurrent requests for the same document share one load"""
+
+        started = threading.Event()
+        release = threading.Event()
+        loads = []
+
+        def slow_source(document_id: str) -> Dict[str, Any]:
+            loads.append(document_id)
+            started.set()
+            release.wait(5)
+            return document(document_id)
+
+        store = jtt_store.TreeStore(slow_source, budget=1 << 20)
+        trees = []
+        threads = [
+            threading.Thread(target=lambda: trees.append(store.get("a")))
+            for _ in range(4)
+        ]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert loads == ["a"]
+        assert len(trees) == 4 and all(tree is trees[0] for tree in trees)
+        info = store.store_info()
+        assert (info.hits, info.misses) == (3, 1)
+
+    def test_query_processor(self):
+        """Test stored trees are queried through the usual processors"""
+
+        store = jtt_store.TreeStore(document, budget=1 << 20, index=True)
+        compiled = search.compile("items[?id > `47`].tag")
+
+        processor = store.processor("a", compiled)
+
+        assert processor.execute().serialize() == ["a", "a"]
+        assert search.compile("name").execute(store.get("b")).serialize() == "b"
+        assert store.get("a").path_index is not None
+
+    def test_put_discard_clear(self):
+        """Test trees can be stored directly, dropped and reloaded"""
+
+        source = CountingSource()
+        store = jtt_store.TreeStore(source, budget=1 << 20)
+
+        store.put("a", {"name": "direct"})
+        assert search.compile("name").execute(store.get("a")).serialize() == "direct"
+
+        store.discard("a")
+        assert store.get("a").value["name"].value == "a"
+        assert source.loads == ["a"]
+
+        store.clear()
+        assert store.store_info() == jtt_store.StoreInfo(0, 0, 0, 1 << 20, 0, 0)
+
+    @pytest.mark.parametrize("action", ["put", "discard", "clear"])
+    def test_edits_during_load(self, action: str):
+        """Test a put, discard or clear during a load is not undone when it finishes"""
+
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_source(document_id: str) -> Dict[str, Any]:
+            started.set()
+            release.wait(5)
+            return document("stale")
+
+        store = jtt_store.TreeStore(slow_source, budget=1 << 20)
+        trees = []
+        thread = threading.Thread(target=lambda: trees.append(store.get("a")))
+        thread.start()
+        started.wait(5)
+        if action == "put":
+            store.put("a", {"name": "new"})
+        elif action == "discard":
+            store.discard("a")
+        else:
+            store.clear()
+        release.set()
+        thread.join(5)
+
+        assert trees[0].value["name"].value == "stale"
+        assert store.loading == {}
+        if action == "put":
+            assert store.get("a").value["name"].value == "new"
+            assert store.store_info().currbytes == tree_size({"name": "new"})
+        else:
+            assert "a" not in store and store.store_info().currbytes == 0
@@ -0,0 +1,109 @@
+import io
+import json
+import pytest
+from typing import Dict, Any
+
+from tree_tools.src import jtt_tree
+from tree_tools.src.jtt_stream import create_tree_from_stream
+
+
+def assert_same_tree(left: jtt_tree.TreeNode, right: jtt_tree.TreeNode) -> None:
+    assert left.type == right.type
+    assert left.descendant_count == right.descendant_count
+    if left.type == jtt_tree.NodeType.OBJECT:
+        assert list(left.value.keys()) == list(right.value.keys())
+        for key in left.value:
+            assert_same_tree(left.value[key], right.value[key])
+    elif left.type == jtt_tree.NodeType.ARRAY:
+        assert len(left.value) == len(right.value)
+        for l, r in zip(left.value, right.value):
+            assert_same_tree(l, r)
+    else:
+        assert left.value == right.value
+
+
+class TestStreamTree:
+    @pytest.mark.parametrize("chunk_size", [1, 3, 7, 4096])
+    def test_stream_matches_create_tree(
+        self, fixture_sample_data_types: Dict[str, Any], chunk_size: int
+    ):
+        """Test streamed trees match trees built from decoded data at any chunk size"""
+
+        text = json.dumps(fixture_sample_data_types, indent=2)
+        tree = create_tree_from_stream(io.StringIO(text), chunk_size=chunk_size)
+
+        assert_same_tree(tree, jtt_tree.create_tree(fixture_sample_data_types))
+
+    @pytest.mark.parametrize("chunk_size", [1, 5, 64 * 1024])
+    def test_stream_pokemon_bytes(self, fixture_pokemon_tree, chunk_size: int):
+        """Test binary file objects are decoded incrementally"""
+
+        with open("tree_tools/tests/test_jsons/pokemon.json", "rb") as file:
+            tree = create_tree_from_stream(file, chunk_size=chunk_size)
+
+        assert_same_tree(tree, fixture_pokemon_tree)
+
+    def test_stream_strings_and_numbers(self):
+        """Test escapes, multi-byte characters and number forms across chunk edges"""
+
+        data = {
+            "escaped": 'a"b\\cé\n',
+            "unicode": "日本\U0001f600",
+            "numbers": [0, -1, 12345678901234567890, 1.5, -2.5e-3, 1e10],
+            "literals": [True, False, None],
+        }
+        text = json.dumps(data)
+        tree = create_tree_from_stream(io.BytesIO(text.encode("utf-8")), chunk_size=2)
+
+        assert tree.serialize() == data
+        assert tree.value["numbers"].value[2].value == 12345678901234567890
+        assert type(tree.value["numbers"].value[5].value) == float
+
+    def test_stream_duplicate_keys(self):
+        """Test duplicate keys keep the last value without inflating counts"""
+
+        tree = create_tree_from_stream(io.StringIO('{"a": [1, 2, 3], "a": 1}'))
+
+        assert tree.serialize() == {"a": 1}
+        assert tree.descendant_count == 1
+
+    @pytest.mark.parametrize("text", ["1", '"a"', "[]", "null"])
+    def test_stream_non_object_root(self, text: str):
+        """Test the root of a streamed document must be an object"""
+
+        with pytest.raises(ValueError):
+            create_tree_from_stream(io.StringIO(text))
+
+    @pytest.mark.parametrize(
+        "text",
+        ["", "{", '{"a"}', '{"a": 1,}', '{"a": [1 2]}', '{"a": 1} x', '{"a": tru}'],
+    )
+    def test_stream_invalid_json(self, text: str):
+        """Test malformed input raises a JSONDecodeError"""
+
+        with pytest.raises(json.JSONDecodeError):
+            create_tree_from_stream(io.StringIO(text), chunk_size=2)
+
+    @pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 16])
+    @pytest.mark.parametrize(
+        "text",
+        [
+            '{"a": [1, 2, 3],\n "b": {"c": "x"},\n "d": [1 2]}',
+            '{"items": [\n' + ",\n".join(['  {"id": 1}'] * 20) + '\n  {"id": 2}]}',
+            '{"a": "' + "x" * 100 + '", "b": "\\q"}',
+            '{"a": 1}\n\n   x',
+        ],
+    )
+    def test_stream_error_position(self, text: str, chunk_size: int):
+        """Test decode errors past the first chunk report positions in the document"""
+
+        with pytest.raises(json.JSONDecodeError) as expected:
+            json.loads(text)
+        with pytest.raises(json.JSONDecodeError) as error:
+            create_tree_from_stream(io.StringIO(text), chunk_size=chunk_size)
+
+        assert (error.value.pos, error.value.lineno, error.value.colno) == (
+            expected.value.pos,
+            expected.value.lineno,
+            expected.value.colno,
+        )
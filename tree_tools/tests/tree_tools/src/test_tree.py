@@ -1,7 +1,8 @@
+import json
 import pytest
 from typing import Dict, Any
 
-from tree_tools.src import jtt_tree
+from tree_tools.src import jtt_arena, jtt_diff, jtt_tree, search
 
 
 class TestTree:
@@ -44,3 +45,428 @@ class TestTree:
         assert tree.value["e"].descendant_count == 3
         assert tree.value["i"].descendant_count == 5
         assert tree.value["i"].value[3].descendant_count == 1
+
+
+class TestDeepTree:
+    DEPTH = 10000
+
+    def deep_data(self) -> Dict[str, Any]:
+        data = {"leaf": True}
+        for i in range(self.DEPTH):
+            data = {"a": [data, i]} if i % 2 else {"a": data}
+        return data
+
+    def test_deep_tree_creation(self):
+        """Test building and counting nesting far deeper than the recursion limit"""
+
+        data = self.deep_data()
+        tree = jtt_tree.create_tree(data)
+
+        assert tree.descendant_count == jtt_tree.count_descendants(data)
+        assert tree.descendant_count == 2 * self.DEPTH + 1
+        assert search.compile("a[0].a.a[0].a.a").execute(tree).type == (
+            jtt_tree.NodeType.ARRAY
+        )
+
+    def test_deep_tree_interning(self):
+        """Test interning and fingerprinting nesting far deeper than the recursion limit"""
+
+        data = self.deep_data()
+        tree = jtt_tree.create_tree(data, intern=True)
+
+        assert tree.descendant_count == 2 * self.DEPTH + 1
+        assert tree.fingerprint == jtt_tree.fingerprint(jtt_tree.create_tree(data))
+
+    @pytest.mark.parametrize("lazy", [False, True])
+    def test_deep_tree_serialization(self, lazy: bool):
+        """Test serializing deep trees rebuilds the data, without materializing lazy nodes"""
+
+        data = self.deep_data()
+        tree = jtt_tree.create_tree(data, lazy=lazy)
+
+        result = tree.serialize()
+
+        assert not lazy or not tree.is_materialized()
+        expected = data
+        for i in reversed(range(self.DEPTH)):
+            assert result is not expected and result.keys() == expected.keys()
+            result, expected = result["a"], expected["a"]
+            if i % 2:
+                assert result[1] == expected[1]
+                result, expected = result[0], expected[0]
+        assert result == expected == {"leaf": True}
+
+
+class TestLazyTree:
+    def test_lazy_tree_matches_eager_tree(
+        self, fixture_sample_data_types: Dict[str, Any]
+    ):
+        """Test lazy tree exposes the same types, counts and serialization"""
+
+        eager = jtt_tree.create_tree(fixture_sample_data_types)
+        lazy = jtt_tree.create_tree(fixture_sample_data_types, lazy=True)
+
+        assert lazy.type == jtt_tree.NodeType.OBJECT
+        assert lazy.descendant_count == eager.descendant_count
+        assert lazy.value["i"].descendant_count == eager.value["i"].descendant_count
+        assert lazy.value["i"].value[3].value["j"].type == jtt_tree.NodeType.NUMBER
+        assert lazy.value["k"].type == jtt_tree.NodeType.NULL
+        assert lazy.serialize() == eager.serialize() == fixture_sample_data_types
+
+    def test_lazy_tree_defers_children(self, fixture_sample_data_types: Dict[str, Any]):
+        """Test lazy tree only boxes the children that were read"""
+
+        tree = jtt_tree.create_tree(fixture_sample_data_types, lazy=True)
+        assert not tree.is_materialized()
+
+        e = tree.value["e"]
+        assert tree.is_materialized()
+        assert isinstance(e, jtt_tree.LazyObjectTreeNode)
+        assert not e.is_materialized()
+        assert not tree.value["i"].is_materialized()
+
+    def test_lazy_tree_descendant_count_without_materializing(
+        self, fixture_sample_data_types: Dict[str, Any]
+    ):
+        """Test descendant counts are computed from raw data on demand"""
+
+        tree = jtt_tree.create_tree(fixture_sample_data_types, lazy=True)
+
+        assert tree.descendant_count == 16
+        assert not tree.is_materialized()
+
+
+class TestPathIndex:
+    def test_path_index_paths(self, fixture_sample_data_types: Dict[str, Any]):
+        """Test the index maps key and list index paths to the nodes"""
+
+        tree = jtt_tree.create_tree(fixture_sample_data_types, index=True)
+        index = tree.path_index
+
+        assert len(index) == tree.descendant_count
+        assert index.lookup(("e", "f")) is tree.value["e"].value["f"]
+        assert index.lookup(("i", 3, "j")) is tree.value["i"].value[3].value["j"]
+        assert index.lookup(("e", "missing")) is None
+
+    def test_path_index_built_on_first_use(
+        self, fixture_sample_data_types: Dict[str, Any]
+    ):
+        """Test the index is only built once and reused afterwards"""
+
+        tree = jtt_tree.create_tree(fixture_sample_data_types, lazy=True)
+        assert tree.path_index is None
+
+        index = jtt_tree.build_path_index(tree)
+
+        assert jtt_tree.build_path_index(tree) is index
+        assert index.lookup(("i", 1)).value == "6"
+
+    def test_path_index_query(self, fixture_sample_data_types: Dict[str, Any]):
+        """Test key chain queries resolve through the attached index"""
+
+        tree = jtt_tree.create_tree(fixture_sample_data_types, index=True)
+        node = tree.value["e"].value["g"]
+        identifier, _ = tree.path_index.resolve(("e", "g"))
+        parent, _ = tree.path_index.resolve(("e",))
+        tree.path_index.entries[(parent, "g")] = (
+            identifier,
+            jtt_tree.StringTreeNode("indexed"),
+        )
+
+        assert search.compile("e.g").execute(tree).value == "indexed"
+        assert search.compile("e.missing").execute(tree).type == jtt_tree.NodeType.NULL
+        assert search.compile("g").execute(tree.value["e"]) is node
+
+    def test_path_index_deep(self):
+        """Test deep trees are indexed and edited in time linear in their depth"""
+
+        depth = 60000
+        data = {"leaf": 1}
+        for _ in range(depth // 2):
+            data = {"next": [data]}
+        tree = jtt_tree.create_tree(data, index=True)
+        path = ("next", 0) * (depth // 2) + ("leaf",)
+
+        assert len(tree.path_index) == tree.descendant_count
+        assert tree.path_index.lookup(path).value == 1
+
+        parent = tree.path_index.lookup(path[:-1])
+        parent.set("leaf", {"new": [2]})
+        parent.delete("leaf")
+        parent.set("other", 3)
+
+        assert tree.path_index.lookup(path) is None
+        assert tree.path_index.lookup(path[:-1] + ("other",)).value == 3
+        assert len(tree.path_index) == tree.descendant_count
+
+
+class TestMutation:
+    @pytest.mark.parametrize("lazy", [False, True])
+    def test_mutation_updates_counts(
+        self, fixture_sample_data_types: Dict[str, Any], lazy: bool
+    ):
+        """Test edits keep the descendant counts of every ancestor exact"""
+
+        tree = jtt_tree.create_tree(fixture_sample_data_types, lazy=lazy)
+        items = tree.value["i"]
+        nested = items.value[3]
+
+        nested.set("z", {"y": [1, 2]})
+        items.append("last")
+        items.insert(0, [None])
+        tree.value["e"].delete("f")
+        tree.set("a", [1, 2, 3])
+
+        expected = dict(fixture_sample_data_types)
+        expected["a"] = [1, 2, 3]
+        expected["e"] = {"g": "4", "h": False}
+        expected["i"] = [[None], 5, "6", True, {"j": 7, "z": {"y": [1, 2]}}, "last"]
+        assert tree.serialize() == expected
+        assert tree.descendant_count == jtt_tree.count_descendants(expected)
+        assert items.descendant_count == jtt_tree.count_descendants(expected["i"])
+        assert nested.descendant_count == 5
+
+    def test_mutation_links_and_versions(
+        self, fixture_sample_data_types: Dict[str, Any]
+    ):
+        """Test edits bump the version of the edited node and its ancestors only"""
+
+        tree = jtt_tree.create_tree(fixture_sample_data_types)
+        items = tree.value["i"]
+        nested = items.value[3]
+        sibling = tree.value["e"]
+        assert nested.parent is items and items.parent is tree and tree.parent is None
+
+        nested.set("j", 8)
+
+        assert (tree.version, items.version, nested.version) == (1, 1, 1)
+        assert sibling.version == 0
+
+        removed = items.delete(-1)
+
+        assert removed is nested and nested.parent is None
+        assert (tree.version, items.version) == (2, 2)
+
+    def test_mutation_rejects_attached_nodes(
+        self, fixture_sample_data_types: Dict[str, Any]
+    ):
+        """Test a container cannot be stored twice or inside itself"""
+
+        tree = jtt_tree.create_tree(fixture_sample_data_types)
+        with pytest.raises(ValueError):
+            tree.set("copy", tree.value["e"])
+        with pytest.raises(ValueError):
+            tree.value["e"].set("loop", tree)
+        with pytest.raises(KeyError):
+            tree.delete("missing")
+        with pytest.raises(IndexError):
+            tree.value["i"].set(4, 0)
+
+        moved = tree.value["e"].delete("h")
+        tree.value["l"].set("h", moved)
+        assert tree.serialize()["l"] == {"h": False}
+
+    def test_mutation_updates_path_index(
+        self, fixture_sample_data_types: Dict[str, Any]
+    ):
+        """Test edits below an indexed node keep its PathIndex in step"""
+
+        tree = jtt_tree.create_tree(fixture_sample_data_types, index=True)
+        items = tree.value["i"]
+
+        items.insert(1, {"m": "new"})
+        tree.value["e"].delete("g")
+        tree.set("l", {"n": [0]})
+
+        assert len(tree.path_index) == tree.descendant_count
+        assert tree.path_index.lookup(("i", 1, "m")).value == "new"
+        assert tree.path_index.lookup(("i", 4, "j")).value == 7
+        assert tree.path_index.lookup(("i", 5)) is None
+        assert tree.path_index.lookup(("e", "g")) is None
+        assert tree.path_index.lookup(("l", "n", 0)).value == 0
+        assert search.compile("i[4].j").execute(tree).value == 7
+
+    def test_default_affected_children(self):
+        """Test containers report every child as affected unless they narrow it down"""
+
+        tree = jtt_tree.create_tree({"a": 1, "b": [2, 3]})
+        listed = tree.value["b"]
+
+        assert jtt_tree.ContainerTreeNode.affected_children(tree, "a") == [
+            ("a", tree.value["a"]),
+            ("b", listed),
+        ]
+        assert jtt_tree.ContainerTreeNode.affected_children(listed, 1) == list(
+            enumerate(listed.value)
+        )
+        assert list(tree.affected_children("a")) == [("a", tree.value["a"])]
+
+
+class TestInterning:
+    def test_interned_tree_shares_nodes(self):
+        """Test identical scalars and subtrees are stored once"""
+
+        data = {
+            "events": [
+                {"level": "info", "tags": ["a", "b"], "code": 1},
+                {"level": "info", "tags": ["a", "b"], "code": 1},
+                {"level": "warn", "tags": ["a", "b"], "code": 1.0},
+            ],
+            "zero": 0.0,
+            "negative_zero": -0.0,
+            "flag": True,
+            "one": 1,
+        }
+        tree = jtt_tree.create_tree(data, intern=True)
+        events = tree.value["events"].value
+
+        assert tree.serialize() == data
+        assert json.dumps(tree.serialize()) == json.dumps(data)
+        assert tree.descendant_count == jtt_tree.count_descendants(data)
+        assert events[0] is events[1]
+        assert events[2].value["tags"] is events[0].value["tags"]
+        assert events[2].value["code"] is not events[0].value["code"]
+        assert tree.value["flag"] is not tree.value["one"]
+        assert jtt_tree.nodes_equal(tree, jtt_tree.create_tree(data))
+
+    def test_interned_tree_editing(self, fixture_sample_data_types: Dict[str, Any]):
+        """Test the root of an interned tree can be edited but shared subtrees cannot"""
+
+        tree = jtt_tree.create_tree(fixture_sample_data_types, intern=True)
+        shared = tree.value["e"]
+
+        with pytest.raises(TypeError):
+            shared.set("f", 4)
+        with pytest.raises(TypeError):
+            tree.value["i"].delete(0)
+        with pytest.raises(ValueError):
+            jtt_tree.create_tree(fixture_sample_data_types, lazy=True, intern=True)
+
+        tree.delete("e")
+        tree.set("copy", shared)
+        tree.set("again", shared)
+
+        assert shared.parent is None
+        assert tree.serialize()["copy"] == tree.serialize()["again"]
+
+
+class TestFingerprint:
+    def test_fingerprint_matches_equality(
+        self, fixture_sample_data_types: Dict[str, Any]
+    ):
+        """Test equal trees of any implementation share a fingerprint"""
+
+        reordered = dict(reversed(list(fixture_sample_data_types.items())))
+        trees = [
+            jtt_tree.create_tree(fixture_sample_data_types),
+            jtt_tree.create_tree(fixture_sample_data_types, lazy=True),
+            jtt_tree.create_tree(fixture_sample_data_types, intern=True),
+            jtt_tree.create_tree(reordered),
+        ]
+        fingerprints = {jtt_tree.fingerprint(tree) for tree in trees}
+
+        assert len(fingerprints) == 1
+        assert trees[0].fingerprint in fingerprints
+        assert trees[0].value["e"].fingerprint is not None
+
+    def test_fingerprint_cleared_by_edits(
+        self, fixture_sample_data_types: Dict[str, Any]
+    ):
+        """Test an edit clears the cached fingerprints above it"""
+
+        tree = jtt_tree.create_tree(fixture_sample_data_types)
+        other = jtt_tree.create_tree(fixture_sample_data_types)
+        before = jtt_tree.fingerprint(tree)
+        jtt_tree.fingerprint(other)
+        sibling = tree.value["e"].fingerprint
+
+        tree.value["i"].value[3].set("j", 8)
+
+        assert tree.fingerprint is None and tree.value["i"].fingerprint is None
+        assert tree.value["e"].fingerprint == sibling
+        assert jtt_tree.fingerprint(tree) != before
+        assert not jtt_tree.nodes_equal(tree, other)
+
+        tree.value["i"].value[3].set("j", 7)
+
+        assert jtt_tree.fingerprint(tree) == before
+        assert jtt_tree.nodes_equal(tree, other)
+
+    def test_fingerprint_mixed_children(self):
+        """Test containers and arena views mixed in one list keep their own slots"""
+
+        arena = jtt_arena.create_arena_tree({"x": [1], "y": [2]})
+        first = jtt_tree.ListTreeNode.from_nodes(
+            [jtt_tree.create_tree({"k": 1}), arena.value["x"]]
+        )
+        second = jtt_tree.ListTreeNode.from_nodes(
+            [jtt_tree.create_tree({"k": 1}), arena.value["y"]]
+        )
+
+        assert jtt_tree.fingerprint(first) != jtt_tree.fingerprint(second)
+        assert jtt_diff.diff(first, second)
+        assert jtt_tree.fingerprint(first) == jtt_tree.fingerprint(
+            jtt_tree.ListTreeNode([{"k": 1}, [1]])
+        )
+
+
+class TestStatistics:
+    def test_statistics_while_building(self, fixture_sample_data_types: Dict[str, Any]):
+        """Test statistics are gathered during construction and match a walk"""
+
+        statistics = jtt_tree.TreeStatistics()
+        tree = jtt_tree.create_tree(fixture_sample_data_types, statistics=statistics)
+        walked = jtt_tree.tree_statistics(tree)
+
+        assert statistics.node_count == tree.descendant_count + 1
+        assert statistics.node_count == walked.node_count
+        assert statistics.type_counts == walked.type_counts
+        assert statistics.fan_out == walked.fan_out
+        assert statistics.max_depth == walked.max_depth
+        assert [path for path, _ in statistics.largest] == [
+            path for path, _ in walked.largest
+        ]
+        # list sizes are estimated from the decoded data while building
+        assert statistics.retained_bytes == pytest.approx(walked.retained_bytes, 0.05)
+        assert json.dumps(statistics.to_dict())
+
+    def test_subtree_statistics(self):
+        """Test any subtree can be measured, and sizes add up along the tree"""
+
+        tree = jtt_tree.create_tree(
+            {"small": [1], "big": {"text": "x" * 1000, "list": [[1, 2], [None]]}}
+        )
+        statistics = jtt_tree.tree_statistics(tree, largest=2)
+        big = jtt_tree.tree_statistics(tree.value["big"])
+
+        assert statistics.type_counts[jtt_tree.NodeType.ARRAY] == 4
+        assert statistics.type_counts[jtt_tree.NodeType.NULL] == 1
+        assert statistics.max_depth == 4
+        assert big.max_depth == 3
+        assert statistics.fan_out == {1: 2, 2: 4}
+        assert statistics.largest[0] == (("big",), big.retained_bytes)
+        assert statistics.largest[1][0] == ("big", "list")
+        assert big.retained_bytes > 1000
+        assert statistics.retained_bytes > big.retained_bytes
+
+        scalar = jtt_tree.tree_statistics(tree.value["big"].value["text"])
+        assert scalar.node_count == 1 and scalar.max_depth == 0
+        assert scalar.retained_bytes > 1000
+
+    def test_budget(self):
+        """Test a byte budget stops the construction of oversized trees"""
+
+        data = {"items": [{"id": i} for i in range(1000)]}
+        measured = jtt_tree.TreeStatistics()
+        jtt_tree.create_tree(data, statistics=measured)
+
+        with pytest.raises(jtt_tree.TreeTooLargeError):
+            jtt_tree.create_tree(
+                data,
+                statistics=jtt_tree.TreeStatistics(budget=measured.retained_bytes // 2),
+            )
+        jtt_tree.create_tree(
+            data, statistics=jtt_tree.TreeStatistics(budget=measured.retained_bytes)
+        )
+        with pytest.raises(ValueError):
+            jtt_tree.create_tree(data, lazy=True, statistics=jtt_tree.TreeStatistics())